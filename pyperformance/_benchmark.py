@@ -9,6 +9,7 @@ __all__ = [
 import os
 import os.path
 import sys
+import tempfile
 from collections import namedtuple
 
 import pyperf
@@ -163,6 +164,14 @@ class Benchmark:
     def extra_opts(self):
         return self._get_metadata_value("extra_opts", ())
 
+    @property
+    def importtime_args(self):
+        return self._get_metadata_value("importtime_args", ())
+
+    @property
+    def params(self):
+        return self._get_metadata_value("params", {})
+
     @property
     def python(self):
         return SpecifierSet(self._get_metadata_value("python", ""))
@@ -180,6 +189,8 @@ class Benchmark:
         *,
         venv=None,
         verbose=False,
+        env_vars=None,
+        params=None,
     ):
         if venv and python == sys.executable:
             python = venv.python
@@ -190,13 +201,18 @@ class Benchmark:
             runid = get_run_id(python, self)
 
         runscript = self.runscript
+        extra_opts = list(self.extra_opts)
+        # Parameters are passed as "--name=value" options of the runscript
+        for name, value in (params or {}).items():
+            extra_opts.append(f"--{name}={value}")
         bench = _run_perf_script(
             python,
             runscript,
             runid,
-            extra_opts=self.extra_opts,
+            extra_opts=extra_opts,
             pyperf_opts=pyperf_opts,
             verbose=verbose,
+            env_vars=env_vars,
         )
 
         return bench
@@ -214,13 +230,17 @@ def _run_perf_script(
     extra_opts=None,
     pyperf_opts=None,
     verbose=False,
+    env_vars=None,
 ):
     if not runscript:
         raise ValueError("missing runscript")
     if not isinstance(runscript, str):
         raise TypeError(f"runscript must be a string, got {runscript!r}")
 
-    with _utils.temporary_file() as tmp:
+    with (
+        _utils.temporary_file() as tmp,
+        tempfile.TemporaryDirectory(prefix="pyperformance-") as tmpdir,
+    ):
         opts = [
             *(extra_opts or ()),
             *(pyperf_opts or ()),
@@ -228,10 +248,26 @@ def _run_perf_script(
             tmp,
         ]
         if pyperf_opts and "--copy-env" in pyperf_opts:
-            argv, env = _prep_cmd(python, runscript, opts, runid, lambda name: None)
+            argv, env = _prep_cmd(
+                python,
+                runscript,
+                opts,
+                runid,
+                lambda name: None,
+                env_vars=env_vars,
+                tmpdir=tmpdir,
+            )
         else:
             opts, inherit_envvar = _resolve_restricted_opts(opts)
-            argv, env = _prep_cmd(python, runscript, opts, runid, inherit_envvar)
+            argv, env = _prep_cmd(
+                python,
+                runscript,
+                opts,
+                runid,
+                inherit_envvar,
+                env_vars=env_vars,
+                tmpdir=tmpdir,
+            )
         hide_stderr = not verbose
         ec, _, stderr = _utils.run_cmd(
             argv,
@@ -251,7 +287,16 @@ def _run_perf_script(
         return pyperf.BenchmarkSuite.load(tmp)
 
 
-def _prep_cmd(python, script, opts, runid, on_set_envvar=None):
+def _prep_cmd(
+    python,
+    script,
+    opts,
+    runid,
+    on_set_envvar=None,
+    *,
+    env_vars=None,
+    tmpdir=None,
+):
     # Populate the environment variables.
     env = dict(os.environ)
 
@@ -263,6 +308,14 @@ def _prep_cmd(python, script, opts, runid, on_set_envvar=None):
     # on_set_envvar() may update "opts" so all calls to set_envvar()
     # must happen before building argv.
     set_envvar("PYPERFORMANCE_RUNID", str(runid))
+    # Resources private to the benchmark, so that benchmarks can run
+    # in parallel on the same host
+    if tmpdir:
+        for name in ("TMPDIR", "TEMP", "TMP"):
+            set_envvar(name, tmpdir)
+    # Variables read by pyperf hooks in the worker processes
+    for name, value in (env_vars or {}).items():
+        set_envvar(name, value)
 
     # Build argv.
     argv = [
@@ -29,6 +29,8 @@ TOOL_FIELDS = {
     "datadir": None,
     "runscript": None,
     "extra_opts": None,
+    "importtime_args": None,
+    "params": None,
 }
 
 
@@ -43,6 +45,8 @@ TOOL_FIELDS = {
 #    datadir
 #    runscript
 #    extra_opts
+#    importtime_args
+#    params
 
 
 def load_metadata(metafile, defaults=None):
@@ -227,13 +231,26 @@ def _resolve_value(field, value, rootdir):
         if not os.path.isabs(value):
             value = os.path.join(rootdir, value)
         _utils.check_file(value)
-    elif field == "extra_opts":
+    elif field in ("extra_opts", "importtime_args"):
         if isinstance(value, str):
-            raise TypeError(f"extra_opts should be a list of strings, got {value!r}")
+            raise TypeError(f"{field} should be a list of strings, got {value!r}")
         for opt in value:
             if not opt or not isinstance(opt, str):
+                raise TypeError(f"{field} should be a list of strings, got {value!r}")
+    elif field == "params":
+        # {name: [default sweep values]}
+        if not isinstance(value, dict):
+            raise TypeError(f"params should be a table, got {value!r}")
+        for name, values in value.items():
+            _utils.check_name(name)
+            if (
+                not isinstance(values, list)
+                or not values
+                or not all(isinstance(v, int) and v > 0 for v in values)
+            ):
                 raise TypeError(
-                    f"extra_opts should be a list of strings, got {value!r}"
+                    f"params.{name} should be a list of positive integers,"
+                    f" got {values!r}"
                 )
     else:
         raise NotImplementedError(field)
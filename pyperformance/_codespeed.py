@@ -0,0 +1,289 @@
+"""A minimal local Codespeed-compatible result server.
+
+It implements the result/add/json/ endpoint used by the "upload"
+command (and by "compile" when upload is enabled), stores results in
+a SQLite database and serves them back as JSON for dashboards.
+"""
+
+__all__ = [
+    "ResultDatabase",
+    "create_server",
+]
+
+
+import datetime
+import gzip
+import json
+import sqlite3
+import threading
+import urllib.parse
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8000
+DEFAULT_DATABASE = "results.sqlite3"
+
+# Keys of a result, as sent by BenchmarkRevision.encode_benchmark()
+REQUIRED_KEYS = (
+    "commitid",
+    "branch",
+    "project",
+    "executable",
+    "benchmark",
+    "environment",
+    "result_value",
+)
+OPTIONAL_KEYS = (
+    "revision_date",
+    "result_date",
+    "std_dev",
+    "min",
+    "max",
+)
+FILTER_KEYS = (
+    "project",
+    "environment",
+    "executable",
+    "branch",
+    "benchmark",
+    "commitid",
+)
+NUMBER_KEYS = ("result_value", "std_dev", "min", "max")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    project TEXT NOT NULL,
+    environment TEXT NOT NULL,
+    executable TEXT NOT NULL,
+    branch TEXT NOT NULL,
+    benchmark TEXT NOT NULL,
+    commitid TEXT NOT NULL,
+    revision_date TEXT,
+    result_date TEXT NOT NULL,
+    result_value REAL NOT NULL,
+    std_dev REAL,
+    min REAL,
+    max REAL,
+    -- Uploading the same result twice replaces it
+    UNIQUE (project, environment, executable, branch, benchmark, commitid)
+);
+CREATE INDEX IF NOT EXISTS results_timeline
+    ON results (benchmark, environment, executable, branch, revision_date);
+"""
+COLUMNS = (*REQUIRED_KEYS, *OPTIONAL_KEYS)
+
+
+class InvalidResultError(ValueError):
+    pass
+
+
+def check_result(data):
+    if not isinstance(data, dict):
+        raise InvalidResultError(f"expected a JSON object, got {data!r}")
+    missing = [key for key in REQUIRED_KEYS if data.get(key) in (None, "")]
+    if missing:
+        raise InvalidResultError(f"missing keys: {', '.join(missing)}")
+
+    result = {}
+    for key in COLUMNS:
+        value = data.get(key)
+        if key in NUMBER_KEYS and value is not None:
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                raise InvalidResultError(f"invalid {key}: {value!r}")
+        elif value is not None:
+            value = str(value)
+        result[key] = value
+    if not result["result_date"]:
+        result["result_date"] = datetime.datetime.now().isoformat()
+    return result
+
+
+class ResultDatabase:
+    """Benchmark results stored in a SQLite database."""
+
+    def __init__(self, filename):
+        self.filename = filename
+        # A single connection is shared by the threads of the server
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(filename, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.executescript(SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def add_results(self, results):
+        """Store a batch of results in a single transaction.
+
+        All results are checked before any of them is stored.
+        Return the number of stored results.
+        """
+        rows = [check_result(data) for data in results]
+        columns = ", ".join(COLUMNS)
+        placeholders = ", ".join(f":{key}" for key in COLUMNS)
+        sql = f"INSERT OR REPLACE INTO results ({columns}) VALUES ({placeholders})"
+        with self._lock, self._conn:
+            self._conn.executemany(sql, rows)
+        return len(rows)
+
+    def _select(self, sql, params=()):
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(sql, params)]
+
+    def get_results(self, **filters):
+        where = []
+        params = []
+        for key in FILTER_KEYS:
+            value = filters.get(key)
+            if value:
+                where.append(f"{key} = ?")
+                params.append(value)
+        sql = f"SELECT {', '.join(COLUMNS)} FROM results"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY revision_date, benchmark"
+        return self._select(sql, params)
+
+    def get_names(self, key):
+        if key not in FILTER_KEYS:
+            raise ValueError(f"unsupported key {key!r}")
+        rows = self._select(f"SELECT DISTINCT {key} FROM results ORDER BY {key}")
+        return [row[key] for row in rows]
+
+    def get_timeline(self, benchmark, *, revs=None, **filters):
+        """Return the trend of a benchmark.
+
+        There is one timeline per (project, environment, executable,
+        branch) with the last revs results, ordered by revision date.
+        """
+        timelines = {}
+        for result in self.get_results(benchmark=benchmark, **filters):
+            key = (
+                result["project"],
+                result["environment"],
+                result["executable"],
+                result["branch"],
+            )
+            timelines.setdefault(key, []).append(
+                [
+                    result["revision_date"],
+                    result["result_value"],
+                    result["std_dev"],
+                    result["commitid"],
+                ]
+            )
+        data = []
+        for key, points in sorted(timelines.items()):
+            if revs:
+                points = points[-revs:]
+            project, environment, executable, branch = key
+            data.append(
+                {
+                    "project": project,
+                    "environment": environment,
+                    "executable": executable,
+                    "branch": branch,
+                    "points": points,
+                }
+            )
+        return {"benchmark": benchmark, "timelines": data}
+
+
+class ResultRequestHandler(BaseHTTPRequestHandler):
+    # set by create_server()
+    database = None
+
+    def send_text(self, status, text, content_type="text/plain"):
+        body = text.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json(self, data):
+        self.send_text(HTTPStatus.OK, json.dumps(data), "application/json")
+
+    def read_form(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length)
+        if self.headers.get("Content-Encoding") == "gzip":
+            # sent by the upload spool when compress is enabled
+            body = gzip.decompress(body)
+        body = body.decode("utf-8")
+        form = urllib.parse.parse_qs(body, keep_blank_values=True)
+        return {key: values[-1] for key, values in form.items()}
+
+    def do_POST(self):
+        path = urllib.parse.urlsplit(self.path).path
+        try:
+            form = self.read_form()
+            if path == "/result/add/json/":
+                results = json.loads(form.get("json", ""))
+                if not isinstance(results, list):
+                    raise InvalidResultError("expected a JSON list of results")
+            elif path == "/result/add/":
+                results = [form]
+            else:
+                self.send_text(HTTPStatus.NOT_FOUND, f"unknown URL {path}")
+                return
+            count = self.database.add_results(results)
+        except (ValueError, UnicodeDecodeError, OSError, EOFError) as exc:
+            # InvalidResultError and json.JSONDecodeError are ValueError,
+            # gzip.BadGzipFile is an OSError
+            self.send_text(HTTPStatus.BAD_REQUEST, str(exc))
+            return
+        # Codespeed replies with 202 Accepted
+        self.send_text(
+            HTTPStatus.ACCEPTED, f"All result data saved successfully ({count})"
+        )
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        query = urllib.parse.parse_qs(url.query)
+        filters = {key: values[-1] for key, values in query.items()}
+        if url.path == "/api/results/":
+            self.send_json(self.database.get_results(**filters))
+        elif url.path == "/api/benchmarks/":
+            self.send_json(self.database.get_names("benchmark"))
+        elif url.path == "/api/environments/":
+            self.send_json(self.database.get_names("environment"))
+        elif url.path == "/timeline/json/":
+            benchmark = filters.pop("benchmark", None)
+            if not benchmark:
+                self.send_text(HTTPStatus.BAD_REQUEST, "missing benchmark")
+                return
+            try:
+                revs = int(filters.pop("revs", 0))
+            except ValueError:
+                self.send_text(HTTPStatus.BAD_REQUEST, "invalid revs")
+                return
+            self.send_json(self.database.get_timeline(benchmark, revs=revs, **filters))
+        else:
+            self.send_text(HTTPStatus.NOT_FOUND, f"unknown URL {url.path}")
+
+
+def create_server(database, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    handler = type(
+        "ResultRequestHandler",
+        (ResultRequestHandler,),
+        {"database": database},
+    )
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def serve(database_filename, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    database = ResultDatabase(database_filename)
+    server = create_server(database, host, port)
+    host, port = server.server_address[:2]
+    print(f"Serving results of {database_filename} on http://{host}:{port}/")
+    print(f"(set url = http://{host}:{port}/ in the [upload] section)")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        database.close()
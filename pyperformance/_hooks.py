@@ -0,0 +1,498 @@
+"""pyperf hooks provided by pyperformance.
+
+Hooks are registered as "pyperf.hook" entry points in pyproject.toml and
+selected with "pyperformance run --hook NAME". They run in the worker
+processes, around the benchmark code.
+"""
+
+__all__ = [
+    "alloc_profile",
+    "check_perf_stat",
+    "gc_stats",
+    "get_hook_names",
+    "latency",
+    "perf_stat",
+    "rusage",
+    "sampler",
+]
+
+
+import collections
+import fnmatch
+import gc
+import json
+import os.path
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import uuid
+
+from pyperf._hooks import HookBase, HookError
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+# Events counted by the perf_stat hook, set by "pyperformance run --perf-stat"
+PERF_STAT_EVENTS_ENV = "PYPERFORMANCE_PERF_STAT_EVENTS"
+
+# Directory where the sampler hook writes collapsed stacks, set by
+# "pyperformance profile"
+PROFILE_DIR_ENV = "PYPERFORMANCE_PROFILE_DIR"
+SAMPLER_INTERVAL = 0.001
+
+# Directory where the alloc_profile hook writes profiles, set by
+# "pyperformance run --alloc-profile"
+ALLOC_PROFILE_DIR_ENV = "PYPERFORMANCE_ALLOC_PROFILE_DIR"
+ALLOC_PROFILE_INTERVAL = 0.001
+ALLOC_PROFILE_TOP = 20
+# Take a new snapshot when the traced memory grew by 10%
+ALLOC_PROFILE_GROWTH = 1.1
+
+GC_GENERATIONS = 3
+
+# Name of the list of the benchmark script where request/response
+# benchmarks record the latency of each request, read by the latency hook
+LATENCY_LIST = "LATENCIES"
+# Optional list where asyncio benchmarks record the duration of each event
+# loop iteration
+LOOP_LATENCY_LIST = "LOOP_LATENCIES"
+LATENCY_PERCENTILES = ((50, "p50"), (90, "p90"), (99, "p99"), (99.9, "p999"))
+
+RUSAGE_FIELDS = ("utime", "stime", "nvcsw", "nivcsw", "minflt", "majflt")
+
+
+def get_hook_names():
+    """Return the names of the hooks defined in this module."""
+    return [
+        name
+        for name in __all__
+        if isinstance(globals()[name], type) and issubclass(globals()[name], HookBase)
+    ]
+
+
+def get_max_rss():
+    # VmHWM is the peak resident set size of the process
+    try:
+        with open("/proc/self/status", encoding="ascii") as fp:
+            for line in fp:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if os.path.exists("/proc"):
+        # kilobytes on Linux
+        max_rss *= 1024
+    return max_rss
+
+
+class rusage(HookBase):
+    """Record the resource usage of the benchmark code.
+
+    Store in the run metadata the user and system CPU time, the voluntary
+    and involuntary context switches, and the minor and major page faults
+    of the worker process while computing values, and its peak RSS.
+    """
+
+    def __init__(self):
+        if resource is None:
+            raise HookError("rusage requires the resource module")
+        self._totals = dict.fromkeys(RUSAGE_FIELDS, 0)
+        self._start = None
+
+    def __enter__(self):
+        self._start = resource.getrusage(resource.RUSAGE_SELF)
+
+    def __exit__(self, _exc_type, _exc_value, _traceback):
+        end = resource.getrusage(resource.RUSAGE_SELF)
+        for field in RUSAGE_FIELDS:
+            attr = "ru_" + field
+            self._totals[field] += getattr(end, attr) - getattr(self._start, attr)
+
+    def teardown(self, metadata):
+        # The hook is torn down after warmups and after values: the metadata
+        # of the values override the metadata of the warmups.
+        for field, value in self._totals.items():
+            metadata["rusage_" + field] = value
+        metadata["rusage_maxrss"] = get_max_rss()
+
+
+def percentile(sorted_values, percent):
+    # Nearest-rank method
+    index = max(int(len(sorted_values) * percent / 100.0 + 0.5) - 1, 0)
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+
+class gc_stats(HookBase):
+    """Record the garbage collections of the benchmark code.
+
+    A gc.callbacks callback records the collections per generation, the
+    collected and uncollectable objects, and the duration of each pause
+    while computing values. Store the counts, the total pause time and
+    the median, 99th percentile and maximum pause in the run metadata.
+    """
+
+    def __init__(self):
+        self.collections = [0] * GC_GENERATIONS
+        self.collected = 0
+        self.uncollectable = 0
+        self.pauses = []
+        self._start = None
+
+    def _callback(self, phase, info):
+        if phase == "start":
+            self._start = time.perf_counter()
+            return
+        if self._start is None:
+            return
+        self.pauses.append(time.perf_counter() - self._start)
+        self._start = None
+        generation = min(info["generation"], GC_GENERATIONS - 1)
+        self.collections[generation] += 1
+        self.collected += info["collected"]
+        self.uncollectable += info["uncollectable"]
+
+    def __enter__(self):
+        self._start = None
+        gc.callbacks.append(self._callback)
+
+    def __exit__(self, _exc_type, _exc_value, _traceback):
+        gc.callbacks.remove(self._callback)
+
+    def teardown(self, metadata):
+        # Set all keys: the metadata of the values override the metadata
+        # of the warmups
+        for generation, count in enumerate(self.collections):
+            metadata["gc_collections_%s" % generation] = count
+        metadata["gc_collected"] = self.collected
+        metadata["gc_uncollectable"] = self.uncollectable
+        pauses = sorted(self.pauses)
+        metadata["gc_pause_total"] = sum(pauses)
+        if pauses:
+            metadata["gc_pause_p50"] = percentile(pauses, 50)
+            metadata["gc_pause_p99"] = percentile(pauses, 99)
+            metadata["gc_pause_max"] = pauses[-1]
+        else:
+            for key in ("gc_pause_p50", "gc_pause_p99", "gc_pause_max"):
+                metadata[key] = 0.0
+
+
+class latency(HookBase):
+    """Record the latency percentiles of request/response benchmarks.
+
+    The benchmark script appends the latency of each request in seconds
+    to its LATENCIES list. Store the number of requests, the throughput
+    and the p50, p90, p99 and p999 latencies of the values in the run
+    metadata.
+
+    If the script also has a LOOP_LATENCIES list of event loop iteration
+    durations, store their percentiles in the loop_latency_* metadata.
+
+    The hook does nothing for benchmarks without a LATENCIES list, so that
+    "pyperformance run --hook latency" can run any benchmark.
+    """
+
+    def __init__(self):
+        main = sys.modules["__main__"]
+        self.recorded = getattr(main, LATENCY_LIST, None)
+        if not isinstance(self.recorded, list):
+            self.recorded = None
+        self.loop_recorded = getattr(main, LOOP_LATENCY_LIST, None)
+        if not isinstance(self.loop_recorded, list):
+            self.loop_recorded = None
+        self.latencies = []
+        self.loop_latencies = []
+        self.elapsed = 0.0
+        self._start = None
+
+    def _records(self):
+        if self.recorded is None:
+            return
+        yield self.recorded, self.latencies
+        if self.loop_recorded is not None:
+            yield self.loop_recorded, self.loop_latencies
+
+    def __enter__(self):
+        for recorded, _ in self._records():
+            del recorded[:]
+        self._start = time.perf_counter()
+
+    def __exit__(self, _exc_type, _exc_value, _traceback):
+        self.elapsed += time.perf_counter() - self._start
+        for recorded, latencies in self._records():
+            latencies.extend(recorded)
+            del recorded[:]
+
+    def teardown(self, metadata):
+        if self.recorded is None:
+            return
+        latencies = sorted(self.latencies)
+        metadata["latency_requests"] = len(latencies)
+        if latencies:
+            for percent, name in LATENCY_PERCENTILES:
+                metadata["latency_%s" % name] = percentile(latencies, percent)
+            metadata["latency_throughput"] = len(latencies) / self.elapsed
+
+        loop_latencies = sorted(self.loop_latencies)
+        if loop_latencies:
+            metadata["loop_iterations"] = len(loop_latencies)
+            for percent, name in LATENCY_PERCENTILES:
+                metadata["loop_latency_%s" % name] = percentile(loop_latencies, percent)
+
+
+def parse_perf_stat(output):
+    """Parse the CSV output of "perf stat --field-separator=,".
+
+    Return a dict mapping event names to their count. Events which were
+    not counted or are not supported are omitted.
+    """
+    counts = {}
+    for line in output.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        fields = line.split(",")
+        if len(fields) < 3:
+            continue
+        value, event = fields[0], fields[2]
+        try:
+            # "<not counted>" or "<not supported>"
+            counts[event] = int(float(value))
+        except ValueError:
+            continue
+    return counts
+
+
+def check_perf_stat(events):
+    """Check which events "perf stat" can count.
+
+    Return (events, error): the list of countable events and an error
+    message if perf cannot be used at all.
+    """
+    if shutil.which("perf") is None:
+        return [], "perf command not found"
+    cmd = ["perf", "stat", "--field-separator=,", "--events", ",".join(events), "true"]
+    proc = subprocess.run(cmd, capture_output=True, text=True)
+    if proc.returncode:
+        error = proc.stderr.strip().splitlines()
+        return [], error[0] if error else "perf stat failed"
+    counts = parse_perf_stat(proc.stderr)
+    return [event for event in events if event in counts], None
+
+
+class perf_stat(HookBase):
+    """Count hardware events of the benchmark code with "perf stat".
+
+    The comma-separated events are read from the
+    PYPERFORMANCE_PERF_STAT_EVENTS environment variable. Events are only
+    counted while the benchmark code runs, using the perf control FIFO,
+    and their total is stored in the perf_stat_<event> run metadata.
+    """
+
+    def __init__(self):
+        events = os.environ.get(PERF_STAT_EVENTS_ENV)
+        if not events:
+            raise HookError("%s is not set" % PERF_STAT_EVENTS_ENV)
+        if shutil.which("perf") is None:
+            raise HookError("perf command not found")
+
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.output = os.path.join(self.tempdir.name, "perf_stat.csv")
+        ctl_fifo = self.mkfifo("ctl_fifo")
+        ack_fifo = self.mkfifo("ack_fifo")
+        cmd = [
+            "perf",
+            "stat",
+            "--field-separator=,",
+            "--events",
+            events,
+            "--pid",
+            str(os.getpid()),
+            "--output",
+            self.output,
+            # start with events disabled
+            "--delay=-1",
+            "--control",
+            "fifo:%s,%s" % (ctl_fifo, ack_fifo),
+        ]
+        self.perf = subprocess.Popen(
+            cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        self.ctl_fd = open(ctl_fifo, "w")
+        self.ack_fd = open(ack_fifo, "r")
+
+    def mkfifo(self, basename):
+        path = os.path.join(self.tempdir.name, basename)
+        os.mkfifo(path)
+        return path
+
+    def exec_perf_cmd(self, cmd):
+        self.ctl_fd.write("%s\n" % cmd)
+        self.ctl_fd.flush()
+        self.ack_fd.readline()
+
+    def __enter__(self):
+        self.exec_perf_cmd("enable")
+
+    def __exit__(self, _exc_type, _exc_value, _traceback):
+        self.exec_perf_cmd("disable")
+
+    def teardown(self, metadata):
+        try:
+            # perf stat writes its output when interrupted
+            self.perf.send_signal(signal.SIGINT)
+            self.perf.wait(timeout=120)
+            with open(self.output, encoding="utf-8") as fp:
+                counts = parse_perf_stat(fp.read())
+        finally:
+            self.ctl_fd.close()
+            self.ack_fd.close()
+            self.tempdir.cleanup()
+        for event, count in counts.items():
+            metadata["perf_stat_" + event] = count
+
+
+def format_frame(code):
+    filename = os.path.basename(code.co_filename)
+    return "%s (%s:%s)" % (code.co_name, filename, code.co_firstlineno)
+
+
+class sampler(HookBase):
+    """Sample the Python stacks of the benchmark code.
+
+    While the benchmark code runs, a thread samples the stacks of the
+    other threads every millisecond using sys._current_frames(). Stacks
+    are written in the collapsed format ("root;...;leaf count") into the
+    PYPERFORMANCE_PROFILE_DIR directory.
+    """
+
+    def __init__(self):
+        self.directory = os.environ.get(PROFILE_DIR_ENV)
+        if not self.directory:
+            raise HookError("%s is not set" % PROFILE_DIR_ENV)
+        self.stacks = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        ident = threading.get_ident()
+        while not self._stop.wait(SAMPLER_INTERVAL):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == ident:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(format_frame(frame.f_code))
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def __enter__(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+
+    def __exit__(self, _exc_type, _exc_value, _traceback):
+        self._stop.set()
+        self._thread.join()
+
+    def teardown(self, metadata):
+        filename = "stacks.%s.%s.txt" % (os.getpid(), uuid.uuid4().hex)
+        filename = os.path.join(self.directory, filename)
+        with open(filename, "w", encoding="utf-8") as fp:
+            for stack, count in self.stacks.items():
+                print(stack, count, file=fp)
+
+
+def get_top_allocations(snapshot, key):
+    stats = snapshot.statistics("lineno")
+    stats.sort(key=lambda stat: getattr(stat, key), reverse=True)
+    top = []
+    for stat in stats[:ALLOC_PROFILE_TOP]:
+        frame = stat.traceback[0]
+        site = "%s:%s" % (frame.filename, frame.lineno)
+        top.append((site, stat.size, stat.count))
+    return top
+
+
+class alloc_profile(HookBase):
+    """Profile the memory allocations of the benchmark code with tracemalloc.
+
+    tracemalloc only knows the memory blocks which are still allocated, so
+    a thread takes a snapshot each time the traced memory reaches a new
+    peak: the snapshot of the peak tells which code allocates. The profile
+    is written as JSON into the <benchmark name>.json file of the
+    PYPERFORMANCE_ALLOC_PROFILE_DIR directory.
+    """
+
+    def __init__(self):
+        self.directory = os.environ.get(ALLOC_PROFILE_DIR_ENV)
+        if not self.directory:
+            raise HookError("%s is not set" % ALLOC_PROFILE_DIR_ENV)
+        # Ignore memory allocated by tracemalloc and this hook
+        self.filters = [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, threading.__file__),
+            tracemalloc.Filter(False, fnmatch.__file__),
+            tracemalloc.Filter(False, __file__),
+        ]
+        for trace_filter in self.filters:
+            # Compile and cache the patterns before tracing memory
+            fnmatch.fnmatch("", trace_filter.filename_pattern)
+        self.peak_size = 0
+        self.peak_snapshot = None
+        self.peak_snapshot_size = 0
+        self.retained = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _take_snapshot(self):
+        return tracemalloc.take_snapshot().filter_traces(self.filters)
+
+    def _watch(self):
+        while not self._stop.wait(ALLOC_PROFILE_INTERVAL):
+            current, _ = tracemalloc.get_traced_memory()
+            if current > self.peak_snapshot_size * ALLOC_PROFILE_GROWTH:
+                self.peak_snapshot = self._take_snapshot()
+                self.peak_snapshot_size = current
+
+    def __enter__(self):
+        tracemalloc.start()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, daemon=True)
+        self._thread.start()
+
+    def __exit__(self, _exc_type, _exc_value, _traceback):
+        self._stop.set()
+        self._thread.join()
+        _, peak = tracemalloc.get_traced_memory()
+        self.peak_size = max(self.peak_size, peak)
+        # Blocks allocated by the benchmark code and not released
+        self.retained = self._take_snapshot()
+        if self.peak_snapshot is None:
+            self.peak_snapshot = self.retained
+        tracemalloc.stop()
+
+    def teardown(self, metadata):
+        if self.retained is None:
+            return
+        peak_stats = self.peak_snapshot.statistics("filename")
+        retained_stats = self.retained.statistics("filename")
+        profile = {
+            "peak_size": self.peak_size,
+            "peak_blocks": sum(stat.count for stat in peak_stats),
+            "retained_size": sum(stat.size for stat in retained_stats),
+            "retained_blocks": sum(stat.count for stat in retained_stats),
+            "top_size": get_top_allocations(self.peak_snapshot, "size"),
+            "top_count": get_top_allocations(self.peak_snapshot, "count"),
+        }
+        filename = os.path.join(self.directory, "%s.json" % metadata["name"])
+        with open(filename, "w", encoding="utf-8") as fp:
+            json.dump(profile, fp)
@@ -129,6 +129,6 @@ def install_requirements(reqs, *extra, upgrade=True, **kwargs):
     return run_pip("install", *args, **kwargs)
 
 
-def install_editable(projectroot, **kwargs):
+def install_editable(projectroot, *args, **kwargs):
     """Install the given project as an "editable" install."""
-    return run_pip("install", "-e", projectroot, **kwargs)
+    return run_pip("install", *args, "-e", projectroot, **kwargs)
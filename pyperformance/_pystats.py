@@ -0,0 +1,180 @@
+"""Collect the statistics of Python built with --enable-pystats.
+
+The pystats pyperf hook turns statistics on while the benchmark code
+runs. Each worker process dumps its statistics into a text file of the
+PYSTATS_DIR directory when it exits: one "name : value" line per counter,
+for example "opcode[LOAD_ATTR].specialization.hit : 1234".
+
+PYSTATS_DIR is shared by all processes. The stats files of a benchmark are
+the files created while it ran, and lock_stats_dir() prevents two
+pyperformance processes from collecting stats at the same time.
+"""
+
+__all__ = [
+    "PystatsLockedError",
+    "check_pystats",
+    "get_stats_files",
+    "lock_stats_dir",
+    "move_stats",
+    "parse_stats",
+    "read_stats",
+    "summarize_stats",
+]
+
+
+import collections
+import contextlib
+import os
+import os.path
+import re
+import shutil
+import subprocess
+
+from . import _utils
+
+if _utils.MS_WINDOWS:
+    PYSTATS_DIR = "c:\\temp\\py_stats"
+else:
+    PYSTATS_DIR = "/tmp/py_stats"
+LOCK_NAME = "pyperformance.lock"
+
+# "opcode[LOAD_ATTR].specialization.hit"
+OPCODE_STAT_REGEX = re.compile(r"^opcode\[[^\]]+\]\.(.+)$")
+# "GC[0] collections"
+GC_STAT_REGEX = re.compile(r"^GC\[\d+\] (.+)$")
+
+# Summary counters: (name, opcode stat) summed over all opcodes
+OPCODE_SUMMARY = (
+    ("instructions", "execution_count"),
+    ("specialization_success", "specialization.success"),
+    ("specialization_failure", "specialization.failure"),
+    ("specialization_hit", "specialization.hit"),
+    ("specialization_miss", "specialization.miss"),
+    ("specialization_deopt", "specialization.deopt"),
+)
+# Summary counters: (name, stat)
+STAT_SUMMARY = (
+    ("python_calls", "Calls to PyEval_EvalDefault"),
+    ("inlined_calls", "Calls to Python functions inlined"),
+    ("frame_objects", "Frame objects created"),
+    ("object_allocations", "Object allocations"),
+    ("object_freelist_allocations", "Object allocations from freelist"),
+    ("object_frees", "Object frees"),
+)
+# Summary counters: (name, GC stat) summed over all generations
+GC_SUMMARY = (
+    ("gc_collections", "collections"),
+    ("gc_objects_collected", "objects collected"),
+)
+
+
+def check_pystats(python):
+    """Check if python was built with --enable-pystats."""
+    code = "import sys; sys.exit(not hasattr(sys, '_stats_on'))"
+    proc = subprocess.run([python, "-c", code])
+    return proc.returncode == 0
+
+
+class PystatsLockedError(Exception):
+    """Another process is collecting stats in PYSTATS_DIR."""
+
+
+def _lock_file(fd):
+    if _utils.MS_WINDOWS:
+        import msvcrt
+
+        msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+    else:
+        import fcntl
+
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+
+@contextlib.contextmanager
+def lock_stats_dir():
+    """Lock PYSTATS_DIR for the stats collection of the current process.
+
+    Raise PystatsLockedError if another process holds the lock. The lock is
+    released by the operating system if the process dies, so a lock file
+    left by a killed process doesn't block the next runs.
+    """
+    os.makedirs(PYSTATS_DIR, exist_ok=True)
+    path = os.path.join(PYSTATS_DIR, LOCK_NAME)
+    fd = os.open(path, os.O_RDWR | os.O_CREAT)
+    try:
+        try:
+            _lock_file(fd)
+        except OSError:
+            raise PystatsLockedError(
+                "%s is used by another pyperformance process" % PYSTATS_DIR
+            )
+        yield
+    finally:
+        # Closing the file releases the lock
+        os.close(fd)
+
+
+def get_stats_files():
+    try:
+        names = os.listdir(PYSTATS_DIR)
+    except FileNotFoundError:
+        return set()
+    return {os.path.join(PYSTATS_DIR, name) for name in names if name != LOCK_NAME}
+
+
+def move_stats(filenames, directory):
+    """Move stats files into directory and return their new paths."""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for filename in sorted(filenames):
+        path = os.path.join(directory, os.path.basename(filename))
+        shutil.move(filename, path)
+        paths.append(path)
+    return paths
+
+
+def parse_stats(lines):
+    """Sum the counters of stats files lines into a dict."""
+    stats = collections.Counter()
+    for line in lines:
+        name, sep, value = line.rpartition(":")
+        if not sep:
+            continue
+        try:
+            stats[name.strip()] += int(value)
+        except ValueError:
+            continue
+    return stats
+
+
+def read_stats(filenames):
+    stats = collections.Counter()
+    for filename in filenames:
+        with open(filename, encoding="utf-8") as fp:
+            stats.update(parse_stats(fp))
+    return stats
+
+
+def summarize_stats(stats):
+    """Summarize the specialization, call, object and GC statistics.
+
+    Return a dict mapping summary names to counters. Counters missing
+    from stats are omitted.
+    """
+    summary = {}
+    opcode_names = dict((stat, name) for name, stat in OPCODE_SUMMARY)
+    gc_names = dict((stat, name) for name, stat in GC_SUMMARY)
+    for key, value in stats.items():
+        match = OPCODE_STAT_REGEX.match(key)
+        if match and match.group(1) in opcode_names:
+            name = opcode_names[match.group(1)]
+            summary[name] = summary.get(name, 0) + value
+            continue
+        match = GC_STAT_REGEX.match(key)
+        if match and match.group(1) in gc_names:
+            name = gc_names[match.group(1)]
+            summary[name] = summary.get(name, 0) + value
+    for name, stat in STAT_SUMMARY:
+        if stat in stats:
+            summary[name] = stats[stat]
+    return summary
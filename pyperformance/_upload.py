@@ -0,0 +1,221 @@
+"""On-disk spool of results waiting to be uploaded to a Codespeed website.
+
+Results are first written into the spool, then sent in batches.  A
+results file is only moved into the uploaded directory once the
+server acknowledged its batch, so results survive an unreachable
+website and are sent again by the next drain.  A drain stops at the first
+batch which cannot be sent and leaves the next batches in the spool.
+
+When the server rejects a batch, its files are sent again one by one to
+find the rejected ones.  Rejected results are moved into the failed/
+subdirectory of the spool, so that they don't block the next drains.
+"""
+
+__all__ = [
+    "UploadError",
+    "UploadRejectedError",
+    "UploadSpool",
+]
+
+
+import gzip
+import hashlib
+import json
+import os
+import os.path
+import time
+import uuid
+from http.client import HTTPException
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+
+MAX_RETRY_DELAY = 300.0
+
+
+class UploadError(Exception):
+    pass
+
+
+class UploadRejectedError(UploadError):
+    """The server rejected the results: sending them again is useless."""
+
+
+def get_idempotency_key(result):
+    return "%s:%s:%s" % (
+        result.get("commitid"),
+        result.get("benchmark"),
+        result.get("environment"),
+    )
+
+
+class UploadSpool:
+    def __init__(self, conf, logger):
+        self.directory = conf.upload_spool_dir
+        self.failed_dir = os.path.join(self.directory, "failed")
+        self.uploaded_dir = conf.uploaded_json_dir
+        self.logger = logger
+        self.compress = conf.upload_compress
+        self.batch_size = conf.upload_batch_size
+        self.retries = conf.upload_retries
+        self.retry_delay = conf.upload_retry_delay
+
+        url = conf.url
+        if not url.endswith("/"):
+            url += "/"
+        self.url = url + "result/add/json/"
+
+    def enqueue(self, filename, upload_filename, results):
+        """Add the encoded results of a JSON file to the spool."""
+        os.makedirs(self.directory, exist_ok=True)
+        entry = {
+            "filename": os.path.abspath(filename),
+            "upload_filename": os.path.abspath(upload_filename),
+            "results": results,
+        }
+        # Prefix the name with a timestamp to upload the oldest results
+        # first, and with a random part to never replace a pending entry
+        name = "%d-%s-%s" % (
+            time.time_ns(),
+            uuid.uuid4().hex[:8],
+            os.path.basename(filename),
+        )
+        path = os.path.join(self.directory, name)
+        # Write a temporary file and rename it to never leave a truncated
+        # entry in the spool
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fp:
+            json.dump(entry, fp)
+            fp.flush()
+            os.fsync(fp.fileno())
+        os.replace(tmp_path, path)
+        self.logger.error(
+            "Add %s results to the upload spool %s" % (len(results), path)
+        )
+        return path
+
+    def get_pending(self):
+        if not os.path.isdir(self.directory):
+            return []
+        paths = [
+            os.path.join(self.directory, name)
+            for name in sorted(os.listdir(self.directory))
+            if not name.endswith(".tmp")
+        ]
+        # Skip the failed/ directory
+        return [path for path in paths if os.path.isfile(path)]
+
+    def encode_batch(self, entries):
+        # A result uploaded twice replaces the previous one: only keep the
+        # most recent result per idempotency key
+        results = {}
+        for entry in entries:
+            for result in entry["results"]:
+                results[get_idempotency_key(result)] = result
+        keys = sorted(results)
+
+        body = urlencode({"json": json.dumps(list(results.values()))})
+        body = body.encode("utf-8")
+        headers = {
+            "Content-Type": "application/x-www-form-urlencoded",
+            "Idempotency-Key": hashlib.sha256("\n".join(keys).encode()).hexdigest(),
+        }
+        if self.compress:
+            body = gzip.compress(body)
+            headers["Content-Encoding"] = "gzip"
+        return body, headers
+
+    def send(self, body, headers):
+        delay = self.retry_delay
+        for attempt in range(self.retries + 1):
+            try:
+                request = Request(self.url, data=body, headers=headers)
+                with urlopen(request) as response:
+                    return response.read().decode("utf-8", "replace")
+            except HTTPError as err:
+                errmsg = err.read().decode("utf-8", "replace")
+                err.close()
+                error = "HTTP Error: %s: %s" % (err, errmsg)
+                # Only server errors and rate limiting are temporary
+                if err.code < 500 and err.code != 429:
+                    raise UploadRejectedError(error)
+            except (OSError, HTTPException) as exc:
+                # HTTPException: the connection was closed while reading the
+                # response (RemoteDisconnected, IncompleteRead, ...)
+                error = "Connection error: %s" % exc
+
+            if attempt == self.retries:
+                raise UploadError(error)
+            self.logger.error("Upload failed (%s), retry in %.1f sec" % (error, delay))
+            time.sleep(delay)
+            delay = min(delay * 2, MAX_RETRY_DELAY)
+
+    def acknowledge(self, path, entry):
+        filename = entry["filename"]
+        upload_filename = entry["upload_filename"]
+        if os.path.exists(filename):
+            os.makedirs(os.path.dirname(upload_filename), exist_ok=True)
+            self.logger.error("Move %s to %s" % (filename, upload_filename))
+            os.replace(filename, upload_filename)
+        os.unlink(path)
+
+    def reject(self, path):
+        os.makedirs(self.failed_dir, exist_ok=True)
+        failed_path = os.path.join(self.failed_dir, os.path.basename(path))
+        self.logger.error("Move rejected results %s to %s" % (path, failed_path))
+        os.replace(path, failed_path)
+
+    def upload_batch(self, paths, uploaded):
+        """Upload the results of the spool entries paths.
+
+        Append the uploaded JSON files to uploaded. Raise UploadError if the
+        server cannot be reached.
+        """
+        entries = []
+        for path in paths:
+            with open(path, encoding="utf-8") as fp:
+                entries.append(json.load(fp))
+        nresult = sum(len(entry["results"]) for entry in entries)
+        self.logger.error(
+            "Upload %s results of %s files to %s" % (nresult, len(entries), self.url)
+        )
+
+        body, headers = self.encode_batch(entries)
+        try:
+            response = self.send(body, headers)
+        except UploadRejectedError as exc:
+            self.logger.error("ERROR: %s" % exc)
+            if len(paths) == 1:
+                self.reject(paths[0])
+                return
+            # Only reject the entries that the server rejects on their own
+            self.logger.error("Upload the %s files one by one" % len(paths))
+            for path in paths:
+                self.upload_batch([path], uploaded)
+            return
+        self.logger.error('Response: "%s"' % response)
+
+        for path, entry in zip(paths, entries):
+            self.acknowledge(path, entry)
+            uploaded.append(entry["filename"])
+
+    def drain(self):
+        """Upload all pending results.
+
+        Stop at the first batch which cannot be sent: the next batches are
+        kept in the spool. Return the list of the JSON files which have been
+        uploaded.
+        """
+        pending = self.get_pending()
+        uploaded = []
+        for start in range(0, len(pending), self.batch_size):
+            paths = pending[start : start + self.batch_size]
+            try:
+                self.upload_batch(paths, uploaded)
+            except UploadError as exc:
+                self.logger.error("ERROR: %s" % exc)
+                self.logger.error(
+                    "Results kept in the upload spool %s" % self.directory
+                )
+                break
+        return uploaded
@@ -10,11 +10,16 @@ from pyperformance.commands import (
     cmd_compare,
     cmd_compile,
     cmd_compile_all,
+    cmd_importtime,
     cmd_list,
     cmd_list_groups,
+    cmd_profile,
+    cmd_report,
+    cmd_result_server,
     cmd_run,
     cmd_show,
     cmd_upload,
+    cmd_upload_drain,
     cmd_venv_create,
     cmd_venv_recreate,
     cmd_venv_remove,
@@ -27,6 +32,45 @@ def comma_separated(values):
     return list(filter(None, values))
 
 
+def weights(values):
+    result = {}
+    for value in comma_separated(values):
+        name, sep, weight = value.partition("=")
+        name = name.strip()
+        try:
+            weight = float(weight)
+        except ValueError:
+            weight = None
+        if not sep or not name or weight is None or weight < 0:
+            raise argparse.ArgumentTypeError(
+                f"invalid weight {value!r}, expected NAME=WEIGHT"
+            )
+        result[name] = weight
+    return result
+
+
+def sweep(value):
+    # "size=10,100,1000", or "size" for the default values of benchmarks
+    name, _, values = value.partition("=")
+    name = name.strip()
+    try:
+        values = [check_positive(item) for item in comma_separated(values)]
+    except (ValueError, argparse.ArgumentTypeError):
+        values = None
+    if not name or values is None:
+        raise argparse.ArgumentTypeError(
+            f"invalid sweep {value!r}, expected PARAM or PARAM=VALUE,..."
+        )
+    return name, values
+
+
+def check_non_negative(value):
+    value = int(value)
+    if value < 0:
+        raise argparse.ArgumentTypeError("Argument must a be non-negative integer.")
+    return value
+
+
 def check_positive(value):
     value = int(value)
     if value <= 0:
@@ -142,6 +186,47 @@ def parse_args():
         metavar=f"{', '.join(x for x in hook_names if not x.startswith('_'))}",
         help="Apply the given pyperf hook(s) when running each benchmark",
     )
+    cmd.add_argument(
+        "--perf-stat",
+        metavar="EVENTS",
+        type=comma_separated,
+        default=None,
+        help=(
+            "Count the comma-separated events (ex: instructions,cycles) of"
+            " each benchmark with 'perf stat' on Linux. Events which"
+            " cannot be counted are ignored."
+        ),
+    )
+    cmd.add_argument(
+        "--pystats",
+        metavar="DIRECTORY",
+        default=None,
+        help=(
+            "Collect the statistics of a Python built with --enable-pystats"
+            " (specialization, calls, objects) and move the stats files of"
+            " each benchmark into DIRECTORY/<benchmark>/"
+        ),
+    )
+    cmd.add_argument(
+        "--alloc-profile",
+        action="store_true",
+        help=(
+            "Run an extra untimed pass of each benchmark with tracemalloc"
+            " and write the top allocation sites next to the output file"
+            " (FILENAME.alloc.json)"
+        ),
+    )
+    cmd.add_argument(
+        "--sweep",
+        metavar="PARAM[=VALUE,...]",
+        type=sweep,
+        default=None,
+        help=(
+            "Run each benchmark with the PARAM parameter (ex: size) once per"
+            " value, or once per default value of the benchmark. Benchmarks"
+            " without the parameter are skipped."
+        ),
+    )
     cmd.add_argument(
         "--warmups",
         type=int,
@@ -167,7 +252,8 @@ def parse_args():
         help=(
             "What style the benchmark output should take."
             " Valid options are 'normal' and 'table'."
-            " Default is normal."
+            " Default is normal. A table is always used"
+            " when comparing more than two files."
         ),
     )
     cmd.add_argument(
@@ -177,12 +263,221 @@ def parse_args():
         default=None,
         help=(
             "Name of a file the results will be written to,"
-            " as a three-column CSV file containing minimum"
-            " runtimes for each benchmark."
+            " as a CSV file containing mean runtimes for each"
+            " benchmark, with one column per file."
+        ),
+    )
+    cmd.add_argument(
+        "--memory",
+        action="store_true",
+        help=(
+            "Also compare the peak memory usage (maximum RSS) of the"
+            " worker processes, recorded while timing the benchmarks."
+            " Results of --track-memory runs are already memory usages."
+        ),
+    )
+    cmd.add_argument(
+        "--rusage",
+        action="store_true",
+        help=(
+            "Also compare the resource usage recorded by the rusage hook"
+            " (run --hook rusage): CPU time, context switches, page faults"
+            " and maximum RSS."
+        ),
+    )
+    cmd.add_argument(
+        "--perf-stat",
+        action="store_true",
+        help=(
+            "Also compare the perf events counted by 'run --perf-stat',"
+            " per benchmark iteration."
+        ),
+    )
+    cmd.add_argument(
+        "--pystats",
+        action="store_true",
+        help=(
+            "Also compare the Python statistics collected by"
+            " 'run --pystats', per benchmark iteration."
+        ),
+    )
+    cmd.add_argument(
+        "--alloc-profile",
+        action="store_true",
+        help=(
+            "Also compare the memory blocks allocated by the benchmarks,"
+            " recorded by 'run --alloc-profile'."
+        ),
+    )
+    cmd.add_argument(
+        "--gc-stats",
+        action="store_true",
+        help=(
+            "Also compare the garbage collections and GC pauses recorded"
+            " by the gc_stats hook (run --hook gc_stats)."
+        ),
+    )
+    cmd.add_argument(
+        "--latency",
+        action="store_true",
+        help=(
+            "Also compare the latency percentiles and the throughput of"
+            " request/response benchmarks (latency group)."
+        ),
+    )
+    cmd.add_argument(
+        "--scaling",
+        action="store_true",
+        help=(
+            "Also compare the scaling efficiency of the benchmarks of the"
+            " threading group per number of threads."
+        ),
+    )
+    cmd.add_argument(
+        "--aggregate",
+        action="store_true",
+        help=(
+            "Display the geometric mean of the changes per benchmark"
+            " group (from the tags of the benchmarks) and overall."
+        ),
+    )
+    cmd.add_argument(
+        "--weights",
+        metavar="NAME=WEIGHT,...",
+        type=weights,
+        default=None,
+        help=(
+            "Comma-separated weights of benchmarks or groups used by"
+            " --aggregate. A benchmark weight has precedence over"
+            " a group weight. The default weight is 1."
+        ),
+    )
+    cmd.add_argument(
+        "--bootstrap",
+        metavar="N",
+        type=check_non_negative,
+        default=1000,
+        help=(
+            "Number of bootstrap samples used by --aggregate to compute"
+            " the 95%% confidence interval, 0 to disable it (default: 1000)."
         ),
     )
     cmd.add_argument("baseline_filename", metavar="baseline_file.json")
-    cmd.add_argument("changed_filename", metavar="changed_file.json")
+    cmd.add_argument(
+        "changed_filenames",
+        metavar="changed_file.json",
+        nargs="+",
+        help="one or more files to compare against the baseline",
+    )
+
+    # report
+    cmd = subparsers.add_parser(
+        "report", help="Generate an HTML report from benchmark files"
+    )
+    cmd.add_argument(
+        "-o",
+        "--output",
+        metavar="FILENAME",
+        default="report.html",
+        help="Name of the HTML report file (default: report.html)",
+    )
+    cmd.add_argument(
+        "--markdown",
+        metavar="FILENAME",
+        default=None,
+        help="Also write a Markdown summary of the report into FILENAME",
+    )
+    cmd.add_argument(
+        "--weights",
+        metavar="NAME=WEIGHT,...",
+        type=weights,
+        default=None,
+        help="Comma-separated weights of benchmarks or groups used by aggregates",
+    )
+    cmd.add_argument(
+        "--bootstrap",
+        metavar="N",
+        type=check_non_negative,
+        default=1000,
+        help=(
+            "Number of bootstrap samples used to compute the 95%% confidence"
+            " interval of aggregates, 0 to disable it (default: 1000)."
+        ),
+    )
+    cmd.add_argument(
+        "filenames",
+        metavar="FILENAME",
+        nargs="+",
+        help="benchmark files, the first one is the baseline",
+    )
+
+    # profile
+    cmd = subparsers.add_parser(
+        "profile", help="Profile benchmarks and write flamegraphs"
+    )
+    cmds.append(cmd)
+    cmd.add_argument("-v", "--verbose", action="store_true", help="Print more output")
+    cmd.add_argument(
+        "-o",
+        "--output",
+        metavar="DIRECTORY",
+        default="profile",
+        help="Directory of the profiles and flamegraphs (default: profile)",
+    )
+    cmd.add_argument(
+        "--compare-to",
+        metavar="PYTHON",
+        default=None,
+        help="Also profile PYTHON and write differential flamegraphs",
+    )
+    cmd.add_argument(
+        "--sampler",
+        choices=("auto", "perf", "python"),
+        default="auto",
+        help=(
+            "Use 'perf record' or a Python sampling thread to profile;"
+            " 'auto' uses perf on Linux with Python 3.12 or newer if"
+            " available (default: auto)"
+        ),
+    )
+    filter_opts(cmd)
+
+    # importtime
+    cmd = subparsers.add_parser(
+        "importtime", help="Collect the import time of modules of benchmarks"
+    )
+    cmds.append(cmd)
+    cmd.add_argument("-v", "--verbose", action="store_true", help="Print more output")
+    cmd.add_argument(
+        "-n",
+        "--launches",
+        metavar="N",
+        type=check_positive,
+        default=20,
+        help="Number of launches of each benchmark (default: 20)",
+    )
+    cmd.add_argument(
+        "--top",
+        metavar="N",
+        type=check_positive,
+        default=20,
+        help="Number of modules displayed per benchmark (default: 20)",
+    )
+    cmd.add_argument(
+        "--compare-to",
+        metavar="PYTHON",
+        default=None,
+        help="Also collect the import times of PYTHON and compare them",
+    )
+    cmd.add_argument(
+        "-o",
+        "--output",
+        metavar="FILENAME",
+        default=None,
+        help="Write the import times of each launch into a JSON file",
+    )
+    filter_opts(cmd)
+    cmd.set_defaults(benchmarks="startup")
 
     # list
     cmd = subparsers.add_parser("list", help="List benchmarks of the running Python")
@@ -237,6 +532,36 @@ def parse_args():
     cmd.add_argument("json_file", help="JSON filename")
     cmds.append(cmd)
 
+    # upload_drain
+    cmd = subparsers.add_parser(
+        "upload_drain", help="Upload results waiting in the upload spool"
+    )
+    cmd.add_argument("config_file", help="Configuration filename")
+    cmds.append(cmd)
+
+    # result_server
+    cmd = subparsers.add_parser(
+        "result_server",
+        help="Run a local Codespeed-compatible server storing uploaded results",
+    )
+    cmd.add_argument(
+        "--host",
+        default="127.0.0.1",
+        help="Address the server listens on (default: 127.0.0.1)",
+    )
+    cmd.add_argument(
+        "--port",
+        type=int,
+        default=8000,
+        help="Port the server listens on (default: 8000)",
+    )
+    cmd.add_argument(
+        "--database",
+        metavar="FILENAME",
+        default="results.sqlite3",
+        help="SQLite database storing the results (default: results.sqlite3)",
+    )
+
     # venv
     venv_common = argparse.ArgumentParser(add_help=False)
     venv_common.add_argument("--venv", help="Path to the virtual environment")
@@ -285,6 +610,9 @@ def parse_args():
         parser.print_help()
         sys.exit(1)
 
+    if getattr(options, "compare_to", None):
+        options.compare_to = os.path.abspath(os.path.expanduser(options.compare_to))
+
     if hasattr(options, "python"):
         # Replace "~" with the user home directory
         options.python = os.path.expanduser(options.python)
@@ -398,6 +726,11 @@ def _main():
     elif options.action == "upload":
         cmd_upload(options)
         sys.exit()
+    elif options.action == "upload_drain":
+        cmd_upload_drain(options)
+        sys.exit()
+    elif options.action == "result_server":
+        cmd_result_server(options)
     elif options.action == "show":
         cmd_show(options)
         sys.exit()
@@ -406,6 +739,14 @@ def _main():
         cmd_run(options, benchmarks)
     elif options.action == "compare":
         cmd_compare(options)
+    elif options.action == "report":
+        cmd_report(options)
+    elif options.action == "profile":
+        benchmarks = _benchmarks_from_options(options)
+        cmd_profile(options, benchmarks)
+    elif options.action == "importtime":
+        benchmarks = _benchmarks_from_options(options)
+        cmd_importtime(options, benchmarks)
     elif options.action == "list":
         benchmarks = _benchmarks_from_options(options)
         cmd_list(options, benchmarks)
@@ -1,3 +1,4 @@
+import contextlib
 import logging
 import os.path
 import sys
@@ -178,7 +179,25 @@ def cmd_run(options, benchmarks):
         print('ERROR: "%s" is not an absolute path' % executable)
         sys.exit(1)
 
-    suite, errors = run_benchmarks(benchmarks, executable, options)
+    if options.alloc_profile and not (options.output or options.append):
+        print("ERROR: --alloc-profile requires --output or --append")
+        sys.exit(1)
+
+    with contextlib.ExitStack() as stack:
+        if options.pystats:
+            from ._pystats import PystatsLockedError, check_pystats, lock_stats_dir
+
+            if not check_pystats(executable):
+                print("ERROR: --pystats requires a Python built with --enable-pystats")
+                sys.exit(1)
+            # The stats of concurrent runs would be mixed in the stats directory
+            try:
+                stack.enter_context(lock_stats_dir())
+            except PystatsLockedError as exc:
+                print("ERROR: %s" % exc)
+                sys.exit(1)
+
+        suite, errors = run_benchmarks(benchmarks, executable, options)
 
     if not suite:
         print("ERROR: No benchmark was run")
@@ -244,6 +263,32 @@ def cmd_upload(options):
         options=options,
     )
     bench.upload()
+    if not bench.uploaded:
+        sys.exit(1)
+
+
+def cmd_upload_drain(options):
+    from ._upload import UploadSpool
+    from .compile import Application, parse_config
+
+    conf = parse_config(options.config_file, "upload")
+    app = Application(conf, options)
+    spool = UploadSpool(conf, app.logger)
+    spool.drain()
+
+    pending = spool.get_pending()
+    if pending:
+        print("ERROR: %s files are still waiting to be uploaded" % len(pending))
+        sys.exit(1)
+
+
+def cmd_result_server(options):
+    from ._codespeed import serve
+
+    try:
+        serve(options.database, options.host, options.port)
+    except KeyboardInterrupt:
+        pass
 
 
 def cmd_show(options):
@@ -256,13 +301,64 @@ def cmd_show(options):
 
 
 def cmd_compare(options):
-    from .compare import VersionMismatchError, compare_results, write_csv
+    from .compare import (
+        VersionMismatchError,
+        compare_multiple_results,
+        compare_results,
+        get_labels,
+        write_csv,
+        write_multi_csv,
+    )
 
+    multiple = len(options.changed_filenames) > 1
     try:
-        results = compare_results(options)
+        if multiple:
+            results = compare_multiple_results(options)
+        else:
+            results = compare_results(options)
     except VersionMismatchError as exc:
         print(f"ERROR: {exc}")
         sys.exit(1)
 
     if options.csv:
-        write_csv(results, options.csv)
+        if multiple:
+            _, *changed_labels = get_labels(
+                options.baseline_filename, *options.changed_filenames
+            )
+            write_multi_csv(results, options.csv, changed_labels, memory=options.memory)
+        else:
+            write_csv(results, options.csv, memory=options.memory)
+
+
+def cmd_report(options):
+    from .report import write_report
+
+    write_report(options)
+
+
+def cmd_importtime(options, benchmarks):
+    from .importtime import importtime_benchmarks
+
+    logging.basicConfig(level=logging.INFO)
+
+    errors = importtime_benchmarks(benchmarks, options)
+    if errors:
+        print("%s benchmarks failed:" % len(errors))
+        for name, reason in errors:
+            print("- %s (%s)" % (name, reason))
+        print()
+        sys.exit(1)
+
+
+def cmd_profile(options, benchmarks):
+    from .profiling import profile_benchmarks
+
+    logging.basicConfig(level=logging.INFO)
+
+    errors = profile_benchmarks(benchmarks, options)
+    if errors:
+        print("%s benchmarks failed:" % len(errors))
+        for name, reason in errors:
+            print("- %s (%s)" % (name, reason))
+        print()
+        sys.exit(1)
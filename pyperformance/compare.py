@@ -1,11 +1,14 @@
 import csv
 import math
 import os.path
+import random
 import statistics
+from collections import namedtuple
 
 import pyperf
 
 NO_VERSION = "<not set>"
+DEFAULT_BOOTSTRAP = 1000
 
 
 class VersionMismatchError(Exception):
@@ -26,6 +29,393 @@ def format_result(bench):
         return bench.format_value(mean)
 
 
+# Metadata of the peak memory usage of a run, by order of preference:
+# bench_command() records the maximum RSS of the command, other
+# benchmarks record the maximum RSS of the worker process (or the
+# peak pagefile usage on Windows).
+MEMORY_METADATA = ("command_max_rss", "mem_max_rss", "mem_peak_pagefile_usage")
+
+
+def get_peak_memory(bench):
+    """Get the mean peak memory usage of the runs of a benchmark.
+
+    Peak memory usage is recorded in the metadata of each run while
+    timing the benchmark. If the benchmark values are already memory
+    usages (--track-memory), return None.
+
+    Args:
+        bench: a pyperf.Benchmark.
+
+    Returns:
+        The peak memory usage in bytes, as a float, or None.
+    """
+    if bench.get_unit() != "second":
+        return None
+
+    values = []
+    for run in bench.get_runs():
+        if not run.values:
+            # Skip calibration runs
+            continue
+        metadata = run.get_metadata()
+        for key in MEMORY_METADATA:
+            if key in metadata:
+                values.append(metadata[key])
+                break
+    if not values:
+        return None
+    return statistics.mean(values)
+
+
+def format_memory(value):
+    return pyperf.format_metadata("mem_max_rss", value)
+
+
+def memory_delta(base, changed):
+    base_memory = get_peak_memory(base)
+    changed_memory = get_peak_memory(changed)
+    if base_memory is None or changed_memory is None:
+        return None
+    return "%s -> %s: %s" % (
+        format_memory(base_memory),
+        format_memory(changed_memory),
+        format_delta(base_memory, changed_memory, is_time=False),
+    )
+
+
+# Benchmarks processing large payloads record the number of bytes
+# processed per value in their metadata, and database benchmarks the number
+# of rows.
+PAYLOAD_METADATA = "payload_size"
+PAYLOAD_ROWS_METADATA = "payload_rows"
+
+
+def get_throughput(bench, metadata=PAYLOAD_METADATA):
+    """Get the throughput of a benchmark in bytes per second.
+
+    Return None if the benchmark doesn't record its payload size. Pass
+    metadata=PAYLOAD_ROWS_METADATA to get the throughput in rows per second.
+    """
+    size = bench.get_metadata().get(metadata)
+    if size is None or bench.get_unit() != "second":
+        return None
+    return size / bench.mean()
+
+
+def format_throughput(value):
+    return "%s MB/s" % format(value / 1e6, ",.1f")
+
+
+def format_row_throughput(value):
+    return "%s rows/s" % format(value, ",.0f")
+
+
+def compare_throughput(base, changed):
+    """Get the (key, title, base, changed) throughputs of two benchmarks."""
+    result = []
+    for key, metadata in (
+        ("throughput", PAYLOAD_METADATA),
+        ("row_throughput", PAYLOAD_ROWS_METADATA),
+    ):
+        base_throughput = get_throughput(base, metadata)
+        changed_throughput = get_throughput(changed, metadata)
+        if base_throughput is None or changed_throughput is None:
+            continue
+        result.append((key, "Throughput", base_throughput, changed_throughput))
+    return result
+
+
+# Metadata of the "rusage" pyperf hook (run --hook rusage): totals over
+# the values of a run, except rusage_maxrss.
+RUSAGE_METADATA = (
+    ("rusage_utime", "User CPU time"),
+    ("rusage_stime", "System CPU time"),
+    ("rusage_nvcsw", "Voluntary context switches"),
+    ("rusage_nivcsw", "Involuntary context switches"),
+    ("rusage_minflt", "Minor page faults"),
+    ("rusage_majflt", "Major page faults"),
+    ("rusage_maxrss", "Max RSS"),
+)
+# Prefix of the metadata of the "perf_stat" pyperf hook (run --perf-stat):
+# perf_stat_<event> is the count of an event over the values of a run.
+PERF_STAT_PREFIX = "perf_stat_"
+# Totals of the untimed tracemalloc pass of "run --alloc-profile":
+# benchmark metadata, for a single loop.
+ALLOC_METADATA = (
+    ("alloc_peak_size", "Traced memory peak"),
+    ("alloc_peak_blocks", "Allocated blocks at peak"),
+    ("alloc_retained_size", "Retained memory"),
+    ("alloc_retained_blocks", "Retained blocks"),
+)
+# Metadata of the "gc_stats" pyperf hook (run --hook gc_stats): totals
+# over the values of a run, divided per iteration...
+GC_METADATA = (
+    ("gc_collections_0", "Generation 0 collections per iteration"),
+    ("gc_collections_1", "Generation 1 collections per iteration"),
+    ("gc_collections_2", "Generation 2 collections per iteration"),
+    ("gc_collected", "Objects collected per iteration"),
+    ("gc_uncollectable", "Uncollectable objects per iteration"),
+    ("gc_pause_total", "Pause time per iteration"),
+)
+# ... and pause durations of a run, which are not
+GC_PAUSE_METADATA = (
+    ("gc_pause_p50", "Median pause"),
+    ("gc_pause_p99", "99th percentile pause"),
+    ("gc_pause_max", "Max pause"),
+)
+# Metadata of the "latency" pyperf hook of request/response benchmarks:
+# latency percentiles and throughput of the values of a run, and
+# percentiles of the event loop iteration durations of asyncio benchmarks
+LATENCY_METADATA = (
+    ("latency_p50", "p50 latency"),
+    ("latency_p90", "p90 latency"),
+    ("latency_p99", "p99 latency"),
+    ("latency_p999", "p99.9 latency"),
+    ("latency_throughput", "Throughput"),
+    ("loop_latency_p50", "p50 event loop iteration"),
+    ("loop_latency_p90", "p90 event loop iteration"),
+    ("loop_latency_p99", "p99 event loop iteration"),
+    ("loop_latency_p999", "p99.9 event loop iteration"),
+)
+# Summary of the stats of a Python built with --enable-pystats
+# (run --pystats): benchmark metadata, per iteration.
+PYSTATS_METADATA = (
+    ("pystats_instructions", "Instructions executed"),
+    ("pystats_specialization_success", "Specialization successes"),
+    ("pystats_specialization_failure", "Specialization failures"),
+    ("pystats_specialization_hit", "Specialized instruction hits"),
+    ("pystats_specialization_miss", "Specialized instruction misses"),
+    ("pystats_specialization_deopt", "Deoptimizations"),
+    ("pystats_python_calls", "Python calls"),
+    ("pystats_inlined_calls", "Inlined Python calls"),
+    ("pystats_frame_objects", "Frame objects created"),
+    ("pystats_object_allocations", "Object allocations"),
+    ("pystats_object_freelist_allocations", "Object allocations from freelist"),
+    ("pystats_object_frees", "Object frees"),
+    ("pystats_gc_collections", "GC collections"),
+    ("pystats_gc_objects_collected", "GC objects collected"),
+)
+
+
+def get_counters(bench, keys):
+    """Get the mean of run metadata counters of a benchmark per iteration.
+
+    Counters are divided by the number of iterations of each run, except
+    the peak memory usage of the worker processes (rusage_maxrss).
+
+    Args:
+        bench: a pyperf.Benchmark.
+        keys: metadata keys of the counters.
+
+    Returns:
+        A dict mapping keys to their mean; keys missing from all runs are
+        omitted.
+    """
+    counters = {}
+    for run in bench.get_runs():
+        if not run.values:
+            # Skip calibration runs
+            continue
+        metadata = run.get_metadata()
+        iterations = len(run.values) * run.get_total_loops()
+        for key in keys:
+            if key not in metadata:
+                continue
+            value = metadata[key]
+            if key != "rusage_maxrss":
+                value /= iterations
+            counters.setdefault(key, []).append(value)
+    return {key: statistics.mean(values) for key, values in counters.items()}
+
+
+def get_rusage(bench):
+    """Get the mean resource usage of a benchmark per iteration.
+
+    Return an empty dict if the benchmark was not run with the rusage hook.
+    """
+    return get_counters(bench, [key for key, _ in RUSAGE_METADATA])
+
+
+def get_perf_stat(bench):
+    """Get the mean count of perf events of a benchmark per iteration.
+
+    Return an empty dict if the benchmark was not run with --perf-stat.
+    """
+    keys = set()
+    for run in bench.get_runs():
+        keys.update(
+            key for key in run.get_metadata() if key.startswith(PERF_STAT_PREFIX)
+        )
+    return get_counters(bench, sorted(keys))
+
+
+def get_pystats(bench):
+    """Get the summary of the Python stats of a benchmark per iteration.
+
+    Return an empty dict if the benchmark was not run with --pystats.
+    """
+    metadata = bench.get_metadata()
+    pystats = {key: metadata[key] for key, _ in PYSTATS_METADATA if key in metadata}
+    hits = pystats.get("pystats_specialization_hit")
+    misses = pystats.get("pystats_specialization_miss")
+    if hits is not None and misses is not None and hits + misses:
+        pystats["pystats_hit_ratio"] = hits / (hits + misses)
+    return pystats
+
+
+def get_alloc_profile(bench):
+    """Get the allocation totals of a benchmark.
+
+    Return an empty dict if the benchmark was not run with --alloc-profile.
+    """
+    metadata = bench.get_metadata()
+    return {key: metadata[key] for key, _ in ALLOC_METADATA if key in metadata}
+
+
+def get_gc_stats(bench):
+    """Get the garbage collections and pauses of a benchmark.
+
+    Counts and the total pause time are per iteration; pause percentiles
+    are the mean of the runs, and the max pause is the max of the runs.
+
+    Return an empty dict if the benchmark was not run with the gc_stats hook.
+    """
+    stats = get_counters(bench, [key for key, _ in GC_METADATA])
+    pauses = {}
+    for run in bench.get_runs():
+        if not run.values:
+            # Skip calibration runs
+            continue
+        metadata = run.get_metadata()
+        for key, _ in GC_PAUSE_METADATA:
+            if key in metadata:
+                pauses.setdefault(key, []).append(metadata[key])
+    for key, values in pauses.items():
+        if key == "gc_pause_max":
+            stats[key] = max(values)
+        else:
+            stats[key] = statistics.mean(values)
+    return stats
+
+
+def get_latency(bench):
+    """Get the mean latency percentiles and throughput of the runs of a benchmark.
+
+    Return an empty dict if the benchmark does not record latencies.
+    """
+    values = {}
+    for run in bench.get_runs():
+        if not run.values:
+            # Skip calibration runs
+            continue
+        metadata = run.get_metadata()
+        for key, _ in LATENCY_METADATA:
+            if key in metadata:
+                values.setdefault(key, []).append(metadata[key])
+    return {key: statistics.mean(key_values) for key, key_values in values.items()}
+
+
+def format_counter(key, value):
+    if key == "rusage_maxrss" or key in ("alloc_peak_size", "alloc_retained_size"):
+        return format_memory(value)
+    if key == "pystats_hit_ratio":
+        return "%.1f%%" % (value * 100)
+    if key in ("rusage_utime", "rusage_stime") or key.startswith(
+        ("gc_pause_", "latency_p", "loop_latency_p")
+    ):
+        return pyperf.format_metadata("duration", value)
+    if key == "latency_throughput":
+        return "%s req/s" % format(value, ",.0f")
+    if key == "throughput":
+        return format_throughput(value)
+    if key == "row_throughput":
+        return format_row_throughput(value)
+    if value >= 1000:
+        return format(value, ",.0f")
+    return "%.3g" % value
+
+
+def compare_rusage(base, changed):
+    """Get the (key, title, base, changed) resource usages of two benchmarks."""
+    base_usage = get_rusage(base)
+    changed_usage = get_rusage(changed)
+    return [
+        (key, title, base_usage[key], changed_usage[key])
+        for key, title in RUSAGE_METADATA
+        if key in base_usage and key in changed_usage
+    ]
+
+
+def compare_perf_stat(base, changed):
+    """Get the (key, event, base, changed) perf event counts of two benchmarks."""
+    base_counts = get_perf_stat(base)
+    changed_counts = get_perf_stat(changed)
+    return [
+        (key, key[len(PERF_STAT_PREFIX) :], base_counts[key], changed_counts[key])
+        for key in base_counts
+        if key in changed_counts
+    ]
+
+
+def compare_alloc_profile(base, changed):
+    """Get the (key, title, base, changed) allocation totals of two benchmarks."""
+    base_alloc = get_alloc_profile(base)
+    changed_alloc = get_alloc_profile(changed)
+    return [
+        (key, title, base_alloc[key], changed_alloc[key])
+        for key, title in ALLOC_METADATA
+        if key in base_alloc and key in changed_alloc
+    ]
+
+
+def compare_gc_stats(base, changed):
+    """Get the (key, title, base, changed) GC statistics of two benchmarks."""
+    base_stats = get_gc_stats(base)
+    changed_stats = get_gc_stats(changed)
+    return [
+        (key, title, base_stats[key], changed_stats[key])
+        for key, title in (*GC_METADATA, *GC_PAUSE_METADATA)
+        if key in base_stats and key in changed_stats
+    ]
+
+
+def compare_latency(base, changed):
+    """Get the (key, title, base, changed) latencies of two benchmarks."""
+    base_latency = get_latency(base)
+    changed_latency = get_latency(changed)
+    return [
+        (key, title, base_latency[key], changed_latency[key])
+        for key, title in LATENCY_METADATA
+        if key in base_latency and key in changed_latency
+    ]
+
+
+def compare_pystats(base, changed):
+    """Get the (key, title, base, changed) Python stats of two benchmarks."""
+    base_stats = get_pystats(base)
+    changed_stats = get_pystats(changed)
+    titles = (*PYSTATS_METADATA, ("pystats_hit_ratio", "Specialization hit ratio"))
+    return [
+        (key, title, base_stats[key], changed_stats[key])
+        for key, title in titles
+        if key in base_stats and key in changed_stats
+    ]
+
+
+# Counter sections of "compare", enabled by the option of the same name:
+# (option, table header, compare function).
+COUNTER_SECTIONS = (
+    ("rusage", "Resource usage per iteration", compare_rusage),
+    ("perf_stat", "Perf events per iteration", compare_perf_stat),
+    ("pystats", "Python stats per iteration", compare_pystats),
+    ("alloc_profile", "Allocations", compare_alloc_profile),
+    ("gc_stats", "Garbage collections", compare_gc_stats),
+    ("latency", "Latency percentiles", compare_latency),
+)
+# Sections of counters divided by the number of iterations
+PER_ITERATION_SECTIONS = frozenset(("rusage", "perf_stat", "pystats"))
+
+
 # A table of 95% confidence intervals for a two-tailed t distribution, as a
 # function of the degrees of freedom. For larger degrees of freedom, we
 # approximate. While this may look less elegant than simply calculating the
@@ -177,8 +567,17 @@ def significant_msg(base, changed):
     return msg
 
 
-def format_table(base_label, changed_label, results):
-    table = [("Benchmark", base_label, changed_label, "Change", "Significance")]
+def format_table(base_label, changed_label, results, memory=False):
+    table = [
+        (
+            "Benchmark",
+            base_label,
+            changed_label,
+            "Change",
+            "Significance",
+            "Peak memory" if memory else None,
+        )
+    ]
 
     for bench_name, result in results:
         format_value = result.base.format_value
@@ -186,6 +585,10 @@ def format_table(base_label, changed_label, results):
         avg_changed = result.changed.mean()
         delta_avg = quantity_delta(result.base, result.changed)
         msg = significant_msg(result.base, result.changed)
+        if memory:
+            delta_memory = memory_delta(result.base, result.changed) or "-"
+        else:
+            delta_memory = None
         table.append(
             (
                 bench_name,
@@ -194,9 +597,90 @@ def format_table(base_label, changed_label, results):
                 format_value(avg_changed),
                 delta_avg,
                 msg,
+                delta_memory,
             )
         )
 
+    return render_table(table)
+
+
+def format_counters_table(header, base_label, changed_label, results, compare_func):
+    table = [("Benchmark", header, base_label, changed_label, "Change")]
+    for bench_name, result in results:
+        for key, title, old, new in compare_func(result.base, result.changed):
+            table.append(
+                (
+                    bench_name,
+                    title,
+                    format_counter(key, old),
+                    format_counter(key, new),
+                    format_delta(old, new, is_time=False),
+                )
+            )
+    if len(table) == 1:
+        return None
+    return render_table(table)
+
+
+def format_multi_table(base_label, changed_labels, results):
+    table = [("Benchmark", base_label, *changed_labels, "Best", "Worst")]
+
+    for result in results:
+        format_value = result.base.format_value
+        row = [result.name, format_value(result.base.mean())]
+        for changed in result.changed:
+            if changed is None:
+                row.append("-")
+            else:
+                delta_avg = quantity_delta(result.base, changed)
+                row.append("%s: %s" % (format_value(changed.mean()), delta_avg))
+
+        best, worst = result.best_worst()
+        row.append(changed_labels[best] if best is not None else "-")
+        row.append(changed_labels[worst] if worst is not None else "-")
+        table.append(tuple(row))
+
+    is_time = all(result.base.get_unit() == "second" for result in results)
+    row = ["Geometric mean", "(ref)"]
+    for index in range(len(changed_labels)):
+        ratios = [result.ratios()[index] for result in results]
+        ratios = [ratio for ratio in ratios if ratio is not None]
+        if ratios:
+            row.append(format_delta(1.0, statistics.geometric_mean(ratios), is_time))
+        else:
+            row.append("-")
+    row.extend(("", ""))
+    table.append(tuple(row))
+
+    return render_table(table)
+
+
+def format_multi_memory_table(base_label, changed_labels, results):
+    table = [("Benchmark", base_label, *changed_labels)]
+    for result in results:
+        base_memory = get_peak_memory(result.base)
+        if base_memory is None:
+            continue
+        row = [result.name, format_memory(base_memory)]
+        for changed in result.changed:
+            changed_memory = get_peak_memory(changed) if changed is not None else None
+            if changed_memory is None:
+                row.append("-")
+            else:
+                row.append(
+                    "%s: %s"
+                    % (
+                        format_memory(changed_memory),
+                        format_delta(base_memory, changed_memory, is_time=False),
+                    )
+                )
+        table.append(tuple(row))
+    if len(table) == 1:
+        return None
+    return render_table(table)
+
+
+def render_table(table):
     # Columns with None values are skipped
     skipped_cols = set()
     col_widths = [0] * len(table[0])
@@ -246,6 +730,37 @@ class BenchmarkResult(object):
         self.base = base
         self.changed = changed
 
+    def format(self, memory=False, sections=()):
+        """Format the result and the counters of the sections.
+
+        sections is a collection of COUNTER_SECTIONS option names.
+        """
+        text = str(self)
+        if memory:
+            delta_memory = memory_delta(self.base, self.changed)
+            if delta_memory:
+                text += "\nPeak memory: %s" % delta_memory
+        counters = []
+        totals = compare_throughput(self.base, self.changed)
+        for name, _, compare_func in COUNTER_SECTIONS:
+            if name not in sections:
+                continue
+            if name not in PER_ITERATION_SECTIONS:
+                totals.extend(compare_func(self.base, self.changed))
+                continue
+            for key, title, old, new in compare_func(self.base, self.changed):
+                if key != "pystats_hit_ratio":
+                    title += " per iteration"
+                counters.append((key, title, old, new))
+        for key, title, old, new in counters + totals:
+            text += "\n%s: %s -> %s: %s" % (
+                title,
+                format_counter(key, old),
+                format_counter(key, new),
+                format_delta(old, new, is_time=False),
+            )
+        return text
+
     def __str__(self):
         if self.base.get_nvalue() > 1:
             values = (
@@ -271,11 +786,71 @@ class BenchmarkResult(object):
             )
 
 
+class MultiBenchmarkResult(object):
+    """The results of one benchmark in a baseline and several changed files.
+
+    Changed results missing the benchmark are None.
+    """
+
+    def __init__(self, base, changed):
+        name = base.get_name()
+        for bench in changed:
+            if bench is not None and bench.get_name() != name:
+                raise ValueError(
+                    "not the same benchmark: %s != %s" % (name, bench.get_name())
+                )
+
+        self.base = base
+        self.changed = list(changed)
+
+    @property
+    def name(self):
+        return self.base.get_name()
+
+    def get_result(self, index):
+        """Return the BenchmarkResult of the changed file index."""
+        return BenchmarkResult(self.base, self.changed[index])
+
+    def ratios(self):
+        """Return the changed/base ratio of the means of each changed file.
+
+        The ratio is None if the benchmark is missing or a mean is zero.
+        """
+        base = self.base.mean()
+        ratios = []
+        for bench in self.changed:
+            if bench is None or base == 0 or bench.mean() == 0:
+                ratios.append(None)
+            else:
+                ratios.append(bench.mean() / base)
+        return ratios
+
+    def best_worst(self):
+        """Return the indexes of the best and worst changed files.
+
+        Lower is better.  (None, None) is returned if less than two
+        changed files can be compared or if they are all equal.
+        """
+        ratios = [
+            (ratio, index)
+            for index, ratio in enumerate(self.ratios())
+            if ratio is not None
+        ]
+        if len(ratios) < 2:
+            return (None, None)
+        best = min(ratios)
+        worst = max(ratios)
+        if best[0] == worst[0]:
+            return (None, None)
+        return (best[1], worst[1])
+
+
 def quantity_delta(base, changed):
-    old = base.mean()
-    new = changed.mean()
     is_time = base.get_unit() == "second"
+    return format_delta(base.mean(), changed.mean(), is_time)
 
+
+def format_delta(old, new, is_time=True):
     if old == 0 or new == 0:
         return "incomparable (one result was zero)"
     if new > old:
@@ -292,36 +867,399 @@ def quantity_delta(base, changed):
         return "no change"
 
 
-def display_suite_metadata(suite, title=None):
+def get_thread_scaling(benchmarks):
+    """Group the benchmarks measuring the scaling with the number of threads.
+
+    Benchmarks of the threading group store their number of threads and
+    their scaling group in their metadata: their names don't depend on the
+    number of threads. Return a dict mapping scaling groups to lists of
+    (threads, benchmark) sorted by number of threads.
+    """
+    groups = {}
+    for bench in benchmarks:
+        metadata = bench.get_metadata()
+        if "scaling_group" not in metadata or "threads" not in metadata:
+            continue
+        rows = groups.setdefault(metadata["scaling_group"], [])
+        rows.append((metadata["threads"], bench))
+    for rows in groups.values():
+        rows.sort(key=lambda row: row[0])
+    return groups
+
+
+def get_scaling_efficiency(rows):
+    """Get the (threads, bench, speedup, efficiency) of a scaling group.
+
+    Values are times per operation. The speedup is relative to the
+    smallest number of threads, and the efficiency is the speedup divided
+    by the ideal speedup.
+    """
+    ref_threads, ref_bench = rows[0]
+    ref_time = ref_bench.mean()
+    scaling = []
+    for threads, bench in rows:
+        speedup = ref_time / bench.mean()
+        scaling.append((threads, bench, speedup, speedup * ref_threads / threads))
+    return scaling
+
+
+def format_scaling_table(rows):
+    table = [
+        (
+            "Benchmark",
+            "Threads",
+            "Time per operation",
+            "Throughput",
+            "Speedup",
+            "Efficiency",
+        )
+    ]
+    for threads, bench, speedup, efficiency in get_scaling_efficiency(rows):
+        table.append(
+            (
+                bench.get_name(),
+                str(threads),
+                bench.format_value(bench.mean()),
+                "%s ops/s" % format(1.0 / bench.mean(), ",.0f"),
+                "%.2fx" % speedup,
+                "%.0f%%" % (efficiency * 100),
+            )
+        )
+    return render_table(table)
+
+
+def format_scaling_comparison(base_label, changed_label, base_suite, changed_suite):
+    base_groups = get_thread_scaling(base_suite.get_benchmarks())
+    changed_groups = get_thread_scaling(changed_suite.get_benchmarks())
+    table = [
+        (
+            "Benchmark",
+            "Threads",
+            "%s efficiency" % base_label,
+            "%s efficiency" % changed_label,
+            "Throughput change",
+        )
+    ]
+    for group in sorted(base_groups.keys() & changed_groups.keys()):
+        changed_scaling = {
+            bench.get_name(): (bench, efficiency)
+            for _, bench, _, efficiency in get_scaling_efficiency(changed_groups[group])
+        }
+        for threads, base_bench, _, base_efficiency in get_scaling_efficiency(
+            base_groups[group]
+        ):
+            name = base_bench.get_name()
+            if name not in changed_scaling:
+                continue
+            changed_bench, changed_efficiency = changed_scaling[name]
+            table.append(
+                (
+                    name,
+                    str(threads),
+                    "%.0f%%" % (base_efficiency * 100),
+                    "%.0f%%" % (changed_efficiency * 100),
+                    format_delta(base_bench.mean(), changed_bench.mean()),
+                )
+            )
+    if len(table) == 1:
+        return None
+    return render_table(table)
+
+
+def get_sweep_series(benchmarks):
+    """Group the benchmarks run by "run --sweep" into series.
+
+    Return a dict mapping (series, param) to lists of (value, benchmark)
+    sorted by value.
+    """
+    series = {}
+    for bench in benchmarks:
+        metadata = bench.get_metadata()
+        if "sweep_series" not in metadata:
+            continue
+        key = (metadata["sweep_series"], metadata["sweep_param"])
+        series.setdefault(key, []).append((metadata["sweep_value"], bench))
+    for rows in series.values():
+        rows.sort(key=lambda row: row[0])
+    return series
+
+
+def fit_sweep(rows):
+    """Fit the mean times of a series against the parameter values.
+
+    Return (cost, exponent): the cost per element is the slope of the
+    least squares line of the times, and the scaling exponent is the slope
+    of the line in log-log scale (1.0 for a linear cost). Return None if
+    the series has less than 2 distinct values.
+    """
+    sizes = [value for value, _ in rows]
+    if len(set(sizes)) < 2:
+        return None
+    times = [bench.mean() for _, bench in rows]
+    cost = statistics.linear_regression(sizes, times).slope
+    exponent = statistics.linear_regression(
+        [math.log(size) for size in sizes], [math.log(time) for time in times]
+    ).slope
+    return cost, exponent
+
+
+def format_sweep_table(series):
+    table = [("Series", "Values", "Cost per element", "Exponent")]
+    for (name, param), rows in sorted(series.items()):
+        fit = fit_sweep(rows)
+        if fit is None:
+            continue
+        cost, exponent = fit
+        bench = rows[0][1]
+        table.append(
+            (
+                name,
+                "%s=%s" % (param, ",".join(str(value) for value, _ in rows)),
+                bench.format_value(cost),
+                "%.2f" % exponent,
+            )
+        )
+    if len(table) == 1:
+        return None
+    return render_table(table)
+
+
+def format_sweep_comparison(base_label, changed_label, base_suite, changed_suite):
+    base_series = get_sweep_series(base_suite.get_benchmarks())
+    changed_series = get_sweep_series(changed_suite.get_benchmarks())
+    table = [
+        (
+            "Series",
+            "%s cost" % base_label,
+            "%s cost" % changed_label,
+            "Change",
+            "%s exponent" % base_label,
+            "%s exponent" % changed_label,
+        )
+    ]
+    for key in sorted(base_series.keys() & changed_series.keys()):
+        base_fit = fit_sweep(base_series[key])
+        changed_fit = fit_sweep(changed_series[key])
+        if base_fit is None or changed_fit is None:
+            continue
+        bench = base_series[key][0][1]
+        table.append(
+            (
+                key[0],
+                bench.format_value(base_fit[0]),
+                bench.format_value(changed_fit[0]),
+                format_delta(base_fit[0], changed_fit[0]),
+                "%.2f" % base_fit[1],
+                "%.2f" % changed_fit[1],
+            )
+        )
+    if len(table) == 1:
+        return None
+    return render_table(table)
+
+
+Aggregate = namedtuple("Aggregate", "group count ratio low high")
+
+
+def get_groups(bench):
+    # The overall aggregate is the "all" group, other groups come from
+    # the tags recorded by "pyperformance run".
+    tags = bench.get_metadata().get("tags") or ()
+    if isinstance(tags, str):
+        tags = tags.split()
+    return ["all", *tags]
+
+
+def get_weight(bench, weights):
+    if not weights:
+        return 1.0
+    name = bench.get_name()
+    if name in weights:
+        return weights[name]
+    for group in get_groups(bench):
+        if group in weights:
+            return weights[group]
+    return 1.0
+
+
+def weighted_geometric_mean(ratios, weights):
+    total = math.fsum(weights)
+    logs = math.fsum(w * math.log(r) for r, w in zip(ratios, weights))
+    return math.exp(logs / total)
+
+
+def bootstrap_ratios(base, changed, iterations, rng):
+    """Resample the changed/base ratio of the means of two samples.
+
+    Args:
+        base: the base values.
+        changed: the changed values.
+        iterations: the number of bootstrap samples.
+        rng: the random.Random instance used to resample values.
+
+    Returns:
+        A list of ratios, one per bootstrap sample.
+    """
+    ratios = []
+    for _ in range(iterations):
+        base_mean = math.fsum(rng.choices(base, k=len(base))) / len(base)
+        changed_mean = math.fsum(rng.choices(changed, k=len(changed))) / len(changed)
+        ratios.append(changed_mean / base_mean)
+    return ratios
+
+
+def compute_aggregates(pairs, weights=None, bootstrap=DEFAULT_BOOTSTRAP, seed=0):
+    """Compute the geometric mean of the changed/base ratios per group.
+
+    The 95% confidence interval of each geometric mean is estimated by
+    resampling the values of each benchmark (bootstrap).
+
+    Args:
+        pairs: a list of (base, changed) pyperf.Benchmark tuples.
+        weights: an optional dict mapping benchmark or group names
+            to weights; a benchmark weight has precedence over a group
+            weight, the default weight is 1.
+        bootstrap: the number of bootstrap samples used to compute
+            the confidence interval, 0 to not compute it.
+        seed: the seed of the bootstrap, to get reproducible results.
+
+    Returns:
+        A list of Aggregate, the "all" group first.
+    """
+    rng = random.Random(seed)
+    groups = {}
+    for base, changed in pairs:
+        if base.mean() == 0 or changed.mean() == 0:
+            continue
+        weight = get_weight(base, weights)
+        if not weight:
+            continue
+        ratio = changed.mean() / base.mean()
+        if bootstrap:
+            # Resample each benchmark once: the samples are shared by groups
+            samples = bootstrap_ratios(
+                base.get_values(), changed.get_values(), bootstrap, rng
+            )
+        else:
+            samples = None
+        for group in get_groups(base):
+            groups.setdefault(group, []).append((ratio, samples, weight))
+
+    aggregates = []
+    for group in sorted(groups, key=lambda group: (group != "all", group)):
+        members = groups[group]
+        group_weights = [weight for _, _, weight in members]
+        ratio = weighted_geometric_mean(
+            [ratio for ratio, _, _ in members], group_weights
+        )
+        low = high = None
+        if bootstrap >= 2:
+            means = [
+                weighted_geometric_mean(ratios, group_weights)
+                for ratios in zip(*(samples for _, samples, _ in members))
+            ]
+            quantiles = statistics.quantiles(means, n=40)
+            low, high = quantiles[0], quantiles[-1]
+        aggregates.append(Aggregate(group, len(members), ratio, low, high))
+    return aggregates
+
+
+def format_aggregate_table(labels, aggregates, is_time=True):
+    """Format the aggregates of one or more changed files as a table.
+
+    Args:
+        labels: the label of each changed file.
+        aggregates: a list of Aggregate lists, one per changed file.
+        is_time: whether the results are timings.
+    """
+    table = [("Group", "Benchmarks")]
+    for label in labels:
+        table[0] += (label, "95% CI")
+
+    by_group = [
+        {aggregate.group: aggregate for aggregate in file_aggregates}
+        for file_aggregates in aggregates
+    ]
+    groups = []
+    for file_aggregates in aggregates:
+        for aggregate in file_aggregates:
+            if aggregate.group not in groups:
+                groups.append(aggregate.group)
+
+    for group in groups:
+        count = max(
+            file_aggregates[group].count
+            for file_aggregates in by_group
+            if group in file_aggregates
+        )
+        row = (group, str(count))
+        for file_aggregates in by_group:
+            aggregate = file_aggregates.get(group)
+            if aggregate is None:
+                row += ("-", "-")
+                continue
+            ratio = format_delta(1.0, aggregate.ratio, is_time)
+            if aggregate.low is None:
+                interval = "-"
+            else:
+                interval = "%s - %s" % (
+                    format_delta(1.0, aggregate.low, is_time),
+                    format_delta(1.0, aggregate.high, is_time),
+                )
+            row += (ratio, interval)
+        table.append(row)
+
+    return render_table(table)
+
+
+def display_aggregates(labels, pairs_per_file, options):
+    weights = getattr(options, "weights", None)
+    bootstrap = getattr(options, "bootstrap", DEFAULT_BOOTSTRAP)
+    aggregates = [
+        compute_aggregates(pairs, weights, bootstrap) for pairs in pairs_per_file
+    ]
+    if not any(aggregates):
+        return
+    is_time = all(
+        base.get_unit() == "second" for pairs in pairs_per_file for base, _ in pairs
+    )
+    print()
+    print("Geometric mean per group")
+    print()
+    print(format_aggregate_table(labels, aggregates, is_time))
+
+
+def format_suite_metadata(suite):
+    lines = []
     metadata = suite.get_metadata()
-    empty = True
     for key, fmt in (
         ("performance_version", "Performance version: %s"),
         ("python_version", "Python version: %s"),
         ("platform", "Report on %s"),
         ("cpu_count", "Number of logical CPUs: %s"),
     ):
-        if key not in metadata:
-            continue
-
-        empty = False
-        if title:
-            print(title)
-            print("=" * len(title))
-            print()
-            title = None
-
-        text = fmt % metadata[key]
-        print(text)
+        if key in metadata:
+            lines.append(fmt % metadata[key])
 
     dates = suite.get_dates()
     if dates:
-        print("Start date: %s" % dates[0].isoformat(" "))
-        print("End date: %s" % dates[1].isoformat(" "))
-        empty = False
+        lines.append("Start date: %s" % dates[0].isoformat(" "))
+        lines.append("End date: %s" % dates[1].isoformat(" "))
+    return lines
+
+
+def display_suite_metadata(suite, title=None):
+    lines = format_suite_metadata(suite)
+    if not lines:
+        return
 
-    if not empty:
+    if title:
+        print(title)
+        print("=" * len(title))
         print()
+    for line in lines:
+        print(line)
+    print()
 
 
 def display_benchmark_suite(suite):
@@ -330,27 +1268,103 @@ def display_benchmark_suite(suite):
     for bench in suite.get_benchmarks():
         print("### %s ###" % bench.get_name())
         print(format_result(bench))
+        peak_memory = get_peak_memory(bench)
+        if peak_memory is not None:
+            print("Peak memory: %s" % format_memory(peak_memory))
+        throughput = get_throughput(bench)
+        if throughput is not None:
+            print("Throughput: %s" % format_throughput(throughput))
+        throughput = get_throughput(bench, PAYLOAD_ROWS_METADATA)
+        if throughput is not None:
+            print("Throughput: %s" % format_row_throughput(throughput))
+        usage = get_rusage(bench)
+        if usage:
+            print("Resource usage per iteration:")
+            for key, title in RUSAGE_METADATA:
+                if key in usage:
+                    print("- %s: %s" % (title, format_counter(key, usage[key])))
+        counts = get_perf_stat(bench)
+        if counts:
+            print("Perf events per iteration:")
+            for key, value in counts.items():
+                event = key[len(PERF_STAT_PREFIX) :]
+                print("- %s: %s" % (event, format_counter(key, value)))
+        alloc = get_alloc_profile(bench)
+        if alloc:
+            print("Allocations (untimed tracemalloc pass):")
+            for key, title in ALLOC_METADATA:
+                if key in alloc:
+                    print("- %s: %s" % (title, format_counter(key, alloc[key])))
+        latency = get_latency(bench)
+        if latency:
+            print("Latency:")
+            for key, title in LATENCY_METADATA:
+                if key in latency:
+                    print("- %s: %s" % (title, format_counter(key, latency[key])))
+        gc_stats = get_gc_stats(bench)
+        if gc_stats:
+            print("Garbage collections:")
+            for key, title in (*GC_METADATA, *GC_PAUSE_METADATA):
+                if key in gc_stats:
+                    print("- %s: %s" % (title, format_counter(key, gc_stats[key])))
+        pystats = get_pystats(bench)
+        if pystats:
+            print("Python stats per iteration:")
+            for key, title in PYSTATS_METADATA:
+                if key in pystats:
+                    print("- %s: %s" % (title, format_counter(key, pystats[key])))
+        print()
+
+    scaling = get_thread_scaling(suite.get_benchmarks())
+    for group, rows in sorted(scaling.items()):
+        print("### Thread scaling of %s ###" % group)
+        print(format_scaling_table(rows))
+        print()
+
+    table = format_sweep_table(get_sweep_series(suite.get_benchmarks()))
+    if table:
+        print("### Size sweeps ###")
+        print(table)
         print()
 
 
-def get_labels(filename1, filename2):
-    # Find a short label to identify two filenames:
-    # the two labels must be different
-    name1 = os.path.basename(filename1)
-    name2 = os.path.basename(filename2)
-    if name1 != name2:
-        return (name1, name2)
+def get_labels(*filenames):
+    # Find a short label to identify each filename:
+    # the labels must be different
+    names = tuple(os.path.basename(filename) for filename in filenames)
+    if len(set(names)) == len(names):
+        return names
 
-    return (filename1, filename2)
+    return filenames
+
+
+def check_versions(base_suite, changed_suite):
+    version1 = base_suite.get_metadata().get("performance_version", NO_VERSION)
+    version2 = changed_suite.get_metadata().get("performance_version", NO_VERSION)
+    if version1 != version2 or (version1 == version2 == NO_VERSION):
+        raise VersionMismatchError(version1, version2)
+
+
+def get_counter_sections(options):
+    """Get the set of the COUNTER_SECTIONS enabled by options."""
+    return {name for name, _, _ in COUNTER_SECTIONS if getattr(options, name, False)}
+
+
+def get_counter_tables(sections):
+    """Get the (header, compare_func) counter tables of sections."""
+    return [("Throughput", compare_throughput)] + [
+        (header, compare_func)
+        for name, header, compare_func in COUNTER_SECTIONS
+        if name in sections
+    ]
 
 
 def compare_results(options):
-    base_label, changed_label = get_labels(
-        options.baseline_filename, options.changed_filename
-    )
+    (changed_filename,) = options.changed_filenames
+    base_label, changed_label = get_labels(options.baseline_filename, changed_filename)
 
     base_suite = pyperf.BenchmarkSuite.load(options.baseline_filename)
-    changed_suite = pyperf.BenchmarkSuite.load(options.changed_filename)
+    changed_suite = pyperf.BenchmarkSuite.load(changed_filename)
 
     results = []
     common = set(base_suite.get_benchmark_names()) & set(
@@ -376,20 +1390,51 @@ def compare_results(options):
     display_suite_metadata(base_suite, title=base_label)
     display_suite_metadata(changed_suite, title=changed_label)
 
+    memory = getattr(options, "memory", False)
+    sections = get_counter_sections(options)
+
     if options.output_style == "normal":
         for index, item in enumerate(shown):
             if index:
                 print()
             name, result = item
             print("###", name, "###")
-            print(result)
+            print(result.format(memory=memory, sections=sections))
 
     elif options.output_style == "table":
         if shown:
-            print(format_table(base_label, changed_label, shown))
+            print(format_table(base_label, changed_label, shown, memory=memory))
+        for header, compare_func in get_counter_tables(sections):
+            table = format_counters_table(
+                header, base_label, changed_label, shown, compare_func
+            )
+            if table:
+                print()
+                print(table)
     else:
         raise ValueError("Invalid output_style: %r" % options.output_style)
 
+    if getattr(options, "scaling", False):
+        table = format_scaling_comparison(
+            base_label, changed_label, base_suite, changed_suite
+        )
+        if table:
+            print()
+            print("Thread scaling:")
+            print(table)
+
+    table = format_sweep_comparison(
+        base_label, changed_label, base_suite, changed_suite
+    )
+    if table:
+        print()
+        print("Cost per element of size sweeps:")
+        print(table)
+
+    if getattr(options, "aggregate", False):
+        pairs = [(result.base, result.changed) for result in results]
+        display_aggregates([changed_label], [pairs], options)
+
     if hidden:
         print()
         print("The following not significant results are hidden, use -v to show them:")
@@ -411,10 +1456,91 @@ def compare_results(options):
             % (len(only_changed), changed_label, ", ".join(sorted(only_changed)))
         )
 
-    version1 = base_suite.get_metadata().get("performance_version", NO_VERSION)
-    version2 = changed_suite.get_metadata().get("performance_version", NO_VERSION)
-    if version1 != version2 or (version1 == version2 == NO_VERSION):
-        raise VersionMismatchError(version1, version2)
+    check_versions(base_suite, changed_suite)
+
+    return results
+
+
+def compare_multiple_results(options):
+    filenames = (options.baseline_filename, *options.changed_filenames)
+    base_label, *changed_labels = get_labels(*filenames)
+
+    # Load each file only once
+    base_suite, *changed_suites = [
+        pyperf.BenchmarkSuite.load(filename) for filename in filenames
+    ]
+
+    display_suite_metadata(base_suite, title=base_label)
+    for label, suite in zip(changed_labels, changed_suites):
+        display_suite_metadata(suite, title=label)
+
+    base_names = set(base_suite.get_benchmark_names())
+    changed_names = [set(suite.get_benchmark_names()) for suite in changed_suites]
+
+    results = []
+    for name in sorted(base_names.intersection(set().union(*changed_names))):
+        changed = [
+            suite.get_benchmark(name) if name in names else None
+            for suite, names in zip(changed_suites, changed_names)
+        ]
+        results.append(MultiBenchmarkResult(base_suite.get_benchmark(name), changed))
+
+    # The normal output style only makes sense for two files
+    if results:
+        print(format_multi_table(base_label, changed_labels, results))
+
+    if results and getattr(options, "memory", False):
+        table = format_multi_memory_table(base_label, changed_labels, results)
+        if table:
+            print()
+            print("Peak memory:")
+            print(table)
+
+    # One table per changed file: the counters don't fit in a single table
+    for header, compare_func in get_counter_tables(get_counter_sections(options)):
+        for index, label in enumerate(changed_labels):
+            shown = [
+                (result.name, result.get_result(index))
+                for result in results
+                if result.changed[index] is not None
+            ]
+            table = format_counters_table(
+                header, base_label, label, shown, compare_func
+            )
+            if table:
+                print()
+                print(table)
+
+    if getattr(options, "aggregate", False):
+        pairs_per_file = [
+            [
+                (result.base, result.changed[index])
+                for result in results
+                if result.changed[index] is not None
+            ]
+            for index in range(len(changed_labels))
+        ]
+        display_aggregates(changed_labels, pairs_per_file, options)
+
+    only_base = base_names.difference(*changed_names)
+    if only_base:
+        print()
+        print(
+            "Skipped %s benchmarks only in %s: %s"
+            % (len(only_base), base_label, ", ".join(sorted(only_base)))
+        )
+
+    for label, names in zip(changed_labels, changed_names):
+        only_changed = names - base_names
+        if only_changed:
+            print()
+            print(
+                "Skipped %s benchmarks only in %s: %s"
+                % (len(only_changed), label, ", ".join(sorted(only_changed)))
+            )
+
+    for suite in changed_suites:
+        check_versions(base_suite, suite)
 
     return results
 
@@ -432,13 +1558,39 @@ def format_csv(value):
         return "%.11f" % value
 
 
-def write_csv(results, filename):
+def write_csv(results, filename, memory=False):
     with open(filename, "w", newline="", encoding="ascii") as fp:
         writer = csv.writer(fp)
-        writer.writerow(["Benchmark", "Base", "Changed"])
+        header = ["Benchmark", "Base", "Changed"]
+        if memory:
+            header.extend(("Base memory", "Changed memory"))
+        writer.writerow(header)
         for result in results:
             name = result.base.get_name()
             base = result.base.mean()
             changed = result.changed.mean()
             row = [name, format_csv(base), format_csv(changed)]
+            if memory:
+                for bench in (result.base, result.changed):
+                    peak_memory = get_peak_memory(bench)
+                    row.append("%.0f" % peak_memory if peak_memory is not None else "")
+            writer.writerow(row)
+
+
+def write_multi_csv(results, filename, changed_labels, memory=False):
+    with open(filename, "w", newline="", encoding="ascii") as fp:
+        writer = csv.writer(fp)
+        header = ["Benchmark", "Base", *changed_labels]
+        if memory:
+            header.append("Base memory")
+            header.extend("%s memory" % label for label in changed_labels)
+        writer.writerow(header)
+        for result in results:
+            row = [result.name, format_csv(result.base.mean())]
+            for changed in result.changed:
+                row.append(format_csv(changed.mean()) if changed is not None else "")
+            if memory:
+                for bench in (result.base, *result.changed):
+                    peak_memory = get_peak_memory(bench) if bench is not None else None
+                    row.append("%.0f" % peak_memory if peak_memory is not None else "")
             writer.writerow(row)
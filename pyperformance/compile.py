@@ -1,7 +1,6 @@
 import configparser
 import datetime
 import errno
-import json
 import logging
 import math
 import os
@@ -12,14 +11,12 @@ import statistics
 import subprocess
 import sys
 import time
-from urllib.error import HTTPError
-from urllib.parse import urlencode
-from urllib.request import urlopen
 
 import pyperf
 
 import pyperformance
 from pyperformance import _pip, _utils
+from pyperformance._upload import UploadSpool
 
 GIT = True
 DEFAULT_BRANCH = "master" if GIT else "default"
@@ -297,6 +294,8 @@ class Python(Task):
             config_args.append(f"--enable-experimental-jit={self.conf.jit}")
         if self.conf.tail_call_interp:
             config_args.append("--with-tail-call-interp")
+        if self.conf.pystats:
+            config_args.append("--enable-pystats")
         if self.conf.pkg_only:
             config_args.extend(self.get_package_only_flags())
         if self.conf.debug:
@@ -574,6 +573,10 @@ class BenchmarkRevision(Application):
             cmd.append("--same-loops=%s" % self.conf.same_loops)
         if self.conf.rigorous:
             cmd.append("--rigorous")
+        if self.conf.pystats:
+            # Stats files are written next to the JSON file
+            pystats_dir = self.filename.removesuffix(".json.gz") + "-pystats"
+            cmd.append("--pystats=%s" % pystats_dir)
         exitcode = self.run_nocheck(*cmd)
 
         if os.path.exists(self.filename):
@@ -633,35 +636,15 @@ class BenchmarkRevision(Application):
             )
             sys.exit(1)
 
-        self.safe_makedirs(self.conf.uploaded_json_dir)
-
         suite = pyperf.BenchmarkSuite.load(self.filename)
         data = [self.encode_benchmark(bench) for bench in suite]
-        data = dict(json=json.dumps(data))
-
-        url = self.conf.url
-        if not url.endswith("/"):
-            url += "/"
-        url += "result/add/json/"
-        self.logger.error("Upload %s benchmarks to %s" % (len(suite), url))
-
-        try:
-            response = urlopen(data=urlencode(data).encode("utf-8"), url=url)
-            body = response.read()
-            response.close()
-        except HTTPError as err:
-            self.logger.error("HTTP Error: %s" % err)
-            errmsg = err.read().decode("utf8")
-            self.logger.error(errmsg)
-            err.close()
-            return
-
-        self.logger.error('Response: "%s"' % body.decode("utf-8"))
 
-        self.logger.error("Move %s to %s" % (self.filename, self.upload_filename))
-        os.rename(self.filename, self.upload_filename)
+        # Results are kept in the spool until the website acknowledged them
+        spool = UploadSpool(self.conf, self.logger)
+        spool.enqueue(self.filename, self.upload_filename, data)
+        uploaded = spool.drain()
 
-        self.uploaded = True
+        self.uploaded = os.path.abspath(self.filename) in uploaded
 
     def perf_system_tune(self):
         pythonpath = os.environ.get("PYTHONPATH")
@@ -718,6 +701,10 @@ class BenchmarkRevision(Application):
             self.logger.error("Disable upload if Python is not installed")
             self.conf.upload = False
 
+        if self.conf.pystats and self.conf.upload:
+            self.logger.error("Disable upload on Python built with pystats")
+            self.conf.upload = False
+
         if self.conf.system_tune:
             self.perf_system_tune()
 
@@ -819,6 +806,7 @@ def parse_config(filename, command):
     conf.json_dir = getfile("config", "json_dir")
     conf.json_patch_dir = os.path.join(conf.json_dir, "patch")
     conf.uploaded_json_dir = os.path.join(conf.json_dir, "uploaded")
+    conf.upload_spool_dir = os.path.join(conf.json_dir, "upload_spool")
     conf.debug = getboolean("config", "debug", False)
 
     if parse_compile:
@@ -833,6 +821,7 @@ def parse_config(filename, command):
         conf.pgo = getboolean("compile", "pgo", True)
         conf.jit = getstr("compile", "jit", "")
         conf.tail_call_interp = getboolean("compile", "tail_call_interp", False)
+        conf.pystats = getboolean("compile", "pystats", False)
         conf.install = getboolean("compile", "install", True)
         conf.pkg_only = getstr("compile", "pkg_only", "").split()
         try:
@@ -865,6 +854,12 @@ def parse_config(filename, command):
     conf.executable = getstr("upload", "executable", default="")
     conf.project = getstr("upload", "project", default="")
     conf.environment = getstr("upload", "environment", default="")
+    conf.upload_batch_size = getint("upload", "batch_size", 10)
+    conf.upload_retries = getint("upload", "retries", 5)
+    conf.upload_retry_delay = float(getstr("upload", "retry_delay", 1.0))
+    # Codespeed doesn't decode gzip-compressed request bodies: only the
+    # result_server command does, so compression must be enabled explicitly
+    conf.upload_compress = getboolean("upload", "compress", False)
 
     if check_upload and any(not getattr(conf, attr) for attr in UPLOAD_OPTIONS):
         print(
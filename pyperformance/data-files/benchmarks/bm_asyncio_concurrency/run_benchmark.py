@@ -0,0 +1,274 @@
+"""
+Benchmark asyncio with thousands of concurrent tasks.
+
+Workloads:
+
+* connections: 10,000 concurrent loopback connections, each sending
+  requests to an asyncio streams server and waiting for the responses.
+* queue_fanout: a producer puts items in an asyncio.Queue read by 1,000
+  consumer tasks.
+* queue_fanin: 1,000 producer tasks put items in an asyncio.Queue read by
+  a single consumer.
+* semaphore: 10,000 tasks contend for an asyncio.Semaphore of 100 slots.
+* call_soon: a storm of 100,000 loop.call_soon() callbacks.
+
+Each operation (request, queue item, semaphore acquisition or callback)
+appends its latency to LATENCIES, and the event loop selector appends the
+duration of each loop iteration to LOOP_LATENCIES. The "latency" pyperf
+hook, enabled by "pyperformance run --hook latency", stores the throughput
+and the percentiles of both lists in the run metadata.
+"""
+
+import asyncio
+import selectors
+
+import pyperf
+
+
+HOST = '127.0.0.1'
+CONNECTIONS = 10000
+REQUESTS_PER_CONNECTION = 5
+# Connections opened at the same time, below the listen backlog
+CONNECT_BATCH = 500
+TASKS = 1000
+QUEUE_ITEMS = 100000
+QUEUE_SIZE = 100
+SEMAPHORE_TASKS = 10000
+SEMAPHORE_SLOTS = 100
+CALLBACKS = 100000
+WORKLOADS = ('call_soon', 'connections', 'queue_fanin', 'queue_fanout',
+             'semaphore')
+
+# Latency of each operation in seconds, read by the "latency" pyperf hook
+LATENCIES = []
+# Duration of each event loop iteration in seconds
+LOOP_LATENCIES = []
+
+
+class TimingSelector(selectors.DefaultSelector):
+    """Selector recording the time spent between two select() calls.
+
+    This is the time spent by the event loop to process the events and to
+    run the ready callbacks of an iteration, excluding the time spent
+    waiting for events.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._last = None
+
+    def select(self, timeout=None):
+        now = pyperf.perf_counter()
+        if self._last is not None:
+            LOOP_LATENCIES.append(now - self._last)
+        events = super().select(timeout)
+        self._last = pyperf.perf_counter()
+        return events
+
+
+def new_event_loop():
+    return asyncio.SelectorEventLoop(TimingSelector())
+
+
+def get_max_connections():
+    # Each connection uses a file descriptor for the client socket and
+    # another one for the server socket
+    try:
+        import resource
+    except ImportError:
+        return CONNECTIONS
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    wanted = 2 * CONNECTIONS + 100
+    if soft != resource.RLIM_INFINITY and soft < wanted:
+        if hard == resource.RLIM_INFINITY or hard >= wanted:
+            soft = wanted
+        else:
+            soft = hard
+        resource.setrlimit(resource.RLIMIT_NOFILE, (soft, hard))
+    if soft == resource.RLIM_INFINITY:
+        return CONNECTIONS
+    return min(CONNECTIONS, (soft - 100) // 2)
+
+
+# connections
+
+
+async def handle_client(reader, writer):
+    while True:
+        request = await reader.readline()
+        if not request:
+            break
+        writer.write(b'OK ' + request)
+        await writer.drain()
+    writer.close()
+    await writer.wait_closed()
+
+
+async def send_requests(reader, writer):
+    for index in range(REQUESTS_PER_CONNECTION):
+        start = pyperf.perf_counter()
+        writer.write(b'GET %d\n' % index)
+        response = await reader.readline()
+        LATENCIES.append(pyperf.perf_counter() - start)
+        if response != b'OK GET %d\n' % index:
+            raise Exception("unexpected response: %r" % response)
+
+
+class Connections:
+    def __init__(self, loop, count):
+        self.loop = loop
+        # Task of the server side of each connection, awaited by close()
+        self.handlers = []
+        self.server = loop.run_until_complete(
+            asyncio.start_server(self.client_connected, HOST, 0,
+                                 backlog=CONNECT_BATCH))
+        port = self.server.sockets[0].getsockname()[1]
+        self.clients = []
+        for start in range(0, count, CONNECT_BATCH):
+            batch = [asyncio.open_connection(HOST, port)
+                     for _ in range(min(CONNECT_BATCH, count - start))]
+            self.clients.extend(loop.run_until_complete(asyncio.gather(*batch)))
+
+    async def run(self):
+        await asyncio.gather(*[send_requests(reader, writer)
+                               for reader, writer in self.clients])
+
+    def client_connected(self, reader, writer):
+        self.handlers.append(self.loop.create_task(handle_client(reader,
+                                                                 writer)))
+
+    async def close_connections(self):
+        for _, writer in self.clients:
+            writer.close()
+        await asyncio.gather(*[writer.wait_closed()
+                               for _, writer in self.clients])
+        # Handlers exit when they read the end of file of their client
+        await asyncio.gather(*self.handlers)
+        self.server.close()
+        await self.server.wait_closed()
+
+    def close(self):
+        self.loop.run_until_complete(self.close_connections())
+
+
+# queues
+
+
+async def produce(queue, count):
+    for _ in range(count):
+        await queue.put(pyperf.perf_counter())
+
+
+async def consume(queue):
+    while True:
+        item = await queue.get()
+        if item is None:
+            break
+        LATENCIES.append(pyperf.perf_counter() - item)
+
+
+async def queue_fanout():
+    queue = asyncio.Queue(QUEUE_SIZE)
+    consumers = [asyncio.create_task(consume(queue)) for _ in range(TASKS)]
+    await produce(queue, QUEUE_ITEMS)
+    for _ in range(TASKS):
+        await queue.put(None)
+    await asyncio.gather(*consumers)
+
+
+async def queue_fanin():
+    queue = asyncio.Queue(QUEUE_SIZE)
+    consumer = asyncio.create_task(consume(queue))
+    await asyncio.gather(*[produce(queue, QUEUE_ITEMS // TASKS)
+                           for _ in range(TASKS)])
+    await queue.put(None)
+    await consumer
+
+
+# semaphore
+
+
+async def acquire(semaphore):
+    start = pyperf.perf_counter()
+    async with semaphore:
+        LATENCIES.append(pyperf.perf_counter() - start)
+        # Hold the slot during an event loop iteration
+        await asyncio.sleep(0)
+
+
+async def semaphore_contention():
+    semaphore = asyncio.Semaphore(SEMAPHORE_SLOTS)
+    await asyncio.gather(*[acquire(semaphore)
+                           for _ in range(SEMAPHORE_TASKS)])
+
+
+# call_soon
+
+
+async def call_soon_storm():
+    loop = asyncio.get_running_loop()
+    done = loop.create_future()
+    remaining = CALLBACKS
+
+    def callback(scheduled):
+        nonlocal remaining
+        LATENCIES.append(pyperf.perf_counter() - scheduled)
+        remaining -= 1
+        if not remaining:
+            done.set_result(None)
+
+    for _ in range(CALLBACKS):
+        loop.call_soon(callback, pyperf.perf_counter())
+    await done
+
+
+COROUTINES = {
+    'call_soon': call_soon_storm,
+    'queue_fanin': queue_fanin,
+    'queue_fanout': queue_fanout,
+    'semaphore': semaphore_contention,
+}
+
+
+def bench_asyncio(loops, loop, workload, state):
+    if workload == 'connections':
+        # Connect in the worker process on the first call, not in the
+        # pyperf master process
+        if 'connections' not in state:
+            state['connections'] = Connections(loop, state['count'])
+        coro_func = state['connections'].run
+    else:
+        coro_func = COROUTINES[workload]
+    # Only keep the latencies of the current value
+    del LATENCIES[:]
+    del LOOP_LATENCIES[:]
+    dt = 0
+    for _ in range(loops):
+        t0 = pyperf.perf_counter()
+        loop.run_until_complete(coro_func())
+        dt += pyperf.perf_counter() - t0
+    return dt
+
+
+def add_cmdline_args(cmd, args):
+    cmd.append(args.workload)
+
+
+if __name__ == '__main__':
+    runner = pyperf.Runner(add_cmdline_args=add_cmdline_args)
+    runner.argparser.add_argument('workload', choices=WORKLOADS)
+    args = runner.parse_args()
+
+    loop = new_event_loop()
+    asyncio.set_event_loop(loop)
+    state = {}
+    if args.workload == 'connections':
+        state['count'] = get_max_connections()
+        runner.metadata['connections'] = state['count']
+    runner.metadata['description'] = ("asyncio with thousands of concurrent "
+                                      "tasks: %s" % args.workload)
+    runner.bench_time_func('asyncio_concurrency_%s' % args.workload,
+                           bench_asyncio, loop, args.workload, state)
+    if 'connections' in state:
+        state['connections'].close()
+    loop.close()
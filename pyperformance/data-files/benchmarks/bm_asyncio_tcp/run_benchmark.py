@@ -7,27 +7,30 @@ Author: Kumar Aditya
 
 
 import asyncio
+import functools
 from pyperf import Runner
 import ssl
 import os
 
 CHUNK_SIZE = 1024 ** 2 * 10
+# Number of chunks written by the server
+CHUNKS = 100
 # Taken from CPython's test suite
 SSL_CERT = os.path.join(os.path.dirname(__file__), 'ssl_cert.pem')
 SSL_KEY = os.path.join(os.path.dirname(__file__), 'ssl_key.pem')
 
 
 async def handle_echo(reader: asyncio.StreamReader,
-                      writer: asyncio.StreamWriter) -> None:
+                      writer: asyncio.StreamWriter, chunks: int) -> None:
     data = b'x' * CHUNK_SIZE
-    for _ in range(100):
+    for _ in range(chunks):
         writer.write(data)
         await writer.drain()
     writer.close()
     await writer.wait_closed()
 
 
-async def main(use_ssl: bool) -> None:
+async def main(use_ssl: bool, chunks: int) -> None:
     if use_ssl:
         server_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
         server_context.load_cert_chain(SSL_CERT, SSL_KEY)
@@ -42,18 +45,21 @@ async def main(use_ssl: bool) -> None:
         server_context = None
         client_context = None
 
-    server = await asyncio.start_server(handle_echo, '127.0.0.1', 8882, ssl=server_context)
+    handler = functools.partial(handle_echo, chunks=chunks)
+    server = await asyncio.start_server(handler, '127.0.0.1', 0,
+                                        ssl=server_context)
+    port = server.sockets[0].getsockname()[1]
 
     async with server:
         asyncio.create_task(server.start_serving())
-        reader, writer = await asyncio.open_connection('127.0.0.1', 8882, ssl=client_context)
+        reader, writer = await asyncio.open_connection('127.0.0.1', port, ssl=client_context)
         data_len = 0
         while True:
             data = await reader.read(CHUNK_SIZE)
             if not data:
                 break
             data_len += len(data)
-        assert data_len == CHUNK_SIZE * 100
+        assert data_len == CHUNK_SIZE * chunks
         writer.close()
         await writer.wait_closed()
 
@@ -61,12 +67,16 @@ async def main(use_ssl: bool) -> None:
 def add_cmdline_args(cmd, args):
     if args.ssl:
         cmd.append("--ssl")
+    cmd.append("--size=%s" % args.size)
 
 
 if __name__ == '__main__':
     runner = Runner(add_cmdline_args=add_cmdline_args)
     parser = runner.argparser
     parser.add_argument('--ssl', action='store_true', default=False)
+    parser.add_argument('--size', type=int, default=CHUNKS,
+                        help='Number of chunks of 10 MiB written by the '
+                             'server (default: %s)' % CHUNKS)
     args = runner.parse_args()
     name = 'asyncio_tcp' + ('_ssl' if args.ssl else '')
-    runner.bench_async_func(name, main, args.ssl)
+    runner.bench_async_func(name, main, args.ssl, args.size)
@@ -35,8 +35,9 @@ async def main() -> None:
     global stop
     t0 = pyperf.perf_counter()
     stop = asyncio.Event()
-    async with websockets.server.serve(handler, "", 8001):
-        async with websockets.client.connect("ws://localhost:8001") as ws:
+    async with websockets.server.serve(handler, "127.0.0.1", 0) as server:
+        port = server.sockets[0].getsockname()[1]
+        async with websockets.client.connect(f"ws://127.0.0.1:{port}") as ws:
             await asyncio.gather(*[send(ws) for _ in range(100)])
         await stop.wait()
     return pyperf.perf_counter() - t0
@@ -0,0 +1,217 @@
+"""
+Benchmark streaming compression, decompression and hashing of generated
+log data, fed in blocks.
+
+Workloads:
+
+* zlib, gzip, bz2, lzma: compress and decompress the data.
+* zipfile, tarfile: write and read back a deflate member of an archive.
+* sha256, blake2b: hash the data with hashlib.
+
+With --threads, each value runs the workload in several threads at the
+same time: zlib, bz2, lzma and hashlib release the GIL while they process
+large blocks. The number of processed bytes is stored in the "payload_size"
+metadata to compute the throughput.
+"""
+
+import bz2
+import concurrent.futures
+import gzip
+import hashlib
+import io
+import lzma
+import random
+import tarfile
+import zipfile
+import zlib
+
+import pyperf
+
+
+KB = 1024
+MB = 1024 ** 2
+# Default block size in KiB
+BLOCK = 64
+# Size of the data processed by a thread, per workload
+DATA_SIZES = {
+    'zlib': 8 * MB,
+    'gzip': 8 * MB,
+    'bz2': 2 * MB,
+    'lzma': 1 * MB,
+    'zipfile': 8 * MB,
+    'tarfile': 8 * MB,
+    'sha256': 32 * MB,
+    'blake2b': 32 * MB,
+}
+
+
+def make_data(size):
+    rand = random.Random(5)
+    words = [b'GET', b'POST', b'/api/v1/items', b'/login', b'200', b'404',
+             b'user', b'session', b'cache', b'miss', b'hit']
+    lines = []
+    total = 0
+    index = 0
+    while total < size:
+        line = b'2024-01-01T00:00:%02d request=%d %s %x\n' % (
+            index % 60, index,
+            b' '.join(rand.choice(words) for _ in range(rand.randrange(3, 9))),
+            rand.getrandbits(64))
+        lines.append(line)
+        total += len(line)
+        index += 1
+    return b''.join(lines)[:size]
+
+
+def iter_blocks(data, block_size):
+    view = memoryview(data)
+    for start in range(0, len(view), block_size):
+        yield view[start:start + block_size]
+
+
+def roundtrip_codec(data, block_size, compressor, decompressor):
+    compressed = []
+    for block in iter_blocks(data, block_size):
+        compressed.append(compressor.compress(block))
+    compressed.append(compressor.flush())
+    compressed = b''.join(compressed)
+
+    size = 0
+    for block in iter_blocks(compressed, block_size):
+        size += len(decompressor.decompress(block))
+    return size
+
+
+def roundtrip_zlib(data, block_size):
+    return roundtrip_codec(data, block_size,
+                           zlib.compressobj(), zlib.decompressobj())
+
+
+def roundtrip_bz2(data, block_size):
+    return roundtrip_codec(data, block_size,
+                           bz2.BZ2Compressor(), bz2.BZ2Decompressor())
+
+
+def roundtrip_lzma(data, block_size):
+    return roundtrip_codec(data, block_size,
+                           lzma.LZMACompressor(), lzma.LZMADecompressor())
+
+
+def read_blocks(fp, block_size):
+    size = 0
+    while True:
+        block = fp.read(block_size)
+        if not block:
+            break
+        size += len(block)
+    return size
+
+
+def roundtrip_gzip(data, block_size):
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode='wb') as fp:
+        for block in iter_blocks(data, block_size):
+            fp.write(block)
+    buffer.seek(0)
+    with gzip.GzipFile(fileobj=buffer, mode='rb') as fp:
+        return read_blocks(fp, block_size)
+
+
+def roundtrip_zipfile(data, block_size):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        with archive.open('app.log', 'w') as fp:
+            for block in iter_blocks(data, block_size):
+                fp.write(block)
+    with zipfile.ZipFile(buffer) as archive:
+        with archive.open('app.log') as fp:
+            return read_blocks(fp, block_size)
+
+
+def roundtrip_tarfile(data, block_size):
+    buffer = io.BytesIO()
+    # Stream modes ("|") read and write the archive in blocks of bufsize
+    with tarfile.open(fileobj=buffer, mode='w|gz',
+                      bufsize=block_size) as archive:
+        info = tarfile.TarInfo('app.log')
+        info.size = len(data)
+        archive.addfile(info, io.BytesIO(data))
+    buffer.seek(0)
+    with tarfile.open(fileobj=buffer, mode='r|gz',
+                      bufsize=block_size) as archive:
+        member = archive.next()
+        return read_blocks(archive.extractfile(member), block_size)
+
+
+def hash_data(data, block_size, name):
+    hasher = hashlib.new(name)
+    for block in iter_blocks(data, block_size):
+        hasher.update(block)
+    hasher.digest()
+    return len(data)
+
+
+def roundtrip_sha256(data, block_size):
+    return hash_data(data, block_size, 'sha256')
+
+
+def roundtrip_blake2b(data, block_size):
+    return hash_data(data, block_size, 'blake2b')
+
+
+def bench_compression(loops, func, data, block_size, executor, threads):
+    range_it = range(loops)
+    t0 = pyperf.perf_counter()
+    for _ in range_it:
+        if executor is None:
+            sizes = [func(data, block_size)]
+        else:
+            futures = [executor.submit(func, data, block_size)
+                       for _ in range(threads)]
+            sizes = [future.result() for future in futures]
+    dt = pyperf.perf_counter() - t0
+    if sizes != [len(data)] * threads:
+        raise Exception("unexpected sizes: %s" % sizes)
+    return dt
+
+
+def add_cmdline_args(cmd, args):
+    cmd.append(args.workload)
+    cmd.append("--block=%s" % args.block)
+    if args.threads:
+        cmd.append("--threads=%s" % args.threads)
+
+
+if __name__ == "__main__":
+    runner = pyperf.Runner(add_cmdline_args=add_cmdline_args)
+    parser = runner.argparser
+    parser.add_argument('workload', choices=sorted(DATA_SIZES))
+    parser.add_argument('--block', type=int, default=BLOCK,
+                        help='Block size in KiB (default: %s)' % BLOCK)
+    parser.add_argument('--threads', type=int, default=0,
+                        help='Run the workload in THREADS threads at the '
+                             'same time (default: a single thread, without '
+                             'thread pool)')
+    args = runner.parse_args()
+
+    name = 'compression_%s' % args.workload
+    data = make_data(DATA_SIZES[args.workload])
+    func = globals()['roundtrip_' + args.workload]
+    block_size = args.block * KB
+    if args.threads:
+        name += '_threads'
+        threads = args.threads
+        executor = concurrent.futures.ThreadPoolExecutor(threads)
+    else:
+        threads = 1
+        executor = None
+
+    runner.metadata['description'] = ("Streaming %s of %s MiB in blocks of "
+                                      "%s KiB, %s thread(s)"
+                                      % (args.workload, len(data) // MB,
+                                         args.block, threads))
+    runner.metadata['payload_size'] = len(data) * threads
+    runner.bench_time_func(name, bench_compression,
+                           func, data, block_size, executor, threads)
+    if executor is not None:
+        executor.shutdown()
@@ -0,0 +1,62 @@
+"""
+Task bodies run by the workers of the concurrent_pools benchmark.
+
+They are in their own module, rather than in run_benchmark.py, so that
+worker processes and subinterpreters can import them by name.
+"""
+
+from multiprocessing import shared_memory
+
+
+# Number of float64 values of an item
+BLOCK_ITEMS = 1024
+BLOCK_SIZE = BLOCK_ITEMS * 8
+# Passes over the values of the CPU-heavy body
+CPU_PASSES = 4
+
+# Shared memory attached by the worker processes of the shared_memory executor
+_shm = None
+
+
+def trivial(blocks):
+    # Return the items unchanged: the cost is the dispatch and the transfer
+    return blocks
+
+
+def cpu(blocks):
+    results = []
+    for block in blocks:
+        values = memoryview(block).cast('d')
+        total = 0.0
+        for _ in range(CPU_PASSES):
+            for value in values:
+                total += value * value
+        results.append(total)
+    return results
+
+
+def attach_shared_memory(name):
+    global _shm
+    try:
+        # Python 3.13 and newer: don't register the segment to the
+        # resource tracker, the parent process unlinks it
+        _shm = shared_memory.SharedMemory(name, track=False)
+    except TypeError:
+        _shm = shared_memory.SharedMemory(name)
+
+
+def _shared_blocks(start, count):
+    view = _shm.buf[start * BLOCK_SIZE:(start + count) * BLOCK_SIZE]
+    return [view[index * BLOCK_SIZE:(index + 1) * BLOCK_SIZE]
+            for index in range(count)]
+
+
+def shared_trivial(start, count):
+    # The items stay in shared memory: only read their first byte
+    for block in _shared_blocks(start, count):
+        block[0]
+    return count
+
+
+def shared_cpu(start, count):
+    return cpu(_shared_blocks(start, count))
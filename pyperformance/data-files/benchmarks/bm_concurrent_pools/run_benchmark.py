@@ -0,0 +1,156 @@
+"""
+Compare the executors of concurrent.futures and shared memory transfer.
+
+Executors:
+
+* thread: ThreadPoolExecutor.
+* process: ProcessPoolExecutor, items pickled to the worker processes.
+* shared_memory: ProcessPoolExecutor, items read by the worker processes
+  from a multiprocessing.shared_memory segment: only their indexes are sent.
+* interpreter: InterpreterPoolExecutor (Python 3.14 and newer), items
+  pickled to the subinterpreters.
+
+Each item is a block of 1,024 floats and each task processes "chunk" items.
+The "trivial" body returns the items unchanged, so the time per item is the
+dispatch and transfer overhead. The "cpu" body computes sums of squares in
+pure Python, so the time per item gives the throughput.
+
+Each executor is run with a single worker ("single") and with one worker
+per available CPU ("scaled"). Benchmark names don't depend on the number of
+CPUs, stored in the "threads" metadata. The "threads" and "scaling_group"
+metadata are used by "pyperformance show" and "pyperformance compare
+--scaling" to compute the scaling efficiency.
+"""
+
+import array
+import concurrent.futures
+import os
+import random
+import site
+from multiprocessing import shared_memory
+
+import pyperf
+
+import pool_tasks
+
+
+# Items processed per value
+ITEMS = 512
+# Default number of items per task
+CHUNK = 16
+EXECUTORS = ('interpreter', 'process', 'shared_memory', 'thread')
+BODIES = ('cpu', 'trivial')
+
+
+def make_blocks():
+    rand = random.Random(5)
+    return [array.array('d', (rand.random()
+                              for _ in range(pool_tasks.BLOCK_ITEMS))).tobytes()
+            for _ in range(ITEMS)]
+
+
+class Pool:
+    def __init__(self, executor, workers):
+        self.executor = executor
+        self.shm = None
+        if executor == 'thread':
+            self.pool = concurrent.futures.ThreadPoolExecutor(workers)
+        elif executor == 'process':
+            self.pool = concurrent.futures.ProcessPoolExecutor(workers)
+        elif executor == 'shared_memory':
+            blocks = make_blocks()
+            self.shm = shared_memory.SharedMemory(
+                create=True, size=ITEMS * pool_tasks.BLOCK_SIZE)
+            self.shm.buf[:self.shm.size] = b''.join(blocks)
+            self.pool = concurrent.futures.ProcessPoolExecutor(
+                workers,
+                initializer=pool_tasks.attach_shared_memory,
+                initargs=(self.shm.name,))
+        else:
+            # Subinterpreters don't inherit the directory of the script in
+            # sys.path: add it to import pool_tasks
+            self.pool = concurrent.futures.InterpreterPoolExecutor(
+                workers,
+                initializer=site.addsitedir,
+                initargs=(os.path.dirname(os.path.abspath(__file__)),))
+        if self.shm is None:
+            self.blocks = make_blocks()
+
+    def submit(self, body, chunk):
+        if self.shm is not None:
+            func = getattr(pool_tasks, 'shared_' + body)
+            return [self.pool.submit(func, start, min(chunk, ITEMS - start))
+                    for start in range(0, ITEMS, chunk)]
+        func = getattr(pool_tasks, body)
+        return [self.pool.submit(func, self.blocks[start:start + chunk])
+                for start in range(0, ITEMS, chunk)]
+
+    def close(self):
+        self.pool.shutdown()
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+
+
+def bench_pool(loops, executor, body, workers, chunk, state):
+    # Start the workers in the worker process on the first call, not in the
+    # pyperf master process
+    if 'pool' not in state:
+        state['pool'] = Pool(executor, workers)
+    pool = state['pool']
+    range_it = range(loops)
+    t0 = pyperf.perf_counter()
+    for _ in range_it:
+        futures = pool.submit(body, chunk)
+        results = [future.result() for future in futures]
+    dt = pyperf.perf_counter() - t0
+
+    if pool.shm is not None and body == 'trivial':
+        count = sum(results)
+    else:
+        count = sum(len(result) for result in results)
+    if count != ITEMS:
+        raise Exception("unexpected number of items: %s" % count)
+    return dt
+
+
+def get_cpu_count():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def add_cmdline_args(cmd, args):
+    cmd.extend((args.executor, args.body))
+    cmd.append("--chunk=%s" % args.chunk)
+
+
+if __name__ == "__main__":
+    runner = pyperf.Runner(add_cmdline_args=add_cmdline_args)
+    parser = runner.argparser
+    parser.add_argument('executor', choices=EXECUTORS)
+    parser.add_argument('body', choices=BODIES)
+    parser.add_argument('--chunk', type=int, default=CHUNK,
+                        help='Number of items per task (default: %s)' % CHUNK)
+    args = runner.parse_args()
+    if (args.executor == 'interpreter'
+            and not hasattr(concurrent.futures, 'InterpreterPoolExecutor')):
+        raise SystemExit("InterpreterPoolExecutor is not available")
+
+    name = 'concurrent_pools_%s_%s' % (args.executor, args.body)
+    runner.metadata['description'] = ("%s executor, %s task body, %s items "
+                                      "per task"
+                                      % (args.executor, args.body, args.chunk))
+    runner.metadata['chunk'] = args.chunk
+    for variant, workers in (('single', 1), ('scaled', get_cpu_count())):
+        state = {}
+        runner.bench_time_func(
+            '%s_%s' % (name, variant),
+            bench_pool, args.executor, args.body, workers, args.chunk, state,
+            # Time per item
+            inner_loops=ITEMS,
+            metadata={'threads': workers,
+                      'scaling_group': '%s_chunk%s' % (name, args.chunk)})
+        if 'pool' in state:
+            state['pool'].close()
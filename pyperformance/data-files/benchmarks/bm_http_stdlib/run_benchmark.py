@@ -0,0 +1,175 @@
+"""
+Benchmark an HTTP client and server using only the standard library.
+
+A http.server.ThreadingHTTPServer runs on the loopback interface. Client
+threads send requests on keep-alive http.client connections, which parse
+the response headers with the email package.
+
+Workloads:
+
+* small: 100 bytes bodies.
+* large: 1 MiB bodies with a Content-Length.
+* chunked: 1 MiB bodies sent with the chunked transfer encoding, in chunks
+  of 16 KiB.
+* urllib: 100 bytes bodies fetched with urllib.request.urlopen(), a new
+  connection per request.
+
+Each request appends its latency to LATENCIES. The "latency" pyperf hook,
+enabled by "pyperformance run --hook latency", stores the throughput in
+requests per second and the p50, p90, p99 and p99.9 latencies in the run
+metadata.
+"""
+
+import http.client
+import http.server
+import threading
+import urllib.request
+
+import pyperf
+
+
+HOST = '127.0.0.1'
+CLIENTS = 4
+KB = 1024
+MB = 1024 ** 2
+CHUNK_SIZE = 16 * KB
+# (path, requests per client thread) of each workload
+WORKLOADS = {
+    'small': ('/small', 250),
+    'large': ('/large', 10),
+    'chunked': ('/chunked', 10),
+    'urllib': ('/small', 100),
+}
+BODIES = {
+    '/small': b'x' * 100,
+    '/large': b'x' * MB,
+    '/chunked': b'x' * MB,
+}
+
+# Latency of each request in seconds, read by the "latency" pyperf hook
+LATENCIES = []
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    # Keep-alive connections
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately: don't wait for the delayed
+    # ACK of the client before sending the body
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        body = BODIES[self.path]
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/octet-stream')
+        if self.path == '/chunked':
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            view = memoryview(body)
+            for start in range(0, len(body), CHUNK_SIZE):
+                chunk = view[start:start + CHUNK_SIZE]
+                self.wfile.write(b'%x\r\n' % len(chunk))
+                self.wfile.write(chunk)
+                self.wfile.write(b'\r\n')
+            self.wfile.write(b'0\r\n\r\n')
+        else:
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Server:
+    def __init__(self):
+        self.server = http.server.ThreadingHTTPServer((HOST, 0),
+                                                      Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+
+def send_requests(port, path, requests):
+    size = len(BODIES[path])
+    conn = http.client.HTTPConnection(HOST, port)
+    try:
+        for _ in range(requests):
+            start = pyperf.perf_counter()
+            conn.request('GET', path)
+            response = conn.getresponse()
+            body = response.read()
+            LATENCIES.append(pyperf.perf_counter() - start)
+            if response.status != 200 or len(body) != size:
+                raise Exception("unexpected response: %s, %s bytes"
+                                % (response.status, len(body)))
+    finally:
+        conn.close()
+
+
+def send_urllib_requests(port, path, requests):
+    size = len(BODIES[path])
+    url = 'http://%s:%s%s' % (HOST, port, path)
+    for _ in range(requests):
+        start = pyperf.perf_counter()
+        with urllib.request.urlopen(url) as response:
+            body = response.read()
+        LATENCIES.append(pyperf.perf_counter() - start)
+        if len(body) != size:
+            raise Exception("unexpected response: %s bytes" % len(body))
+
+
+def bench_http(loops, workload, state):
+    path, requests = WORKLOADS[workload]
+    # Start the server in the worker process on the first call, not in the
+    # pyperf master process
+    if 'server' not in state:
+        state['server'] = Server()
+    port = state['server'].port
+    func = send_urllib_requests if workload == 'urllib' else send_requests
+    # Only keep the latencies of the current value
+    del LATENCIES[:]
+    dt = 0
+    for _ in range(loops):
+        clients = [threading.Thread(target=func,
+                                    args=(port, path, requests))
+                   for _ in range(CLIENTS)]
+        t0 = pyperf.perf_counter()
+        for thread in clients:
+            thread.start()
+        for thread in clients:
+            thread.join()
+        dt += pyperf.perf_counter() - t0
+    if len(LATENCIES) != loops * CLIENTS * requests:
+        raise Exception("%s requests failed"
+                        % (loops * CLIENTS * requests - len(LATENCIES)))
+    return dt
+
+
+def add_cmdline_args(cmd, args):
+    cmd.append(args.workload)
+
+
+if __name__ == '__main__':
+    runner = pyperf.Runner(add_cmdline_args=add_cmdline_args)
+    runner.argparser.add_argument('workload', choices=sorted(WORKLOADS))
+    args = runner.parse_args()
+
+    path, requests = WORKLOADS[args.workload]
+    runner.metadata['description'] = ("stdlib HTTP client and server: %s"
+                                      % args.workload)
+    if len(BODIES[path]) >= MB:
+        # Body size per request
+        runner.metadata['payload_size'] = len(BODIES[path])
+    state = {}
+    runner.bench_time_func('http_stdlib_%s' % args.workload,
+                           bench_http, args.workload, state,
+                           # Time per request
+                           inner_loops=CLIENTS * requests)
+    if 'server' in state:
+        state['server'].close()
@@ -0,0 +1,215 @@
+"""
+Benchmark file I/O: scan a generated text file of 100 MiB or more.
+
+Workloads:
+
+* read: buffered reads of chunks, allocating a new bytes object per chunk.
+* readinto: readinto() a preallocated bytearray, sliced with memoryview.
+* mmap: search the memory-mapped file.
+* lines: iterate on the lines of the file opened in binary mode.
+* copy: copy the file with os.copy_file_range() or os.sendfile().
+
+The scans count the lines containing a marker. The file is created in
+the temporary directory (TMPDIR) and reused by the worker processes. It is
+usually in the page cache, so the benchmarks measure the cost of the I/O
+calls and of the buffer management rather than the storage.
+"""
+
+import mmap
+import os
+import random
+import shutil
+import tempfile
+
+import pyperf
+
+
+MB = 1024 ** 2
+CHUNK_SIZE = 64 * 1024
+# Default file size in MiB
+SIZE = 100
+MARKER = b'ERROR'
+# One line out of MARKER_INTERVAL contains the marker
+MARKER_INTERVAL = 1000
+WORKLOADS = ('copy', 'lines', 'mmap', 'read', 'readinto')
+
+
+def make_lines(rand, count):
+    lines = []
+    for index in range(count):
+        level = MARKER if index % MARKER_INTERVAL == 0 else b'INFO'
+        fields = b' '.join(b'%x' % rand.getrandbits(32)
+                           for _ in range(rand.randrange(4, 12)))
+        lines.append(b'2024-01-01 %s request=%d %s\n' % (level, index, fields))
+    return b''.join(lines)
+
+
+def create_file(size):
+    """Create the file of size MiB, or reuse it.
+
+    Return (filename, number of marker lines).
+    """
+    filename = os.path.join(tempfile.gettempdir(),
+                            'pyperformance_io_%smb.log' % size)
+    # The same block of lines is written again and again
+    block = make_lines(random.Random(5), 10 * MARKER_INTERVAL)
+    nblock = size * MB // len(block) + 1
+    markers = nblock * block.count(MARKER)
+    if os.path.exists(filename):
+        return filename, markers
+
+    # Rename a complete file to never expose a truncated file to other
+    # worker processes
+    tmp = filename + '.%s.tmp' % os.getpid()
+    with open(tmp, 'wb') as fp:
+        for _ in range(nblock):
+            fp.write(block)
+    os.replace(tmp, filename)
+    return filename, markers
+
+
+def bench_read(loops, filename):
+    overlap = len(MARKER) - 1
+    range_it = range(loops)
+    t0 = pyperf.perf_counter()
+    for _ in range_it:
+        count = 0
+        tail = b''
+        with open(filename, 'rb') as fp:
+            while True:
+                chunk = fp.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                # Markers split between two chunks
+                count += (tail + chunk[:overlap]).count(MARKER)
+                count += chunk.count(MARKER)
+                tail = chunk[-overlap:]
+    dt = pyperf.perf_counter() - t0
+    return dt, count
+
+
+def bench_readinto(loops, filename):
+    overlap = len(MARKER) - 1
+    buffer = bytearray(overlap + CHUNK_SIZE)
+    view = memoryview(buffer)
+    range_it = range(loops)
+    t0 = pyperf.perf_counter()
+    for _ in range_it:
+        count = 0
+        start = overlap
+        with open(filename, 'rb', buffering=0) as fp:
+            while True:
+                size = fp.readinto(view[overlap:])
+                if not size:
+                    break
+                end = overlap + size
+                count += buffer.count(MARKER, start, end)
+                # Keep the end of the chunk before the next chunk
+                view[:overlap] = view[end - overlap:end]
+                start = 0
+    dt = pyperf.perf_counter() - t0
+    return dt, count
+
+
+def bench_mmap(loops, filename):
+    range_it = range(loops)
+    t0 = pyperf.perf_counter()
+    for _ in range_it:
+        count = 0
+        with open(filename, 'rb') as fp:
+            with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                pos = mm.find(MARKER)
+                while pos >= 0:
+                    count += 1
+                    pos = mm.find(MARKER, pos + len(MARKER))
+    dt = pyperf.perf_counter() - t0
+    return dt, count
+
+
+def bench_lines(loops, filename):
+    range_it = range(loops)
+    t0 = pyperf.perf_counter()
+    for _ in range_it:
+        count = 0
+        with open(filename, 'rb') as fp:
+            for line in fp:
+                if MARKER in line:
+                    count += 1
+    dt = pyperf.perf_counter() - t0
+    return dt, count
+
+
+def copy_file(src, dst, size):
+    if hasattr(os, 'copy_file_range'):
+        copy = os.copy_file_range
+    elif hasattr(os, 'sendfile'):
+        copy = os.sendfile
+    else:
+        shutil.copyfileobj(src, dst, CHUNK_SIZE)
+        return
+    infd = src.fileno()
+    outfd = dst.fileno()
+    copied = 0
+    while copied < size:
+        sent = copy(infd, outfd, size - copied)
+        if not sent:
+            break
+        copied += sent
+
+
+def get_copy_method():
+    for name in ('copy_file_range', 'sendfile'):
+        if hasattr(os, name):
+            return name
+    return 'copyfileobj'
+
+
+def bench_copy(loops, filename):
+    size = os.path.getsize(filename)
+    dst_filename = filename + '.%s.copy' % os.getpid()
+    try:
+        range_it = range(loops)
+        t0 = pyperf.perf_counter()
+        for _ in range_it:
+            with open(filename, 'rb') as src, open(dst_filename, 'wb') as dst:
+                copy_file(src, dst, size)
+        dt = pyperf.perf_counter() - t0
+        copied = os.path.getsize(dst_filename)
+    finally:
+        os.unlink(dst_filename)
+    return dt, copied
+
+
+def bench_io(loops, bench_func, filename, expected):
+    dt, result = bench_func(loops, filename)
+    if result != expected:
+        raise Exception("unexpected result: %s, expected %s"
+                        % (result, expected))
+    return dt
+
+
+def add_cmdline_args(cmd, args):
+    cmd.append(args.workload)
+    cmd.append("--size=%s" % args.size)
+
+
+if __name__ == "__main__":
+    runner = pyperf.Runner(add_cmdline_args=add_cmdline_args)
+    parser = runner.argparser
+    parser.add_argument('workload', choices=WORKLOADS)
+    parser.add_argument('--size', type=int, default=SIZE,
+                        help='File size in MiB (default: %s)' % SIZE)
+    args = runner.parse_args()
+
+    filename, markers = create_file(args.size)
+    bench_func = globals()['bench_' + args.workload]
+    if args.workload == 'copy':
+        expected = os.path.getsize(filename)
+        runner.metadata['copy_method'] = get_copy_method()
+    else:
+        expected = markers
+    runner.metadata['description'] = ("I/O on a %s MiB file: %s"
+                                      % (args.size, args.workload))
+    runner.metadata['payload_size'] = os.path.getsize(filename)
+    runner.bench_time_func('io_%s' % args.workload,
+                           bench_io, bench_func, filename, expected)
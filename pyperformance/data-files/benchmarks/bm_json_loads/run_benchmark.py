@@ -65,8 +65,9 @@ def mutate_dict(orig_dict, random_source):
     return new_dict
 
 
-random_source = random.Random(5)  # Fixed seed.
-DICT_GROUP = [mutate_dict(DICT, random_source) for _ in range(3)]
+def make_dict_group(size):
+    random_source = random.Random(5)  # Fixed seed.
+    return [mutate_dict(DICT, random_source) for _ in range(size)]
 
 
 def bench_json_loads(objs):
@@ -94,13 +95,21 @@ def bench_json_loads(objs):
         json.loads(obj)
 
 
+def add_cmdline_args(cmd, args):
+    cmd.append("--size=%s" % args.size)
+
+
 if __name__ == "__main__":
-    runner = pyperf.Runner()
+    runner = pyperf.Runner(add_cmdline_args=add_cmdline_args)
     runner.metadata['description'] = "Benchmark json.loads()"
+    runner.argparser.add_argument(
+        "--size", type=int, default=3,
+        help="Number of dictionaries of the list payload (default: 3)")
+    args = runner.parse_args()
 
     json_dict = json.dumps(DICT)
     json_tuple = json.dumps(TUPLE)
-    json_dict_group = json.dumps(DICT_GROUP)
+    json_dict_group = json.dumps(make_dict_group(args.size))
     objs = (json_dict, json_tuple, json_dict_group)
 
     runner.bench_func('json_loads', bench_json_loads, objs, inner_loops=20)
@@ -73,8 +73,12 @@ def mutate_dict(orig_dict, random_source):
     return new_dict
 
 
-random_source = random.Random(5)  # Fixed seed.
-DICT_GROUP = [mutate_dict(DICT, random_source) for _ in range(3)]
+def make_dict_group(size):
+    random_source = random.Random(5)  # Fixed seed.
+    return [mutate_dict(DICT, random_source) for _ in range(size)]
+
+
+DICT_GROUP = make_dict_group(3)
 
 
 def bench_pickle(loops, pickle, options):
@@ -151,7 +155,11 @@ def bench_unpickle(loops, pickle, options):
     return pyperf.perf_counter() - t0
 
 
-LIST = [[list(range(10)), list(range(10))] for _ in range(10)]
+def make_list(size):
+    return [[list(range(10)), list(range(10))] for _ in range(size)]
+
+
+LIST = make_list(10)
 
 
 def bench_pickle_list(loops, pickle, options):
@@ -202,7 +210,11 @@ def bench_unpickle_list(loops, pickle, options):
     return pyperf.perf_counter() - t0
 
 
-MICRO_DICT = dict((key, dict.fromkeys(range(10))) for key in range(100))
+def make_micro_dict(size):
+    return dict((key, dict.fromkeys(range(10))) for key in range(size))
+
+
+MICRO_DICT = make_micro_dict(100)
 
 
 def bench_pickle_dict(loops, pickle, options):
@@ -244,6 +256,8 @@ def add_cmdline_args(cmd, args):
     if args.pure_python:
         cmd.append("--pure-python")
     cmd.extend(("--protocol", str(args.protocol)))
+    if args.size is not None:
+        cmd.append("--size=%s" % args.size)
     cmd.append(args.benchmark)
 
 
@@ -256,11 +270,20 @@ if __name__ == "__main__":
                         help="Use the C version of pickle.")
     parser.add_argument("--protocol", action="store", default=None, type=int,
                         help="Which protocol to use (default: highest protocol).")
+    parser.add_argument("--size", type=int, default=None,
+                        help="Number of items of the payload: dictionaries of "
+                             "the list of pickle/unpickle, lists of "
+                             "pickle_list/unpickle_list, and keys of "
+                             "pickle_dict (default: 3, 10 and 100)")
     benchmarks = sorted(BENCHMARKS)
     parser.add_argument("benchmark", choices=benchmarks)
 
     options = runner.parse_args()
     benchmark, inner_loops = BENCHMARKS[options.benchmark]
+    if options.size is not None:
+        DICT_GROUP = make_dict_group(options.size)
+        LIST = make_list(options.size)
+        MICRO_DICT = make_micro_dict(options.size)
 
     name = options.benchmark
     if options.pure_python:
@@ -0,0 +1,217 @@
+"""
+Benchmark the serialization of multi-megabyte payloads.
+
+Workloads:
+
+* pickle_oob: pickle protocol 5 with out-of-band buffers (PickleBuffer and
+  buffer_callback): large buffers are not copied into the pickle data.
+* pickle_inband: the same payload pickled with protocol 5, buffers copied
+  into the pickle data.
+* pickle_arrays: array.array, bytes and bytearray objects pickled in-band.
+* marshal: bytes, floats and strings serialized by marshal.
+* json_dumps, json_loads: a JSON document of records.
+
+Each value is a round-trip (serialization then deserialization), except
+for JSON. The size of the serialized payload is stored in the
+"payload_size" metadata to compute the throughput.
+"""
+
+import array
+import json
+import marshal
+import pickle
+import random
+
+import pyperf
+
+
+MB = 1024 ** 2
+BLOB_SIZE = 1 * MB
+# Default payload size in MiB of each workload
+DEFAULT_SIZES = {
+    'pickle_oob': 64,
+    'pickle_inband': 64,
+    'pickle_arrays': 32,
+    'marshal': 32,
+    'json_dumps': 10,
+    'json_loads': 10,
+}
+
+
+class Blob:
+    """Object exposing a large buffer, like a NumPy array."""
+
+    def __init__(self, data):
+        self.data = data
+
+    def __reduce_ex__(self, protocol):
+        if protocol >= 5:
+            return type(self), (pickle.PickleBuffer(self.data),)
+        return type(self), (bytes(self.data),)
+
+
+def random_bytes(rand, size):
+    return rand.getrandbits(size * 8).to_bytes(size, 'little')
+
+
+def make_blobs(size):
+    rand = random.Random(5)
+    return {
+        'id': 12345,
+        'tags': ['payload', 'blob'],
+        'blobs': [Blob(bytearray(random_bytes(rand, BLOB_SIZE)))
+                  for _ in range(size)],
+    }
+
+
+def make_arrays(size):
+    rand = random.Random(5)
+    payload = []
+    # Each item uses 1 MiB: 64 Ki doubles, 128 Ki ints, 512 KiB of bytes
+    # and 256 KiB of bytearray
+    count = BLOB_SIZE // 16
+    for _ in range(size):
+        payload.append({
+            'doubles': array.array('d', (rand.random() for _ in range(count))),
+            'ints': array.array('i', range(count * 2)),
+            'bytes': random_bytes(rand, BLOB_SIZE // 2),
+            'bytearray': bytearray(random_bytes(rand, BLOB_SIZE // 4)),
+        })
+    return payload
+
+
+def make_marshal_payload(size):
+    rand = random.Random(5)
+    payload = []
+    for _ in range(size):
+        # About 1 MiB per item once serialized
+        payload.append((
+            random_bytes(rand, BLOB_SIZE // 2),
+            [rand.random() for _ in range(BLOB_SIZE // 36)],
+            ['item %s' % rand.randrange(10 ** 6)
+             for _ in range(BLOB_SIZE // 36)],
+        ))
+    return payload
+
+
+def make_record(rand, index):
+    return {
+        'id': index,
+        'name': 'user %s' % rand.randrange(10 ** 6),
+        'email': 'user%s@example.com' % rand.randrange(10 ** 6),
+        'score': rand.random() * 100,
+        'active': rand.random() < 0.5,
+        'tags': ['tag%s' % rand.randrange(100) for _ in range(5)],
+        'position': {'x': rand.random(), 'y': rand.random()},
+    }
+
+
+def make_document(size):
+    rand = random.Random(5)
+    # Records are reused to limit the memory usage of the document
+    records = [make_record(rand, index) for index in range(1000)]
+    record_size = len(json.dumps(records)) / len(records)
+    count = int(size * MB / record_size)
+    return [records[index % len(records)] for index in range(count)]
+
+
+def bench_pickle_oob(loops, payload):
+    range_it = range(loops)
+    t0 = pyperf.perf_counter()
+    for _ in range_it:
+        buffers = []
+        data = pickle.dumps(payload, protocol=5,
+                            buffer_callback=buffers.append)
+        pickle.loads(data, buffers=buffers)
+    return pyperf.perf_counter() - t0
+
+
+def bench_pickle(loops, payload):
+    range_it = range(loops)
+    t0 = pyperf.perf_counter()
+    for _ in range_it:
+        pickle.loads(pickle.dumps(payload, protocol=5))
+    return pyperf.perf_counter() - t0
+
+
+def bench_marshal(loops, payload):
+    range_it = range(loops)
+    t0 = pyperf.perf_counter()
+    for _ in range_it:
+        marshal.loads(marshal.dumps(payload))
+    return pyperf.perf_counter() - t0
+
+
+def bench_json_dumps(loops, payload):
+    range_it = range(loops)
+    t0 = pyperf.perf_counter()
+    for _ in range_it:
+        json.dumps(payload)
+    return pyperf.perf_counter() - t0
+
+
+def bench_json_loads(loops, data):
+    range_it = range(loops)
+    t0 = pyperf.perf_counter()
+    for _ in range_it:
+        json.loads(data)
+    return pyperf.perf_counter() - t0
+
+
+def get_payload_size(buffers):
+    # Size of the pickle data and of the out-of-band buffers
+    size = 0
+    for buffer in buffers:
+        with memoryview(buffer) as view:
+            size += view.nbytes
+    return size
+
+
+def prepare(workload, size):
+    """Return (bench_func, payload, payload_size)."""
+    if workload == 'pickle_oob':
+        payload = make_blobs(size)
+        buffers = []
+        data = pickle.dumps(payload, protocol=5,
+                            buffer_callback=buffers.append)
+        return bench_pickle_oob, payload, get_payload_size([data, *buffers])
+    if workload == 'pickle_inband':
+        payload = make_blobs(size)
+        return bench_pickle, payload, len(pickle.dumps(payload, protocol=5))
+    if workload == 'pickle_arrays':
+        payload = make_arrays(size)
+        return bench_pickle, payload, len(pickle.dumps(payload, protocol=5))
+    if workload == 'marshal':
+        payload = make_marshal_payload(size)
+        return bench_marshal, payload, len(marshal.dumps(payload))
+    document = make_document(size)
+    data = json.dumps(document)
+    if workload == 'json_dumps':
+        return bench_json_dumps, document, len(data)
+    return bench_json_loads, data, len(data)
+
+
+def add_cmdline_args(cmd, args):
+    cmd.append(args.workload)
+    if args.size is not None:
+        cmd.append("--size=%s" % args.size)
+
+
+if __name__ == "__main__":
+    runner = pyperf.Runner(add_cmdline_args=add_cmdline_args)
+    parser = runner.argparser
+    parser.add_argument('workload', choices=sorted(DEFAULT_SIZES))
+    parser.add_argument('--size', type=int, default=None,
+                        help='Payload size in MiB (default depends on the '
+                             'workload)')
+    args = runner.parse_args()
+    size = args.size
+    if size is None:
+        size = DEFAULT_SIZES[args.workload]
+
+    bench_func, payload, payload_size = prepare(args.workload, size)
+    runner.metadata['description'] = ("Serialization of a %s MiB payload: %s"
+                                      % (size, args.workload))
+    runner.metadata['payload_size'] = payload_size
+    runner.bench_time_func('serialize_large_%s' % args.workload,
+                           bench_func, payload)
@@ -0,0 +1,150 @@
+"""
+Benchmark the latency of an asyncio HTTP server at a fixed offered load.
+
+An in-process client sends small HTTP/1.1 requests over persistent
+connections at a fixed rate, whatever the response time of the server
+(open-loop load), and records the latency of each request from the time
+it was scheduled. The value of the benchmark is the mean latency of a
+request, since the elapsed time is set by the offered load.
+
+The latencies are also read by the "latency" pyperf hook, enabled by
+"pyperformance run --hook latency", which stores their percentiles and the
+throughput in the run metadata.
+"""
+
+import asyncio
+import json
+import math
+
+import pyperf
+
+
+HOST = "127.0.0.1"
+REQUESTS = 500
+CONNECTIONS = 16
+# Offered loads in requests per second
+LOADS = {
+    "normal": 2000,
+    # Close to the capacity of the server, where requests queue up
+    "high_load": 10000,
+}
+
+# Latency of each request in seconds, read by the "latency" pyperf hook
+LATENCIES = []
+
+
+async def handle_client(reader, writer):
+    while True:
+        try:
+            request = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.IncompleteReadError:
+            break
+        path = request.split(b" ", 2)[1].decode()
+        item_id = int(path.rsplit("/", 1)[1])
+        body = json.dumps({
+            "id": item_id,
+            "name": "Sample Item",
+            "price": 9.99,
+            "tags": ["sample", "item", "latency"],
+        }).encode()
+        writer.write(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: application/json\r\n"
+            b"Content-Length: %d\r\n"
+            b"\r\n" % len(body)
+            + body
+        )
+        await writer.drain()
+    writer.close()
+    await writer.wait_closed()
+
+
+async def send_requests(port, queue):
+    reader, writer = await asyncio.open_connection(HOST, port)
+    while True:
+        item = await queue.get()
+        if item is None:
+            break
+        item_id, scheduled = item
+        writer.write(
+            b"GET /items/%d HTTP/1.1\r\nHost: %s\r\n\r\n" % (item_id, HOST.encode())
+        )
+        headers = await reader.readuntil(b"\r\n\r\n")
+        length = None
+        for line in headers.split(b"\r\n"):
+            name, _, value = line.partition(b":")
+            if name.lower() == b"content-length":
+                length = int(value)
+        data = json.loads(await reader.readexactly(length))
+        LATENCIES.append(pyperf.perf_counter() - scheduled)
+        assert data["id"] == item_id
+    writer.close()
+    await writer.wait_closed()
+
+
+async def offer_load(rate):
+    server = await asyncio.start_server(handle_client, HOST, 0)
+    port = server.sockets[0].getsockname()[1]
+    async with server:
+        queue = asyncio.Queue()
+        clients = [
+            asyncio.create_task(send_requests(port, queue))
+            for _ in range(CONNECTIONS)
+        ]
+        # Let the clients connect
+        await asyncio.sleep(0.01)
+
+        t0 = pyperf.perf_counter()
+        interval = 1.0 / rate
+        for item_id in range(REQUESTS):
+            scheduled = t0 + item_id * interval
+            delay = scheduled - pyperf.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            queue.put_nowait((item_id, scheduled))
+        for _ in range(CONNECTIONS):
+            queue.put_nowait(None)
+        await asyncio.gather(*clients)
+
+
+def bench_server_latency(loops, rate):
+    # Only keep the latencies of the current value
+    del LATENCIES[:]
+    for _ in range(loops):
+        asyncio.run(offer_load(rate))
+    if len(LATENCIES) != loops * REQUESTS:
+        raise Exception("%s requests failed" % (loops * REQUESTS - len(LATENCIES)))
+    # The elapsed time only depends on the offered load: the value is the
+    # latency of the requests
+    return math.fsum(LATENCIES)
+
+
+def add_cmdline_args(cmd, args):
+    cmd.append(args.load)
+
+
+if __name__ == "__main__":
+    runner = pyperf.Runner(add_cmdline_args=add_cmdline_args)
+    runner.metadata["description"] = (
+        "Latency of an asyncio HTTP server at a fixed offered load"
+    )
+    runner.argparser.add_argument(
+        "load",
+        nargs="?",
+        choices=sorted(LOADS),
+        default="normal",
+        help="Offered load (default: %(default)s)",
+    )
+    args = runner.parse_args()
+    rate = LOADS[args.load]
+    runner.metadata["offered_load"] = rate
+    name = "server_latency"
+    if args.load != "normal":
+        name += "_" + args.load
+    runner.bench_time_func(
+        name,
+        bench_server_latency,
+        rate,
+        # Mean latency of a request
+        inner_loops=REQUESTS,
+    )
@@ -0,0 +1,297 @@
+"""
+Benchmark sqlite3 workloads on an on-disk database.
+
+Workloads:
+
+* insert: bulk executemany() inserts in transactions of 1,000 rows.
+* range_query: queries on ranges of an indexed column.
+* scan: fetch all rows as tuples.
+* row_factory: fetch all rows as sqlite3.Row objects, accessed by name.
+* wal_readers: 4 threads with their own connection scan the table of a WAL
+  mode database, while another thread updates rows in small transactions.
+* iterdump: dump the database as SQL statements with iterdump().
+* backup: copy the database to another file with Connection.backup().
+
+The database is created in the temporary directory (TMPDIR) and reused by
+the worker processes. The number of processed rows is stored in the
+"payload_rows" metadata to compute the throughput in rows per second.
+"""
+
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+
+import pyperf
+
+
+# Default table size in thousands of rows
+SIZE = 100
+BATCH = 1000
+QUERIES = 100
+# Each range query returns about 1% of the rows
+QUERY_RANGE = 0.01
+READERS = 4
+WORKLOADS = ('backup', 'insert', 'iterdump', 'range_query', 'row_factory',
+             'scan', 'wal_readers')
+
+CREATE_TABLE = ('CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT, '
+                'email TEXT, score REAL, created INTEGER)')
+CREATE_INDEX = 'CREATE INDEX items_created ON items (created)'
+INSERT = 'INSERT INTO items VALUES (?, ?, ?, ?, ?)'
+
+
+def make_rows(count):
+    rand = random.Random(5)
+    return [(index, 'user %s' % rand.randrange(10 ** 6),
+             'user%s@example.com' % rand.randrange(10 ** 6),
+             rand.random() * 100, rand.randrange(count * 10))
+            for index in range(count)]
+
+
+def insert_rows(conn, rows):
+    for start in range(0, len(rows), BATCH):
+        # One transaction per batch
+        with conn:
+            conn.executemany(INSERT, rows[start:start + BATCH])
+
+
+def create_database(size):
+    """Create the database of size thousands of rows in WAL mode, or reuse
+    it. Return its filename."""
+    filename = os.path.join(tempfile.gettempdir(),
+                            'pyperformance_sqlite_%sk.db' % size)
+    if os.path.exists(filename):
+        return filename
+
+    # Rename a complete database to never expose a partial database to
+    # other worker processes
+    tmp = filename + '.%s.tmp' % os.getpid()
+    conn = sqlite3.connect(tmp)
+    try:
+        conn.execute(CREATE_TABLE)
+        insert_rows(conn, make_rows(size * 1000))
+        conn.execute(CREATE_INDEX)
+        conn.commit()
+        conn.execute('PRAGMA journal_mode=WAL')
+    finally:
+        # The last connection checkpoints and removes the WAL file
+        conn.close()
+    os.replace(tmp, filename)
+    return filename
+
+
+def bench_insert(loops, filename, nrow):
+    rows = make_rows(nrow)
+    dirname, basename = os.path.split(filename)
+    filename = os.path.join(dirname, 'insert_%s_%s' % (os.getpid(), basename))
+    conn = sqlite3.connect(filename)
+    try:
+        dt = 0
+        for _ in range(loops):
+            conn.execute('DROP TABLE IF EXISTS items')
+            conn.execute(CREATE_TABLE)
+            conn.commit()
+
+            t0 = pyperf.perf_counter()
+            insert_rows(conn, rows)
+            dt += pyperf.perf_counter() - t0
+        count = conn.execute('SELECT COUNT(*) FROM items').fetchone()[0]
+    finally:
+        conn.close()
+        os.unlink(filename)
+    return dt, count
+
+
+def get_ranges(nrow):
+    rand = random.Random(7)
+    width = int(nrow * 10 * QUERY_RANGE)
+    ranges = []
+    for _ in range(QUERIES):
+        start = rand.randrange(nrow * 10 - width)
+        ranges.append((start, start + width))
+    return ranges
+
+
+def bench_range_query(loops, filename, nrow):
+    ranges = get_ranges(nrow)
+    conn = sqlite3.connect(filename)
+    try:
+        range_it = range(loops)
+        t0 = pyperf.perf_counter()
+        for _ in range_it:
+            count = 0
+            for start, end in ranges:
+                cursor = conn.execute('SELECT id, name, score FROM items '
+                                      'WHERE created BETWEEN ? AND ?',
+                                      (start, end))
+                count += len(cursor.fetchall())
+        dt = pyperf.perf_counter() - t0
+    finally:
+        conn.close()
+    return dt, count
+
+
+def bench_scan(loops, filename, nrow):
+    conn = sqlite3.connect(filename)
+    try:
+        range_it = range(loops)
+        t0 = pyperf.perf_counter()
+        for _ in range_it:
+            count = 0
+            for row in conn.execute('SELECT * FROM items'):
+                row[1]
+                count += 1
+        dt = pyperf.perf_counter() - t0
+    finally:
+        conn.close()
+    return dt, count
+
+
+def bench_row_factory(loops, filename, nrow):
+    conn = sqlite3.connect(filename)
+    conn.row_factory = sqlite3.Row
+    try:
+        range_it = range(loops)
+        t0 = pyperf.perf_counter()
+        for _ in range_it:
+            count = 0
+            for row in conn.execute('SELECT * FROM items'):
+                row['name']
+                count += 1
+        dt = pyperf.perf_counter() - t0
+    finally:
+        conn.close()
+    return dt, count
+
+
+def bench_wal_readers(loops, filename, nrow):
+    # Readers, writer and main thread
+    barrier = threading.Barrier(READERS + 2)
+    done = threading.Event()
+    counts = []
+
+    def reader():
+        conn = sqlite3.connect(filename)
+        try:
+            barrier.wait()
+            count = 0
+            for _ in range(loops):
+                for row in conn.execute('SELECT * FROM items'):
+                    count += 1
+            counts.append(count)
+        finally:
+            conn.close()
+
+    def writer():
+        rand = random.Random(9)
+        conn = sqlite3.connect(filename)
+        try:
+            barrier.wait()
+            while not done.is_set():
+                with conn:
+                    conn.execute('UPDATE items SET score = ? WHERE id = ?',
+                                 (rand.random() * 100, rand.randrange(nrow)))
+        finally:
+            conn.close()
+
+    readers = [threading.Thread(target=reader) for _ in range(READERS)]
+    writer_thread = threading.Thread(target=writer)
+    for thread in (*readers, writer_thread):
+        thread.start()
+    barrier.wait()
+    t0 = pyperf.perf_counter()
+    for thread in readers:
+        thread.join()
+    dt = pyperf.perf_counter() - t0
+    done.set()
+    writer_thread.join()
+    # Rows per loop
+    return dt, sum(counts) // loops
+
+
+def bench_iterdump(loops, filename, nrow):
+    conn = sqlite3.connect(filename)
+    try:
+        range_it = range(loops)
+        t0 = pyperf.perf_counter()
+        for _ in range_it:
+            count = 0
+            for line in conn.iterdump():
+                if line.startswith('INSERT'):
+                    count += 1
+        dt = pyperf.perf_counter() - t0
+    finally:
+        conn.close()
+    return dt, count
+
+
+def bench_backup(loops, filename, nrow):
+    dst_filename = filename + '.%s.backup' % os.getpid()
+    conn = sqlite3.connect(filename)
+    try:
+        dt = 0
+        for _ in range(loops):
+            dst = sqlite3.connect(dst_filename)
+            try:
+                t0 = pyperf.perf_counter()
+                conn.backup(dst)
+                dt += pyperf.perf_counter() - t0
+                count = dst.execute('SELECT COUNT(*) FROM items').fetchone()[0]
+            finally:
+                dst.close()
+                os.unlink(dst_filename)
+    finally:
+        conn.close()
+    return dt, count
+
+
+def bench_sqlite(loops, bench_func, filename, nrow, expected):
+    dt, count = bench_func(loops, filename, nrow)
+    if count != expected:
+        raise Exception("unexpected number of rows: %s, expected %s"
+                        % (count, expected))
+    return dt
+
+
+def get_expected_rows(workload, filename, nrow):
+    if workload == 'range_query':
+        conn = sqlite3.connect(filename)
+        try:
+            return sum(conn.execute('SELECT COUNT(*) FROM items '
+                                    'WHERE created BETWEEN ? AND ?',
+                                    item).fetchone()[0]
+                       for item in get_ranges(nrow))
+        finally:
+            conn.close()
+    if workload == 'wal_readers':
+        return READERS * nrow
+    return nrow
+
+
+def add_cmdline_args(cmd, args):
+    cmd.append(args.workload)
+    cmd.append("--size=%s" % args.size)
+
+
+if __name__ == "__main__":
+    runner = pyperf.Runner(add_cmdline_args=add_cmdline_args)
+    parser = runner.argparser
+    parser.add_argument('workload', choices=WORKLOADS)
+    parser.add_argument('--size', type=int, default=SIZE,
+                        help='Table size in thousands of rows '
+                             '(default: %s)' % SIZE)
+    args = runner.parse_args()
+
+    filename = create_database(args.size)
+    nrow = args.size * 1000
+    expected = get_expected_rows(args.workload, filename, nrow)
+    bench_func = globals()['bench_' + args.workload]
+    runner.metadata['description'] = ("sqlite3 %s on a table of %s rows"
+                                      % (args.workload, nrow))
+    runner.metadata['payload_rows'] = expected
+    if args.workload == 'backup':
+        runner.metadata['payload_size'] = os.path.getsize(filename)
+    runner.bench_time_func('sqlite_%s' % args.workload,
+                           bench_sqlite, bench_func, filename, nrow, expected)
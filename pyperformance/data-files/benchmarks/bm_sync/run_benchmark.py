@@ -0,0 +1,235 @@
+"""
+Benchmark the synchronization primitives of threading, queue and
+concurrent.futures.
+
+Workloads:
+
+* uncontended: acquire and release a Lock, an RLock or a Condition in a
+  single thread.
+* contended_lock, contended_rlock, contended_condition: threads increment
+  a counter protected by the primitive, in a single thread ("single") and
+  in one thread per available CPU, at least 4 to have contention on small
+  machines ("scaled"). Benchmark names don't depend on the number of
+  CPUs, stored in the "threads" metadata.
+* queue, simple_queue, event, futures: hand-off latency from a thread to
+  another through a queue.Queue, a queue.SimpleQueue, a pair of Events or
+  a ThreadPoolExecutor. The sender waits for the acknowledgment of each
+  item before sending the next one.
+
+The contended workloads store the "threads" and "scaling_group" metadata
+used by "pyperformance show" and "pyperformance compare --scaling" to
+compute the scaling efficiency. The hand-off workloads append the latency
+of each item to LATENCIES, read by the "latency" pyperf hook enabled by
+"pyperformance run --hook latency".
+"""
+
+import concurrent.futures
+import os
+import queue
+import threading
+
+import pyperf
+
+
+# Operations per thread and per loop
+OPERATIONS = 2000
+# Hand-offs per loop
+HANDOFFS = 2000
+MIN_CONTENDED_THREADS = 4
+PRIMITIVES = {
+    "lock": threading.Lock,
+    "rlock": threading.RLock,
+    "condition": threading.Condition,
+}
+HANDOFF_WORKLOADS = ("event", "futures", "queue", "simple_queue")
+WORKLOADS = (
+    "uncontended",
+    *("contended_%s" % name for name in PRIMITIVES),
+    *HANDOFF_WORKLOADS,
+)
+
+# Latency of each hand-off in seconds, read by the "latency" pyperf hook
+LATENCIES = []
+
+
+def acquire_release(primitive, name, operations):
+    if name == "condition":
+        for _ in range(operations):
+            with primitive:
+                primitive.notify()
+    else:
+        for _ in range(operations):
+            primitive.acquire()
+            primitive.release()
+
+
+def bench_uncontended(loops, name):
+    primitive = PRIMITIVES[name]()
+    t0 = pyperf.perf_counter()
+    for _ in range(loops):
+        acquire_release(primitive, name, OPERATIONS)
+    return pyperf.perf_counter() - t0
+
+
+def bench_contended(loops, name, nthread):
+    primitive = PRIMITIVES[name]()
+    counter = [0]
+    barrier = threading.Barrier(nthread + 1)
+
+    def increment():
+        for _ in range(OPERATIONS):
+            with primitive:
+                counter[0] += 1
+
+    def notify_increment():
+        for _ in range(OPERATIONS):
+            with primitive:
+                counter[0] += 1
+                primitive.notify()
+
+    func = notify_increment if name == "condition" else increment
+
+    def worker():
+        barrier.wait()
+        for _ in range(loops):
+            func()
+
+    threads = [threading.Thread(target=worker) for _ in range(nthread)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    t0 = pyperf.perf_counter()
+    for thread in threads:
+        thread.join()
+    dt = pyperf.perf_counter() - t0
+    if counter[0] != loops * nthread * OPERATIONS:
+        raise Exception("lost updates: %s" % counter[0])
+    return dt
+
+
+def handoff_queue(queue_class, count):
+    requests = queue_class()
+    responses = queue_class()
+
+    def consumer():
+        while True:
+            sent = requests.get()
+            if sent is None:
+                break
+            LATENCIES.append(pyperf.perf_counter() - sent)
+            responses.put(None)
+
+    thread = threading.Thread(target=consumer)
+    thread.start()
+    for _ in range(count):
+        requests.put(pyperf.perf_counter())
+        responses.get()
+    requests.put(None)
+    thread.join()
+
+
+def handoff_event(count):
+    request = threading.Event()
+    response = threading.Event()
+    sent = [None]
+
+    def consumer():
+        while True:
+            request.wait()
+            request.clear()
+            if sent[0] is None:
+                break
+            LATENCIES.append(pyperf.perf_counter() - sent[0])
+            response.set()
+
+    thread = threading.Thread(target=consumer)
+    thread.start()
+    for _ in range(count):
+        sent[0] = pyperf.perf_counter()
+        request.set()
+        response.wait()
+        response.clear()
+    sent[0] = None
+    request.set()
+    thread.join()
+
+
+def record_latency(sent):
+    LATENCIES.append(pyperf.perf_counter() - sent)
+
+
+def handoff_futures(count):
+    with concurrent.futures.ThreadPoolExecutor(1) as executor:
+        for _ in range(count):
+            executor.submit(record_latency, pyperf.perf_counter()).result()
+
+
+HANDOFF_FUNCS = {
+    "event": handoff_event,
+    "futures": handoff_futures,
+    "queue": lambda count: handoff_queue(queue.Queue, count),
+    "simple_queue": lambda count: handoff_queue(queue.SimpleQueue, count),
+}
+
+
+def bench_handoff(loops, workload):
+    func = HANDOFF_FUNCS[workload]
+    # Only keep the latencies of the current value
+    del LATENCIES[:]
+    t0 = pyperf.perf_counter()
+    for _ in range(loops):
+        func(HANDOFFS)
+    return pyperf.perf_counter() - t0
+
+
+def get_cpu_count():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def add_cmdline_args(cmd, args):
+    cmd.append(args.workload)
+
+
+if __name__ == "__main__":
+    runner = pyperf.Runner(add_cmdline_args=add_cmdline_args)
+    runner.argparser.add_argument("workload", choices=WORKLOADS)
+    args = runner.parse_args()
+    workload = args.workload
+
+    if workload == "uncontended":
+        runner.metadata["description"] = "Uncontended acquire and release"
+        for name in PRIMITIVES:
+            runner.bench_time_func(
+                "sync_uncontended_%s" % name,
+                bench_uncontended,
+                name,
+                inner_loops=OPERATIONS,
+            )
+    elif workload in HANDOFF_WORKLOADS:
+        runner.metadata["description"] = "Hand-off latency: %s" % workload
+        runner.bench_time_func(
+            "sync_%s" % workload,
+            bench_handoff,
+            workload,
+            inner_loops=HANDOFFS,
+        )
+    else:
+        runner.metadata["description"] = "Contended %s" % workload
+        name = workload.partition("_")[2]
+        variants = (
+            ("single", 1),
+            ("scaled", max(get_cpu_count(), MIN_CONTENDED_THREADS)),
+        )
+        for variant, nthread in variants:
+            runner.bench_time_func(
+                "sync_%s_%s" % (workload, variant),
+                bench_contended,
+                name,
+                nthread,
+                # Time per operation
+                inner_loops=nthread * OPERATIONS,
+                metadata={"threads": nthread, "scaling_group": "sync_%s" % workload},
+            )
@@ -0,0 +1,141 @@
+"""
+Measure how CPU-bound pure-Python code scales with the number of threads.
+
+Each thread runs the same kernel on the same amount of work, so the time
+per operation decreases with the number of threads if they run in parallel
+(free-threaded build), and does not with the GIL. Each kernel is run in a
+single thread ("single"), and in one thread per available CPU on per-thread
+data ("scaled") and, for kernels mutating data, on data shared by all
+threads ("shared").
+
+Benchmark names don't depend on the number of CPUs, so that results of
+different machines can be compared. The "threads" and "scaling_group"
+metadata are used by "pyperformance show" and "pyperformance compare
+--scaling" to compute the scaling efficiency.
+"""
+
+import os
+import threading
+
+import pyperf
+
+
+# Operations per thread and per loop
+OPERATIONS = 2000
+
+
+class Point:
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+
+def kernel_dict(data, thread_id):
+    for index in range(OPERATIONS):
+        key = (thread_id, index & 63)
+        data[key] = data.get(key, 0) + index
+        if index & 7 == 0:
+            data.pop(key, None)
+
+
+def kernel_list(data, thread_id):
+    for index in range(OPERATIONS):
+        data.append(index)
+        if len(data) > 64:
+            data[index & 31] = thread_id
+            data.pop()
+            data.pop(0)
+
+
+def kernel_attributes(data, thread_id):
+    points = data
+    for index in range(OPERATIONS):
+        point = points[index & 15]
+        point.x = point.x + point.y
+        point.y = index - thread_id
+
+
+def kernel_generators(data, thread_id):
+    numbers = (index * thread_id for index in range(OPERATIONS))
+    squares = (number * number for number in numbers)
+    evens = (square for square in squares if not square & 1)
+    total = 0
+    for value in evens:
+        total += value
+    return total
+
+
+KERNELS = {
+    "dict": (kernel_dict, dict),
+    "list": (kernel_list, list),
+    "attributes": (kernel_attributes, lambda: [Point(i, i) for i in range(16)]),
+    "generators": (kernel_generators, None),
+}
+
+
+def run_threads(loops, kernel, nthread, create_data, shared):
+    if create_data is None:
+        data = [None] * nthread
+    elif shared:
+        data = [create_data()] * nthread
+    else:
+        data = [create_data() for _ in range(nthread)]
+    barrier = threading.Barrier(nthread + 1)
+
+    def worker(thread_id):
+        thread_data = data[thread_id]
+        barrier.wait()
+        for _ in range(loops):
+            kernel(thread_data, thread_id)
+
+    threads = [
+        threading.Thread(target=worker, args=(thread_id,))
+        for thread_id in range(nthread)
+    ]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    t0 = pyperf.perf_counter()
+    for thread in threads:
+        thread.join()
+    return pyperf.perf_counter() - t0
+
+
+def get_cpu_count():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def add_cmdline_args(cmd, args):
+    cmd.append(args.kernel)
+
+
+if __name__ == "__main__":
+    runner = pyperf.Runner(add_cmdline_args=add_cmdline_args)
+    runner.metadata["description"] = (
+        "Thread scaling of CPU-bound pure-Python kernels"
+    )
+    runner.argparser.add_argument("kernel", choices=sorted(KERNELS))
+    args = runner.parse_args()
+
+    kernel, create_data = KERNELS[args.kernel]
+    ncpu = get_cpu_count()
+    # (variant, number of threads, shared data)
+    variants = [("single", 1, False), ("scaled", ncpu, False)]
+    if create_data is not None:
+        variants.append(("shared", ncpu, True))
+    group = "threading_%s" % args.kernel
+    for variant, nthread, shared in variants:
+        runner.bench_time_func(
+            "%s_%s" % (group, variant),
+            run_threads,
+            kernel,
+            nthread,
+            create_data,
+            shared,
+            # Time per operation
+            inner_loops=nthread * OPERATIONS,
+            metadata={"threads": nthread, "scaling_group": group},
+        )
@@ -20,6 +20,8 @@ import pyperf
 __author__ = "stefan_ml@behnel.de (Stefan Behnel)"
 
 FALLBACK_ETMODULE = 'xml.etree.ElementTree'
+# Number of broad subtrees of the XML tree, at least 6
+TREE_SIZE = 50
 
 
 def build_xml_tree(etree):
@@ -27,7 +29,7 @@ def build_xml_tree(etree):
     root = etree.Element('root')
 
     # create a couple of repetitive broad subtrees
-    for c in range(50):
+    for c in range(TREE_SIZE):
         child = SubElement(root, 'child-%d' % c,
                                  tag_type="child")
         for i in range(100):
@@ -210,6 +212,8 @@ def add_cmdline_args(cmd, args):
     cmd.extend(("--etree-module", args.etree_module))
     if args.no_accelerator:
         cmd.append("--no-accelerator")
+    if args.size is not None:
+        cmd.append("--size=%s" % args.size)
     if args.benchmark:
         cmd.append(args.benchmark)
 
@@ -231,9 +235,16 @@ if __name__ == "__main__":
     parser.add_argument("--no-accelerator", action="store_true", default=False,
                         help="Disable the '_elementree' accelerator module "
                              "for ElementTree.")
+    parser.add_argument("--size", type=int, default=None,
+                        help="Number of broad subtrees of the XML tree "
+                             "(default: %s)" % TREE_SIZE)
     parser.add_argument("benchmark", nargs='?', choices=BENCHMARKS)
 
     options = runner.parse_args()
+    if options.size is not None:
+        if options.size < 6:
+            parser.error("--size must be at least 6")
+        TREE_SIZE = options.size
 
     if not options.etree_module:
         if options.no_accelerator:
@@ -0,0 +1,257 @@
+"""Collect and compare the import time of modules with -X importtime.
+
+Python started with "-X importtime" writes a line per imported module into
+stderr:
+
+    import time: self [us] | cumulative | imported package
+    import time:       373 |        938 |   json.decoder
+    import time:       211 |       1545 | json
+
+The import phase of each benchmark is launched several times, and the
+median self and cumulative times of each module are compared between
+interpreters.
+"""
+
+import json
+import re
+import statistics
+import subprocess
+import sys
+
+from . import _pythoninfo
+from .compare import format_delta, render_table
+
+IMPORTTIME_REGEX = re.compile(r"^import time:\s*(\d+)\s*\|\s*(\d+)\s*\|\s(.+)$")
+# Launches ignored to fill the filesystem cache and write .pyc files
+WARMUP_LAUNCHES = 1
+DEFAULT_LAUNCHES = 20
+DEFAULT_TOP = 20
+
+
+def parse_importtime(output):
+    """Parse the -X importtime output of a process.
+
+    Return a dict mapping module names to (self, cumulative) times in
+    microseconds.
+    """
+    modules = {}
+    for line in output.splitlines():
+        match = IMPORTTIME_REGEX.match(line)
+        if match is None:
+            continue
+        name = match.group(3).strip()
+        self_time, cumulative = modules.get(name, (0, 0))
+        modules[name] = (
+            self_time + int(match.group(1)),
+            cumulative + int(match.group(2)),
+        )
+    return modules
+
+
+def get_import_command(bench, python):
+    """Get the command importing the modules of a benchmark.
+
+    Startup benchmarks define the Python arguments of the command they
+    measure in tool.importtime_args. For other benchmarks, the benchmark
+    script is only asked for its help, after it imported its modules.
+    """
+    args = bench.importtime_args
+    if not args:
+        args = (bench.runscript, "--help")
+    return [python, "-X", "importtime", *args]
+
+
+def collect_importtime(cmd, launches):
+    """Launch cmd and return the list of times per module of each launch."""
+    samples = []
+    for index in range(WARMUP_LAUNCHES + launches):
+        proc = subprocess.run(
+            cmd,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True,
+            errors="replace",
+        )
+        if proc.returncode:
+            stderr = proc.stderr.strip().splitlines()
+            raise RuntimeError(
+                "command failed with exit code %s: %s"
+                % (proc.returncode, stderr[-1] if stderr else "")
+            )
+        if index >= WARMUP_LAUNCHES:
+            samples.append(parse_importtime(proc.stderr))
+    return samples
+
+
+def aggregate_importtime(samples):
+    """Aggregate the times of several launches.
+
+    Return a dict mapping module names to their median (self, cumulative)
+    times in microseconds, and the median total import time.
+    """
+    values = {}
+    for modules in samples:
+        for name, times in modules.items():
+            values.setdefault(name, []).append(times)
+    medians = {
+        name: (
+            statistics.median(self_time for self_time, _ in times),
+            statistics.median(cumulative for _, cumulative in times),
+        )
+        for name, times in values.items()
+    }
+    total = statistics.median(
+        sum(self_time for self_time, _ in modules.values()) for modules in samples
+    )
+    return medians, total
+
+
+def format_time(us):
+    return "%.2f ms" % (us / 1000.0)
+
+
+def format_importtime_table(medians, total, top):
+    modules = sorted(medians.items(), key=lambda item: item[1][1], reverse=True)
+    table = [("Module", "Self", "Cumulative")]
+    for name, (self_time, cumulative) in modules[:top]:
+        table.append((name, format_time(self_time), format_time(cumulative)))
+    table.append(("Total", format_time(total), ""))
+    return render_table(table)
+
+
+def compare_importtime_table(base, changed, top):
+    base_medians, base_total = base
+    changed_medians, changed_total = changed
+
+    changes = []
+    for name in base_medians.keys() | changed_medians.keys():
+        base_self, base_cumulative = base_medians.get(name, (0, 0))
+        changed_self, changed_cumulative = changed_medians.get(name, (0, 0))
+        changes.append(
+            (
+                abs(changed_self - base_self),
+                name,
+                (base_self, changed_self),
+                (base_cumulative, changed_cumulative),
+            )
+        )
+    # The modules whose self time changed the most explain the change of
+    # the cumulative times of their parents
+    changes.sort(key=lambda change: (-change[0], change[1]))
+
+    def format_change(old, new):
+        if not old:
+            return "new module"
+        if not new:
+            return "not imported"
+        return format_delta(old, new)
+
+    table = [
+        (
+            "Module",
+            "Self base",
+            "Self changed",
+            "Change",
+            "Cumulative base",
+            "Cumulative changed",
+        )
+    ]
+    for _, name, (old_self, new_self), (old_cumulative, new_cumulative) in changes[
+        :top
+    ]:
+        table.append(
+            (
+                name,
+                format_time(old_self),
+                format_time(new_self),
+                format_change(old_self, new_self),
+                format_time(old_cumulative),
+                format_time(new_cumulative),
+            )
+        )
+    table.append(
+        (
+            "Total",
+            format_time(base_total),
+            format_time(changed_total),
+            format_delta(base_total, changed_total),
+            "",
+            "",
+        )
+    )
+    return render_table(table)
+
+
+def collect_python(to_run, python, options):
+    """Collect the import times of benchmarks for a Python executable.
+
+    Return a dict mapping benchmark names to the times of each launch,
+    and the list of errors.
+    """
+    from .run import prepare_venvs
+
+    info = _pythoninfo.get_info(python)
+    benchmarks = prepare_venvs(to_run, info, options)
+
+    results = {}
+    errors = []
+    for bench in to_run:
+        name = bench.name
+        venv, _ = benchmarks[bench]
+        if venv is None:
+            print("ERROR: Benchmark %s failed: could not install requirements" % name)
+            errors.append((name, "Install requirements error"))
+            continue
+
+        cmd = get_import_command(bench, venv.python)
+        print("Import time of %s (%s launches)..." % (name, options.launches))
+        if options.verbose:
+            print("+ %s" % " ".join(cmd))
+        sys.stdout.flush()
+        try:
+            results[name] = collect_importtime(cmd, options.launches)
+        except (OSError, RuntimeError) as exc:
+            print("ERROR: Benchmark %s failed: %s" % (name, exc))
+            errors.append((name, exc))
+    return results, errors
+
+
+def display_importtime(options, results, changed_results=None):
+    for name, samples in sorted(results.items()):
+        if changed_results is not None and name not in changed_results:
+            continue
+        print()
+        print("### %s ###" % name)
+        base = aggregate_importtime(samples)
+        if changed_results is None:
+            print(format_importtime_table(*base, options.top))
+        else:
+            changed = aggregate_importtime(changed_results[name])
+            print(compare_importtime_table(base, changed, options.top))
+
+
+def importtime_benchmarks(benchmarks, options):
+    to_run = sorted(benchmarks)
+
+    results, errors = collect_python(to_run, options.python, options)
+    data = {
+        "launches": options.launches,
+        "python": options.python,
+        "benchmarks": results,
+    }
+    changed_results = None
+    if options.compare_to:
+        changed_results, changed_errors = collect_python(
+            to_run, options.compare_to, options
+        )
+        errors += changed_errors
+        data["changed_python"] = options.compare_to
+        data["changed_benchmarks"] = changed_results
+
+    display_importtime(options, results, changed_results)
+
+    if options.output:
+        with open(options.output, "w", encoding="utf-8") as fp:
+            json.dump(data, fp, indent=2, sort_keys=True)
+            fp.write("\n")
+    return errors
@@ -0,0 +1,344 @@
+"""Profile benchmarks and render flamegraphs.
+
+Stacks are stored in the "collapsed" format used by the FlameGraph tools:
+one line per unique stack, frames separated by ";" from the root to the
+leaf, followed by the number of samples.
+"""
+
+import collections
+import glob
+import hashlib
+import html
+import os
+import os.path
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from . import _pythoninfo
+from ._hooks import PROFILE_DIR_ENV
+
+FLAMEGRAPH_WIDTH = 1200
+FRAME_HEIGHT = 16
+FONT_SIZE = 12
+# Average width of a character in pixels, used to truncate labels
+CHAR_WIDTH = 7
+# Frames narrower than this number of pixels are not drawn
+MIN_FRAME_WIDTH = 0.5
+PERF_RECORD_OPTS = "-g -F 999"
+# "7f2e3c1d4a20 PyObject_Call+0x42 (/usr/bin/python3.12)"
+PERF_FRAME_REGEX = re.compile(r"^\s*[0-9a-f]+\s+(.+?)(?:\+0x[0-9a-f]+)?\s+\(.*\)$")
+
+
+# Collapsed stacks
+
+
+def parse_collapsed(lines):
+    stacks = collections.Counter()
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        stack, _, count = line.rpartition(" ")
+        try:
+            stacks[stack] += int(count)
+        except ValueError:
+            continue
+    return stacks
+
+
+def read_collapsed(filename):
+    with open(filename, encoding="utf-8") as fp:
+        return parse_collapsed(fp)
+
+
+def write_collapsed(filename, stacks):
+    with open(filename, "w", encoding="utf-8") as fp:
+        for stack, count in sorted(stacks.items()):
+            print(stack, count, file=fp)
+
+
+def collapse_perf_script(output):
+    """Collapse the output of "perf script" of a "perf record -g" file.
+
+    Samples are separated by empty lines: a header line followed by the
+    frames, from the leaf to the root.
+    """
+    stacks = collections.Counter()
+    frames = None
+    for line in output.splitlines() + [""]:
+        if not line.strip():
+            if frames:
+                stacks[";".join(reversed(frames))] += 1
+            frames = None
+        elif frames is None:
+            # header line: "python 1234 12.345: 1001001 cycles:"
+            frames = []
+        else:
+            match = PERF_FRAME_REGEX.match(line)
+            frames.append(match.group(1) if match else "[unknown]")
+    return stacks
+
+
+# Flamegraphs
+
+
+class FrameNode:
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.children = {}
+
+    def add(self, frames, count):
+        self.count += count
+        node = self
+        for name in frames:
+            child = node.children.get(name)
+            if child is None:
+                child = node.children[name] = FrameNode(name)
+            child.count += count
+            node = child
+
+    def get_depth(self):
+        if not self.children:
+            return 0
+        return 1 + max(child.get_depth() for child in self.children.values())
+
+
+def build_tree(stacks):
+    root = FrameNode("all")
+    for stack, count in stacks.items():
+        root.add(stack.split(";"), count)
+    return root
+
+
+def get_fractions(root):
+    # Map each stack prefix to its fraction of the total samples
+    fractions = {}
+
+    def visit(node, path):
+        fractions[path] = node.count / root.count
+        for child in node.children.values():
+            visit(child, path + (child.name,))
+
+    if root.count:
+        visit(root, ())
+    return fractions
+
+
+def warm_color(name):
+    # Stable color per function name
+    value = int(hashlib.md5(name.encode("utf-8")).hexdigest()[:6], 16)
+    red = 205 + value % 50
+    green = (value >> 8) % 200
+    blue = (value >> 16) % 55
+    return f"rgb({red},{green},{blue})"
+
+
+def diff_color(delta, max_delta):
+    if not max_delta or not delta:
+        return "rgb(220,220,220)"
+    intensity = int(200 * min(abs(delta) / max_delta, 1.0))
+    if delta > 0:
+        # more samples in the changed profile: slower
+        return f"rgb(255,{220 - intensity},{220 - intensity})"
+    return f"rgb({220 - intensity},{220 - intensity},255)"
+
+
+def format_flamegraph(stacks, title, base_stacks=None):
+    """Render collapsed stacks as a SVG flamegraph.
+
+    If base_stacks is set, render a differential flamegraph: the layout
+    is the one of stacks and frames are colored in red if their fraction
+    of samples increased compared to base_stacks, or in blue if it
+    decreased.
+    """
+    root = build_tree(stacks)
+    depth = root.get_depth() + 1
+    width = FLAMEGRAPH_WIDTH
+    height = (depth + 2) * FRAME_HEIGHT
+
+    deltas = None
+    max_delta = 0.0
+    if base_stacks is not None:
+        base_fractions = get_fractions(build_tree(base_stacks))
+        deltas = {
+            path: fraction - base_fractions.get(path, 0.0)
+            for path, fraction in get_fractions(root).items()
+        }
+        max_delta = max((abs(delta) for delta in deltas.values()), default=0.0)
+
+    lines = [
+        (
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}"'
+            f' height="{height}" font-family="monospace" font-size="{FONT_SIZE}">'
+        ),
+        (
+            f'<text x="{width / 2:.1f}" y="{FRAME_HEIGHT}" text-anchor="middle">'
+            f"{html.escape(title)}</text>"
+        ),
+    ]
+    if not root.count:
+        lines.append(f'<text x="0" y="{FRAME_HEIGHT * 2}">(no samples)</text>')
+        lines.append("</svg>")
+        return "\n".join(lines)
+
+    scale = width / root.count
+
+    def draw(node, path, x, level):
+        node_width = node.count * scale
+        if node_width < MIN_FRAME_WIDTH:
+            return
+        # The root is drawn at the bottom
+        y = height - (level + 1) * FRAME_HEIGHT
+        percent = node.count * 100.0 / root.count
+        tooltip = "%s (%s samples, %.2f%%)" % (node.name, node.count, percent)
+        if deltas is not None:
+            delta = deltas.get(path, 0.0)
+            tooltip += ", %+.2f%%" % (delta * 100.0)
+            color = diff_color(delta, max_delta)
+        else:
+            color = warm_color(node.name)
+        label = node.name
+        max_chars = int((node_width - 4) // CHAR_WIDTH)
+        if len(label) > max_chars:
+            label = label[: max_chars - 2] + ".." if max_chars > 2 else ""
+        lines.append(
+            f"<g><title>{html.escape(tooltip)}</title>"
+            f'<rect x="{x:.1f}" y="{y}" width="{node_width:.1f}"'
+            f' height="{FRAME_HEIGHT - 1}" fill="{color}"/>'
+        )
+        if label:
+            lines.append(
+                f'<text x="{x + 2:.1f}" y="{y + FRAME_HEIGHT - 4}">'
+                f"{html.escape(label)}</text>"
+            )
+        lines.append("</g>")
+
+        child_x = x
+        for child in sorted(node.children.values(), key=lambda child: child.name):
+            draw(child, path + (child.name,), child_x, level + 1)
+            child_x += child.count * scale
+
+    draw(root, (), 0.0, 0)
+    lines.append("</svg>")
+    return "\n".join(lines)
+
+
+def write_flamegraph(filename, stacks, title, base_stacks=None):
+    with open(filename, "w", encoding="utf-8") as fp:
+        fp.write(format_flamegraph(stacks, title, base_stacks))
+        fp.write("\n")
+
+
+# Profiling
+
+
+def choose_sampler(sampler, info):
+    if sampler != "auto":
+        return sampler
+    if (
+        sys.platform.startswith("linux")
+        and shutil.which("perf")
+        and info.sys.version_info >= (3, 12)
+    ):
+        # perf can see Python functions using the perf trampoline
+        return "perf"
+    return "python"
+
+
+def profile_benchmark(bench, venv, runid, sampler, tmpdir, verbose=False):
+    pyperf_opts = ["--fast"]
+    if sampler == "perf":
+        pyperf_opts.append("--hook=perf_record")
+        env_vars = {
+            "PYPERF_PERF_RECORD_DATA_DIR": tmpdir,
+            "PYPERF_PERF_RECORD_EXTRA_OPTS": PERF_RECORD_OPTS,
+            "PYTHONPERFSUPPORT": "1",
+        }
+    else:
+        pyperf_opts.append("--hook=sampler")
+        env_vars = {PROFILE_DIR_ENV: tmpdir}
+
+    bench.run(
+        venv.python, runid, pyperf_opts, venv=venv, verbose=verbose, env_vars=env_vars
+    )
+
+    stacks = collections.Counter()
+    if sampler == "perf":
+        for filename in glob.glob(os.path.join(tmpdir, "perf.data.*")):
+            proc = subprocess.run(
+                ["perf", "script", "-i", filename],
+                capture_output=True,
+                text=True,
+                errors="replace",
+            )
+            stacks.update(collapse_perf_script(proc.stdout))
+    else:
+        for filename in glob.glob(os.path.join(tmpdir, "stacks.*.txt")):
+            stacks.update(read_collapsed(filename))
+    return stacks
+
+
+def profile_python(to_run, python, label, options):
+    from .run import prepare_venvs
+
+    info = _pythoninfo.get_info(python)
+    sampler = choose_sampler(options.sampler, info)
+    print("Profile %s with the %s sampler" % (python, sampler))
+    hook = "perf_record" if sampler == "perf" else "sampler"
+    benchmarks = prepare_venvs(to_run, info, options, [hook])
+
+    errors = []
+    for bench in to_run:
+        name = bench.name
+        venv, runid = benchmarks[bench]
+        if venv is None:
+            print("ERROR: Benchmark %s failed: could not install requirements" % name)
+            errors.append((name, "Install requirements error"))
+            continue
+
+        print("Profile %s (%s)..." % (name, label))
+        sys.stdout.flush()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            try:
+                stacks = profile_benchmark(
+                    bench, venv, runid, sampler, tmpdir, verbose=options.verbose
+                )
+            except Exception as exc:
+                print("ERROR: Benchmark %s failed: %s" % (name, exc))
+                errors.append((name, exc))
+                continue
+        if not stacks:
+            print("WARNING: no sample collected for %s" % name)
+
+        prefix = os.path.join(options.output, "%s-%s" % (name, label))
+        write_collapsed(prefix + ".collapsed", stacks)
+        write_flamegraph(prefix + ".svg", stacks, "%s (%s)" % (name, python))
+        print("Flamegraph written into %s.svg" % prefix)
+    return errors
+
+
+def profile_benchmarks(benchmarks, options):
+    to_run = sorted(benchmarks)
+    os.makedirs(options.output, exist_ok=True)
+
+    errors = profile_python(to_run, options.python, "base", options)
+    if not options.compare_to:
+        return errors
+
+    errors += profile_python(to_run, options.compare_to, "changed", options)
+    failed = {name for name, _ in errors}
+    for bench in to_run:
+        name = bench.name
+        if name in failed:
+            continue
+        prefix = os.path.join(options.output, name)
+        base_stacks = read_collapsed(prefix + "-base.collapsed")
+        changed_stacks = read_collapsed(prefix + "-changed.collapsed")
+        title = "%s: %s vs %s" % (name, options.compare_to, options.python)
+        write_flamegraph(prefix + "-diff.svg", changed_stacks, title, base_stacks)
+        print("Differential flamegraph written into %s-diff.svg" % prefix)
+    return errors
@@ -0,0 +1,393 @@
+import html
+
+import pyperf
+
+from .compare import (
+    DEFAULT_BOOTSTRAP,
+    NO_VERSION,
+    compute_aggregates,
+    format_delta,
+    format_suite_metadata,
+    get_labels,
+    quantity_delta,
+    significant_msg,
+)
+
+# Colors of the result files in the distribution plots
+COLORS = (
+    "#1f77b4",
+    "#ff7f0e",
+    "#2ca02c",
+    "#d62728",
+    "#9467bd",
+    "#8c564b",
+    "#e377c2",
+    "#7f7f7f",
+)
+HISTOGRAM_BINS = 20
+PLOT_WIDTH = 480
+PLOT_HEIGHT = 120
+PLOT_MARGIN = 20
+
+HTML_STYLE = """
+body { font-family: sans-serif; margin: 2em; }
+table { border-collapse: collapse; margin-bottom: 1em; }
+th, td { border: 1px solid #ccc; padding: 0.2em 0.6em; text-align: left; }
+th { background: #eee; }
+.faster { color: #2ca02c; }
+.slower { color: #d62728; }
+.benchmark { display: inline-block; vertical-align: top; margin: 0 1em 1em 0; }
+.legend span { margin-right: 1em; }
+"""
+
+
+def compare_benchmarks(base, changed):
+    """Return the (change, significance) verdict of two benchmarks."""
+    change = quantity_delta(base, changed)
+    try:
+        significance = significant_msg(base, changed)
+    except ValueError:
+        # The t-test requires the same number of values
+        significance = "(different number of values)"
+    return change, significance
+
+
+class Report:
+    """A report on one or more benchmark files.
+
+    The first file is the baseline, other files are compared to it.
+    """
+
+    def __init__(self, filenames, *, weights=None, bootstrap=DEFAULT_BOOTSTRAP):
+        if not filenames:
+            raise ValueError("missing benchmark files")
+        self.labels = get_labels(*filenames)
+        # Load each file only once
+        self.suites = [pyperf.BenchmarkSuite.load(filename) for filename in filenames]
+        self.weights = weights
+        self.bootstrap = bootstrap
+
+        names = set()
+        for suite in self.suites:
+            names.update(suite.get_benchmark_names())
+        self.names = sorted(names)
+
+    def get_benchmarks(self, name):
+        benchmarks = []
+        for suite in self.suites:
+            if name in suite.get_benchmark_names():
+                benchmarks.append(suite.get_benchmark(name))
+            else:
+                benchmarks.append(None)
+        return benchmarks
+
+    def iter_comparisons(self):
+        """Yield (name, base, changed) for each benchmark.
+
+        changed is a list of (bench, change, significance) tuples, one per
+        changed file; bench is None if the benchmark is missing.
+        """
+        for name in self.names:
+            base, *others = self.get_benchmarks(name)
+            changed = []
+            for bench in others:
+                if base is None or bench is None:
+                    changed.append((bench, None, None))
+                else:
+                    changed.append((bench, *compare_benchmarks(base, bench)))
+            yield name, base, changed
+
+    def get_aggregates(self):
+        base_suite, *changed_suites = self.suites
+        aggregates = []
+        for suite in changed_suites:
+            pairs = []
+            for name in self.names:
+                if name in base_suite.get_benchmark_names() and (
+                    name in suite.get_benchmark_names()
+                ):
+                    pairs.append(
+                        (base_suite.get_benchmark(name), suite.get_benchmark(name))
+                    )
+            aggregates.append(compute_aggregates(pairs, self.weights, self.bootstrap))
+        return aggregates
+
+    def is_time(self):
+        return all(
+            bench.get_unit() == "second"
+            for suite in self.suites
+            for bench in suite.get_benchmarks()
+        )
+
+    def get_warnings(self):
+        warnings = []
+        base_suite = self.suites[0]
+        version1 = base_suite.get_metadata().get("performance_version", NO_VERSION)
+        for label, suite in zip(self.labels[1:], self.suites[1:]):
+            version2 = suite.get_metadata().get("performance_version", NO_VERSION)
+            if version1 != version2 or (version1 == version2 == NO_VERSION):
+                warnings.append(
+                    f"Performance versions of {self.labels[0]} and {label}"
+                    f" are different ({version1} != {version2})"
+                )
+        return warnings
+
+    # HTML
+
+    def to_html(self):
+        lines = [
+            "<!DOCTYPE html>",
+            "<html>",
+            "<head>",
+            '<meta charset="utf-8">',
+            "<title>pyperformance report</title>",
+            f"<style>{HTML_STYLE}</style>",
+            "</head>",
+            "<body>",
+            "<h1>pyperformance report</h1>",
+        ]
+        for warning in self.get_warnings():
+            lines.append(f"<p><strong>WARNING: {html.escape(warning)}</strong></p>")
+
+        lines.append("<h2>Metadata</h2>")
+        for label, suite in zip(self.labels, self.suites):
+            lines.append(f"<h3>{html.escape(label)}</h3>")
+            lines.append("<ul>")
+            for line in format_suite_metadata(suite):
+                lines.append(f"<li>{html.escape(line)}</li>")
+            lines.append("</ul>")
+
+        if len(self.suites) > 1:
+            lines.append("<h2>Geometric mean per group</h2>")
+            lines.extend(self._html_aggregates())
+
+        lines.append("<h2>Results</h2>")
+        lines.extend(self._html_results())
+
+        lines.append("<h2>Distributions</h2>")
+        lines.append('<p class="legend">')
+        for index, label in enumerate(self.labels):
+            color = COLORS[index % len(COLORS)]
+            lines.append(
+                f'<span style="color: {color}">&#9632; {html.escape(label)}</span>'
+            )
+        lines.append("</p>")
+        for name in self.names:
+            benchmarks = self.get_benchmarks(name)
+            lines.append('<div class="benchmark">')
+            lines.append(f"<h3>{html.escape(name)}</h3>")
+            lines.append(format_histogram(benchmarks))
+            lines.append("</div>")
+
+        lines.extend(("</body>", "</html>"))
+        return "\n".join(lines) + "\n"
+
+    def _html_aggregates(self):
+        is_time = self.is_time()
+        header = ["Group", *self.labels[1:]]
+        rows = []
+        for group, cells in self._iter_aggregate_rows(is_time):
+            rows.append([html.escape(group), *cells])
+        return format_html_table(header, rows)
+
+    def _iter_aggregate_rows(self, is_time):
+        by_group = [
+            {aggregate.group: aggregate for aggregate in aggregates}
+            for aggregates in self.get_aggregates()
+        ]
+        groups = []
+        for aggregates in by_group:
+            for group in aggregates:
+                if group not in groups:
+                    groups.append(group)
+        for group in groups:
+            cells = []
+            for aggregates in by_group:
+                aggregate = aggregates.get(group)
+                if aggregate is None:
+                    cells.append("-")
+                    continue
+                text = format_delta(1.0, aggregate.ratio, is_time)
+                if aggregate.low is not None:
+                    text += " (95%% CI: %s - %s)" % (
+                        format_delta(1.0, aggregate.low, is_time),
+                        format_delta(1.0, aggregate.high, is_time),
+                    )
+                cells.append(text)
+            yield group, cells
+
+    def _html_results(self):
+        header = ["Benchmark", self.labels[0]]
+        for label in self.labels[1:]:
+            header.extend((label, "Change", "Significance"))
+        rows = []
+        for name, base, changed in self.iter_comparisons():
+            row = [html.escape(name), html.escape(format_mean(base))]
+            for bench, change, significance in changed:
+                row.append(html.escape(format_mean(bench)))
+                if change is None:
+                    row.extend(("-", "-"))
+                    continue
+                css = ""
+                if significance.startswith("Significant"):
+                    if "faster" in change or "smaller" in change:
+                        css = "faster"
+                    elif "slower" in change or "larger" in change:
+                        css = "slower"
+                row.append(f'<span class="{css}">{html.escape(change)}</span>')
+                row.append(html.escape(significance))
+            rows.append(row)
+        return format_html_table(header, rows)
+
+    # Markdown
+
+    def to_markdown(self):
+        lines = ["## pyperformance report", ""]
+        for warning in self.get_warnings():
+            lines.extend((f"**WARNING: {warning}**", ""))
+
+        for label, suite in zip(self.labels, self.suites):
+            lines.append(f"**{label}**: " + "; ".join(format_suite_metadata(suite)))
+            lines.append("")
+
+        if len(self.suites) > 1:
+            is_time = self.is_time()
+            lines.append("### Geometric mean per group")
+            lines.append("")
+            rows = list(self._iter_aggregate_rows(is_time))
+            lines.extend(
+                format_markdown_table(
+                    ["Group", *self.labels[1:]],
+                    [[group, *cells] for group, cells in rows],
+                )
+            )
+            lines.append("")
+
+        lines.append("### Results")
+        lines.append("")
+        header = ["Benchmark", self.labels[0], *self.labels[1:]]
+        rows = []
+        for name, base, changed in self.iter_comparisons():
+            row = [name, format_mean(base)]
+            for bench, change, significance in changed:
+                if change is None:
+                    row.append(format_mean(bench))
+                elif significance.startswith("Significant"):
+                    row.append(f"{format_mean(bench)}: **{change}**")
+                else:
+                    row.append(f"{format_mean(bench)}: {change}")
+            rows.append(row)
+        lines.extend(format_markdown_table(header, rows))
+        return "\n".join(lines) + "\n"
+
+
+def format_mean(bench):
+    if bench is None:
+        return "-"
+    return bench.format_value(bench.mean())
+
+
+def format_html_table(header, rows):
+    lines = ["<table>"]
+    cells = "".join(f"<th>{html.escape(cell)}</th>" for cell in header)
+    lines.append(f"<tr>{cells}</tr>")
+    for row in rows:
+        cells = "".join(f"<td>{cell}</td>" for cell in row)
+        lines.append(f"<tr>{cells}</tr>")
+    lines.append("</table>")
+    return lines
+
+
+def format_markdown_table(header, rows):
+    def format_row(cells):
+        cells = (str(cell).replace("|", "\\|") for cell in cells)
+        return "| " + " | ".join(cells) + " |"
+
+    lines = [format_row(header), "|" + "---|" * len(header)]
+    lines.extend(format_row(row) for row in rows)
+    return lines
+
+
+def format_histogram(benchmarks):
+    """Draw the distribution of the values of benchmarks as a SVG histogram.
+
+    benchmarks is a list of pyperf.Benchmark, or None for a missing
+    benchmark. Each benchmark is drawn with its own color.
+    """
+    values = [bench.get_values() if bench is not None else () for bench in benchmarks]
+    all_values = [value for bench_values in values for value in bench_values]
+    if not all_values:
+        return "<p>(no values)</p>"
+    format_value = next(bench for bench in benchmarks if bench is not None).format_value
+
+    low = min(all_values)
+    high = max(all_values)
+    if low == high:
+        # Center a single bar
+        low -= abs(low) * 0.01 or 1.0
+        high += abs(high) * 0.01 or 1.0
+    bin_width = (high - low) / HISTOGRAM_BINS
+
+    fractions = []
+    for bench_values in values:
+        counts = [0] * HISTOGRAM_BINS
+        for value in bench_values:
+            index = min(int((value - low) / bin_width), HISTOGRAM_BINS - 1)
+            counts[index] += 1
+        total = len(bench_values)
+        fractions.append([count / total if total else 0 for count in counts])
+    highest = max(max(bench_fractions) for bench_fractions in fractions)
+
+    width = PLOT_WIDTH
+    height = PLOT_HEIGHT + PLOT_MARGIN
+    bar_width = width / HISTOGRAM_BINS
+    lines = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}">'
+    ]
+    for index, bench_fractions in enumerate(fractions):
+        color = COLORS[index % len(COLORS)]
+        for bin_index, fraction in enumerate(bench_fractions):
+            if not fraction:
+                continue
+            bar_height = fraction / highest * PLOT_HEIGHT
+            lines.append(
+                f'<rect x="{bin_index * bar_width:.1f}"'
+                f' y="{PLOT_HEIGHT - bar_height:.1f}"'
+                f' width="{bar_width:.1f}" height="{bar_height:.1f}"'
+                f' fill="{color}" fill-opacity="0.5" />'
+            )
+    lines.append(
+        f'<line x1="0" y1="{PLOT_HEIGHT}" x2="{width}" y2="{PLOT_HEIGHT}"'
+        ' stroke="black" />'
+    )
+    text_y = height - 4
+    lines.append(
+        f'<text x="0" y="{text_y}" font-size="12">'
+        f"{html.escape(format_value(low))}</text>"
+    )
+    lines.append(
+        f'<text x="{width}" y="{text_y}" font-size="12" text-anchor="end">'
+        f"{html.escape(format_value(high))}</text>"
+    )
+    lines.append("</svg>")
+    return "\n".join(lines)
+
+
+def write_report(options):
+    report = Report(
+        options.filenames,
+        weights=options.weights,
+        bootstrap=options.bootstrap,
+    )
+
+    with open(options.output, "w", encoding="utf-8") as fp:
+        fp.write(report.to_html())
+    print("HTML report written into %s" % options.output)
+
+    if options.markdown:
+        with open(options.markdown, "w", encoding="utf-8") as fp:
+            fp.write(report.to_markdown())
+        print("Markdown summary written into %s" % options.markdown)
+
+    for warning in report.get_warnings():
+        print("WARNING: %s" % warning)
@@ -2,13 +2,14 @@ import hashlib
 import json
 import os
 import sys
+import tempfile
 import time
 import traceback
 from collections import namedtuple
 
 import pyperformance
 
-from . import _python, _pythoninfo, _utils, _venv
+from . import _pystats, _python, _pythoninfo, _utils, _venv
 from .venv import REQUIREMENTS_FILE, VenvForBenchmarks
 
 
@@ -67,16 +68,18 @@ def get_loops_from_file(filename):
     return loops
 
 
-def run_benchmarks(should_run, python, options):
-    if options.same_loops is not None:
-        loops = get_loops_from_file(options.same_loops)
-    else:
-        loops = {}
+def prepare_venvs(to_run, info, options, hooks=()):
+    """Create the venvs of the benchmarks and install their requirements.
 
-    to_run = sorted(should_run)
+    hooks are the names of the pyperf hooks run by the benchmarks: if
+    pyperformance provides one of them, pyperformance is also installed
+    in each venv. Return a dict mapping benchmarks to (venv, runid); venv
+    is None if the requirements of the benchmark cannot be installed.
+    """
+    from ._hooks import get_hook_names
 
-    info = _pythoninfo.get_info(python)
     runid = get_run_id(info)
+    need_hooks = not set(hooks).isdisjoint(get_hook_names())
 
     unique = getattr(options, "unique_venvs", False)
     if not unique:
@@ -86,9 +89,10 @@ def run_benchmarks(should_run, python, options):
             upgrade="oncreate",
             inherit_environ=options.inherit_environ,
         )
+        if need_hooks:
+            common.ensure_hooks()
 
     benchmarks = {}
-    venvs = set()
     for i, bench in enumerate(to_run):
         bench_runid = runid._replace(bench=bench)
         assert bench_runid.name, (bench, bench_runid)
@@ -117,24 +121,55 @@ def run_benchmarks(should_run, python, options):
             )
             # XXX Do not override when there is a requirements collision.
             venv.ensure_reqs(bench)
+            if need_hooks:
+                venv.ensure_hooks()
         except _venv.RequirementsInstallationFailedError:
             print("(benchmark will be skipped)")
             print()
             venv = None
-        venvs.add(venv_root)
         benchmarks[bench] = (venv, bench_runid)
     print()
+    return benchmarks
+
+
+def run_benchmarks(should_run, python, options):
+    if options.same_loops is not None:
+        loops = get_loops_from_file(options.same_loops)
+    else:
+        loops = {}
+
+    to_run = sorted(should_run)
+
+    info = _pythoninfo.get_info(python)
+    perf_stat_events = get_perf_stat_events(options)
+    alloc_profiles = {} if getattr(options, "alloc_profile", False) else None
+    hooks = list(options.hook or ())
+    if perf_stat_events:
+        hooks.append("perf_stat")
+    if alloc_profiles is not None:
+        hooks.append("alloc_profile")
+    benchmarks = prepare_venvs(to_run, info, options, hooks)
 
     suite = None
-    run_count = str(len(to_run))
+    runs = get_sweep_runs(to_run, getattr(options, "sweep", None))
+    run_count = str(len(runs))
     errors = []
 
     base_pyperf_opts = get_pyperf_opts(options)
+    env_vars = {}
+    if perf_stat_events:
+        base_pyperf_opts.append("--hook=perf_stat")
+        env_vars["PYPERFORMANCE_PERF_STAT_EVENTS"] = ",".join(perf_stat_events)
+    pystats_dir = getattr(options, "pystats", None)
+    if pystats_dir:
+        base_pyperf_opts.append("--hook=pystats")
 
     import pyperf
 
-    for index, bench in enumerate(to_run):
+    for index, (bench, params) in enumerate(runs):
         name = bench.name
+        if params:
+            name = get_sweep_name(name, params)
         print("[%s/%s] %s..." % (str(index + 1).rjust(len(run_count)), run_count, name))
         sys.stdout.flush()
 
@@ -167,6 +202,8 @@ def run_benchmarks(should_run, python, options):
             print("ERROR: Benchmark %s failed: could not install requirements" % name)
             errors.append((name, "Install requirements error"))
             continue
+        if pystats_dir:
+            stats_files = _pystats.get_stats_files()
         try:
             result = bench.run(
                 bench_venv.python,
@@ -174,6 +211,8 @@ def run_benchmarks(should_run, python, options):
                 pyperf_opts,
                 venv=bench_venv,
                 verbose=options.verbose,
+                env_vars=env_vars,
+                params=params,
             )
         except TimeoutError as exc:
             print("ERROR: Benchmark %s timed out" % name)
@@ -187,10 +226,29 @@ def run_benchmarks(should_run, python, options):
             traceback.print_exc()
             errors.append((name, exc))
         else:
+            if params:
+                add_sweep_metadata(result, params)
+            if pystats_dir:
+                add_pystats(name, result, pystats_dir, stats_files)
+            if alloc_profiles is not None:
+                try:
+                    profiles = run_alloc_profile(
+                        bench, bench_venv, bench_runid, options, params
+                    )
+                except Exception as exc:
+                    print("ERROR: Allocation profile of %s failed: %s" % (name, exc))
+                    traceback.print_exc()
+                    errors.append((name, exc))
+                else:
+                    add_alloc_profiles(result, profiles)
+                    alloc_profiles.update(profiles)
             suite = add_bench(suite, result)
 
     print()
 
+    if alloc_profiles:
+        write_alloc_profiles(get_alloc_profile_filename(options), alloc_profiles)
+
     return (suite, errors)
 
 
@@ -221,6 +279,198 @@ def get_compatibility_id(bench=None):
     return compat_id
 
 
+def get_perf_stat_events(options):
+    events = getattr(options, "perf_stat", None)
+    if not events:
+        return None
+
+    from ._hooks import check_perf_stat
+
+    supported, error = check_perf_stat(events)
+    if error:
+        print("WARNING: --perf-stat ignored: %s" % error)
+        return None
+    unsupported = [event for event in events if event not in supported]
+    if unsupported:
+        print("WARNING: perf stat cannot count: %s" % ", ".join(unsupported))
+    if not supported:
+        print("WARNING: --perf-stat ignored: no event can be counted")
+        return None
+    return supported
+
+
+def get_sweep_name(name, params):
+    # "json_loads[size=1000]"
+    return "%s[%s]" % (name, ",".join("%s=%s" % item for item in params.items()))
+
+
+def get_sweep_runs(benchmarks, sweep):
+    """Get the (benchmark, params) runs of run --sweep.
+
+    sweep is a (param, values) tuple, or None to run each benchmark once
+    with params=None. If values is empty, use the default values of the
+    params metadata of the benchmarks. Benchmarks without the parameter
+    are skipped.
+    """
+    if not sweep:
+        return [(bench, None) for bench in benchmarks]
+    param, values = sweep
+    runs = []
+    for bench in benchmarks:
+        if param not in bench.params:
+            print("Skip benchmark %s: no %s parameter" % (bench.name, param))
+            continue
+        for value in values or bench.params[param]:
+            runs.append((bench, {param: value}))
+    return runs
+
+
+def add_sweep_metadata(result, params):
+    """Rename the benchmarks run with params into a series per benchmark.
+
+    The sweep_series, sweep_param and sweep_value metadata are used by
+    "pyperformance compare" to fit the cost per element.
+    """
+    import pyperf
+
+    if isinstance(result, pyperf.BenchmarkSuite):
+        results = result.get_benchmarks()
+    else:
+        results = (result,)
+    ((param, value),) = params.items()
+    for bench in results:
+        series = bench.get_name()
+        bench.update_metadata(
+            {
+                "name": get_sweep_name(series, params),
+                "sweep_series": series,
+                "sweep_param": param,
+                "sweep_value": value,
+            }
+        )
+
+
+def get_iterations(bench):
+    # Number of iterations of warmups, values and calibration runs
+    iterations = 0
+    for run in bench.get_runs():
+        loops = sum(loops for loops, _ in run.warmups)
+        loops += len(run.values) * run.get_loops()
+        iterations += loops * run.get_inner_loops()
+    return iterations
+
+
+def add_pystats(name, result, directory, previous_files):
+    """Move the stats dumped by a benchmark into directory/name/.
+
+    Store the summary of the stats per iteration in the pystats_<name>
+    metadata of the benchmarks.
+    """
+    import pyperf
+
+    filenames = _pystats.get_stats_files() - previous_files
+    if not filenames:
+        print("WARNING: no pystats dumped by benchmark %s" % name)
+        return
+    filenames = _pystats.move_stats(filenames, os.path.join(directory, name))
+    summary = _pystats.summarize_stats(_pystats.read_stats(filenames))
+
+    if isinstance(result, pyperf.BenchmarkSuite):
+        results = result.get_benchmarks()
+    else:
+        results = (result,)
+    # the stats of all benchmarks of a script are dumped together
+    iterations = sum(get_iterations(bench) for bench in results)
+    if not iterations:
+        return
+    metadata = {"pystats_" + key: value / iterations for key, value in summary.items()}
+    for bench in results:
+        bench.update_metadata(metadata)
+
+
+ALLOC_PROFILE_METADATA = (
+    "peak_size",
+    "peak_blocks",
+    "retained_size",
+    "retained_blocks",
+)
+
+
+def get_alloc_profile_filename(options):
+    """Get the filename of the allocation profiles, next to the results."""
+    filename = options.output or options.append
+    for suffix in (".json.gz", ".json"):
+        if filename.endswith(suffix):
+            filename = filename[: -len(suffix)]
+            break
+    return filename + ".alloc.json"
+
+
+def run_alloc_profile(bench, venv, runid, options, params=None):
+    """Run an extra pass of a benchmark with the alloc_profile hook.
+
+    The pass computes a single value and is not timed. Return a dict
+    mapping benchmark names to their allocation profile.
+    """
+    name = bench.name
+    if params:
+        name = get_sweep_name(name, params)
+    print("Allocation profile of %s..." % name)
+    sys.stdout.flush()
+    pyperf_opts = ["--debug-single-value", "--hook=alloc_profile"]
+    if options.inherit_environ:
+        pyperf_opts.append("--inherit-environ=%s" % ",".join(options.inherit_environ))
+
+    from ._hooks import ALLOC_PROFILE_DIR_ENV
+
+    profiles = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        bench.run(
+            venv.python,
+            runid,
+            pyperf_opts,
+            venv=venv,
+            verbose=options.verbose,
+            env_vars={ALLOC_PROFILE_DIR_ENV: tmpdir},
+            params=params,
+        )
+        for filename in sorted(os.listdir(tmpdir)):
+            name = filename[: -len(".json")]
+            if params:
+                name = get_sweep_name(name, params)
+            with open(os.path.join(tmpdir, filename), encoding="utf-8") as fp:
+                profiles[name] = json.load(fp)
+    return profiles
+
+
+def add_alloc_profiles(result, profiles):
+    """Store the allocation totals in the alloc_<name> metadata."""
+    import pyperf
+
+    if isinstance(result, pyperf.BenchmarkSuite):
+        results = result.get_benchmarks()
+    else:
+        results = (result,)
+    for bench in results:
+        profile = profiles.get(bench.get_name())
+        if profile is None:
+            continue
+        bench.update_metadata(
+            {"alloc_" + key: profile[key] for key in ALLOC_PROFILE_METADATA}
+        )
+
+
+def write_alloc_profiles(filename, profiles):
+    # --append adds profiles to the existing file
+    if os.path.exists(filename):
+        with open(filename, encoding="utf-8") as fp:
+            profiles = dict(json.load(fp), **profiles)
+    with open(filename, "w", encoding="utf-8") as fp:
+        json.dump(profiles, fp, indent=1, sort_keys=True)
+        fp.write("\n")
+    print("Allocation profiles written into %s" % filename)
+
+
 def get_pyperf_opts(options):
     opts = []
 
@@ -0,0 +1,64 @@
+import unittest
+
+from pyperformance import _benchmark, _manifest
+
+# Groups of heavy benchmarks which are not in the default group
+HEAVY_GROUPS = (
+    "compression",
+    "concurrent_pools",
+    "io",
+    "latency",
+    "serialize_large",
+    "sqlite",
+    "sync",
+    "threading",
+)
+
+
+class PrepCmdTests(unittest.TestCase):
+    def test_private_resources(self):
+        inherited = []
+        argv, env = _benchmark._prep_cmd(
+            "python",
+            "run_benchmark.py",
+            ["--fast"],
+            "runid",
+            inherited.append,
+            tmpdir="/tmp/pyperformance-xyz",
+        )
+        self.assertEqual(argv, ["python", "-u", "run_benchmark.py", "--fast"])
+        self.assertEqual(env["TMPDIR"], "/tmp/pyperformance-xyz")
+        # pyperf workers must inherit the variable
+        self.assertIn("TMPDIR", inherited)
+
+    def test_no_resources(self):
+        _, env = _benchmark._prep_cmd(
+            "python", "run_benchmark.py", [], "runid", env_vars={}
+        )
+        self.assertEqual(env["PYPERFORMANCE_RUNID"], "runid")
+
+
+class DefaultManifestTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.manifest = _manifest.load_manifest(None)
+
+    def test_no_hook_in_extra_opts(self):
+        # pyperformance hooks are enabled by "pyperformance run --hook"
+        for bench in self.manifest.benchmarks:
+            with self.subTest(bench.name):
+                for opt in bench.extra_opts:
+                    self.assertFalse(opt.startswith("--hook"), opt)
+
+    def test_default_group(self):
+        # Heavy groups only run when selected with -b
+        default = set(self.manifest.resolve_group("default"))
+        for group in HEAVY_GROUPS:
+            with self.subTest(group):
+                benchmarks = set(self.manifest.resolve_group(group))
+                self.assertTrue(benchmarks)
+                self.assertFalse(benchmarks & default)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,164 @@
+import datetime
+import json
+import os.path
+import tempfile
+import threading
+import types
+import unittest
+import urllib.parse
+from contextlib import redirect_stderr
+from io import StringIO
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+import pyperf
+
+from pyperformance import _codespeed
+from pyperformance.compile import BenchmarkRevision
+
+
+def create_result(benchmark="nbody", commitid="abc", value=1.0, **kwargs):
+    result = {
+        "commitid": commitid,
+        "branch": "main",
+        "project": "CPython",
+        "executable": "lto-pgo",
+        "benchmark": benchmark,
+        "environment": "box",
+        "revision_date": "2026-01-0%s" % (len(commitid) % 9 + 1),
+        "result_value": value,
+    }
+    result.update(kwargs)
+    return result
+
+
+class ResultDatabaseTests(unittest.TestCase):
+    def setUp(self):
+        self.db = _codespeed.ResultDatabase(":memory:")
+        self.addCleanup(self.db.close)
+
+    def test_add_results(self):
+        count = self.db.add_results(
+            [create_result("nbody"), create_result("float", value=2.0)]
+        )
+        self.assertEqual(count, 2)
+        results = self.db.get_results()
+        self.assertEqual([r["benchmark"] for r in results], ["float", "nbody"])
+        self.assertEqual(self.db.get_names("benchmark"), ["float", "nbody"])
+        self.assertIsNotNone(results[0]["result_date"])
+
+    def test_upload_twice(self):
+        self.db.add_results([create_result(value=1.0)])
+        self.db.add_results([create_result(value=3.0)])
+        results = self.db.get_results()
+        self.assertEqual([r["result_value"] for r in results], [3.0])
+
+    def test_invalid_batch(self):
+        batch = [create_result("nbody"), {"benchmark": "float"}]
+        with self.assertRaises(_codespeed.InvalidResultError):
+            self.db.add_results(batch)
+        # nothing was stored
+        self.assertEqual(self.db.get_results(), [])
+
+    def test_timeline(self):
+        self.db.add_results(
+            [
+                create_result(commitid="a", value=1.0),
+                create_result(commitid="bb", value=2.0),
+                create_result(commitid="ccc", value=3.0),
+                create_result(commitid="a", environment="other"),
+                create_result("float", commitid="a"),
+            ]
+        )
+        timeline = self.db.get_timeline("nbody", revs=2, environment="box")
+        self.assertEqual(timeline["benchmark"], "nbody")
+        (line,) = timeline["timelines"]
+        self.assertEqual(line["environment"], "box")
+        self.assertEqual([p[1] for p in line["points"]], [2.0, 3.0])
+        self.assertEqual([p[3] for p in line["points"]], ["bb", "ccc"])
+
+
+class ResultServerTests(unittest.TestCase):
+    def setUp(self):
+        self.db = _codespeed.ResultDatabase(":memory:")
+        self.addCleanup(self.db.close)
+        # port 0: let the kernel pick a free port
+        server = _codespeed.create_server(self.db, port=0)
+        self.addCleanup(server.server_close)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(server.shutdown)
+        host, port = server.server_address[:2]
+        self.url = "http://%s:%s/" % (host, port)
+        # the server logs requests into stderr
+        stderr = redirect_stderr(StringIO())
+        stderr.__enter__()
+        self.addCleanup(stderr.__exit__, None, None, None)
+
+    def get_json(self, path):
+        with urlopen(self.url + path) as response:
+            return json.loads(response.read())
+
+    def test_add_json(self):
+        data = urllib.parse.urlencode(
+            {"json": json.dumps([create_result(), create_result("float")])}
+        )
+        with urlopen(self.url + "result/add/json/", data.encode()) as response:
+            self.assertEqual(response.status, 202)
+
+        self.assertEqual(self.get_json("api/benchmarks/"), ["float", "nbody"])
+        results = self.get_json("api/results/?benchmark=float")
+        self.assertEqual(len(results), 1)
+        timeline = self.get_json("timeline/json/?benchmark=nbody&revs=10")
+        self.assertEqual(len(timeline["timelines"]), 1)
+
+    def test_add_invalid(self):
+        data = urllib.parse.urlencode({"json": "[{}]"})
+        with self.assertRaises(HTTPError) as cm:
+            urlopen(self.url + "result/add/json/", data.encode())
+        self.assertEqual(cm.exception.code, 400)
+        cm.exception.close()
+
+    def test_upload_command(self):
+        # BenchmarkRevision.upload() is the client used by the upload command
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, "results.json")
+            bench = pyperf.Benchmark(
+                [pyperf.Run([1.0, 1.5], metadata={"name": "nbody", "unit": "second"})]
+            )
+            pyperf.BenchmarkSuite([bench]).dump(filename)
+            conf = types.SimpleNamespace(
+                url=self.url,
+                environment="box",
+                project="CPython",
+                executable="lto-pgo",
+                uploaded_json_dir=os.path.join(tmpdir, "uploaded"),
+                upload_spool_dir=os.path.join(tmpdir, "upload_spool"),
+                upload_batch_size=10,
+                upload_retries=0,
+                upload_retry_delay=1.0,
+                upload_compress=False,
+            )
+            revision = BenchmarkRevision(
+                conf,
+                "abc",
+                "main",
+                filename=filename,
+                commit_date=datetime.datetime(2026, 1, 1),
+                setup_log=False,
+            )
+            revision.upload()
+
+            self.assertTrue(revision.uploaded)
+            self.assertTrue(os.path.exists(revision.upload_filename))
+            self.assertEqual(os.listdir(conf.upload_spool_dir), [])
+
+        (result,) = self.get_json("api/results/")
+        self.assertEqual(result["benchmark"], "nbody")
+        self.assertEqual(result["commitid"], "abc")
+        self.assertEqual(result["result_value"], 1.25)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,9 +1,12 @@
+import json
 import os
 import os.path
 import shutil
 import textwrap
 import unittest
 
+import pyperf
+
 import pyperformance
 from pyperformance import tests
 
@@ -205,6 +208,110 @@ class FullStackTests(tests.Functional, unittest.TestCase):
             stdout,
         )
 
+    def test_run_with_pyperformance_hook(self):
+        # The hooks of pyperformance must be loadable in the benchmark venvs
+        filename = self.resolve_tmp("bench-test-rusage.json")
+
+        self.run_pyperformance(
+            "run",
+            "--manifest",
+            os.path.join(tests.DATA_DIR, "MANIFEST"),
+            "-b",
+            "all",
+            "--debug-single-value",
+            "-o",
+            filename,
+            "--hook",
+            "rusage",
+            "--hook",
+            "gc_stats",
+            capture=None,
+        )
+
+        suite = pyperf.BenchmarkSuite.load(filename)
+        for bench in suite.get_benchmarks():
+            metadata = bench.get_runs()[-1].get_metadata()
+            self.assertIn("rusage_utime", metadata)
+            self.assertIn("rusage_maxrss", metadata)
+            self.assertIn("gc_collections_0", metadata)
+            self.assertIn("gc_pause_total", metadata)
+
+    def test_run_perf_stat(self):
+        from pyperformance._hooks import check_perf_stat
+
+        # task-clock is a software event: it doesn't need hardware counters
+        supported, error = check_perf_stat(["task-clock"])
+        if not supported:
+            self.skipTest(error or "perf stat cannot count task-clock")
+        filename = self.resolve_tmp("bench-test-perf-stat.json")
+
+        self.run_pyperformance(
+            "run",
+            "--manifest",
+            os.path.join(tests.DATA_DIR, "MANIFEST"),
+            "-b",
+            "all",
+            "--debug-single-value",
+            "-o",
+            filename,
+            "--perf-stat",
+            "task-clock",
+            capture=None,
+        )
+
+        suite = pyperf.BenchmarkSuite.load(filename)
+        for bench in suite.get_benchmarks():
+            metadata = bench.get_runs()[-1].get_metadata()
+            self.assertIn("perf_stat_task-clock", metadata)
+
+    def test_run_alloc_profile(self):
+        filename = self.resolve_tmp("bench-test-alloc.json")
+
+        self.run_pyperformance(
+            "run",
+            "--manifest",
+            os.path.join(tests.DATA_DIR, "MANIFEST"),
+            "-b",
+            "all",
+            "--debug-single-value",
+            "-o",
+            filename,
+            "--alloc-profile",
+            capture=None,
+        )
+
+        with open(self.resolve_tmp("bench-test-alloc.alloc.json")) as fp:
+            profiles = json.load(fp)
+        self.assertEqual(sorted(profiles), ["local_wheel"])
+        suite = pyperf.BenchmarkSuite.load(filename)
+        metadata = suite.get_benchmark("local_wheel").get_metadata()
+        self.assertIn("alloc_peak_blocks", metadata)
+
+    ###################################
+    # profile
+
+    def test_profile_python_sampler(self):
+        # The sampler hook must be loadable in the benchmark venvs
+        outdir = self.resolve_tmp("profile", unique=True)
+
+        self.run_pyperformance(
+            "profile",
+            "--manifest",
+            os.path.join(tests.DATA_DIR, "MANIFEST"),
+            "-b",
+            "all",
+            "--sampler",
+            "python",
+            "-o",
+            outdir,
+            capture=None,
+        )
+
+        self.assertEqual(
+            sorted(os.listdir(outdir)),
+            ["local_wheel-base.collapsed", "local_wheel-base.svg"],
+        )
+
     ###################################
     # compile
 
@@ -461,6 +568,31 @@ class FullStackTests(tests.Functional, unittest.TestCase):
 
         self.assertEqual(csv, expected)
 
+    def test_compare_memory(self):
+        stdout = self.compare("--memory")
+        self.assertEqual(
+            stdout[stdout.index("### telco ###") :],
+            textwrap.dedent("""
+            ### telco ###
+            Mean +- std dev: 10.7 ms +- 0.5 ms -> 7.2 ms +- 0.3 ms: 1.49x faster
+            Significant (t=44.97)
+            Peak memory: 14.0 MiB -> 14.2 MiB: 1.02x larger
+        """).lstrip(),
+        )
+
+    def test_compare_csv_memory(self):
+        expected = textwrap.dedent("""
+            Benchmark,Base,Changed,Base memory,Changed memory
+            telco,0.01073,0.00722,14641971,14935040
+            """).lstrip()
+        filename = self.resolve_tmp("outfile.csv", unique=True)
+        with tests.CleanupFile(filename):
+            self.compare("--memory", "--csv", filename)
+            with open(filename, "r", encoding="utf-8") as infile:
+                csv = infile.read()
+
+        self.assertEqual(csv, expected)
+
     def test_compare_table(self):
         stdout = self.compare("-O", "table")
         self.assertEqual(
@@ -517,6 +649,50 @@ class FullStackTests(tests.Functional, unittest.TestCase):
         """).lstrip(),
         )
 
+    ###################################
+    # report
+
+    def test_report(self):
+        html_filename = self.resolve_tmp("report.html", unique=True)
+        md_filename = self.resolve_tmp("report.md", unique=True)
+        with tests.CleanupFile(html_filename), tests.CleanupFile(md_filename):
+            self.run_pyperformance(
+                "report",
+                os.path.join(tests.DATA_DIR, "py36.json"),
+                os.path.join(tests.DATA_DIR, "py38.json"),
+                "-o",
+                html_filename,
+                "--markdown",
+                md_filename,
+                "--bootstrap",
+                "0",
+                verbose=False,
+            )
+            with open(html_filename, encoding="utf-8") as infile:
+                html = infile.read()
+            with open(md_filename, encoding="utf-8") as infile:
+                markdown = infile.read()
+
+        self.assertIn("<svg", html)
+        self.assertIn("Significant (t=44.97)", html)
+        self.assertIn("<li>Python version: 3.8.2 (64-bit)</li>", html)
+        self.assertEqual(
+            markdown[markdown.index("### Geometric mean per group") :],
+            textwrap.dedent("""
+            ### Geometric mean per group
+
+            | Group | py38.json |
+            |---|---|
+            | all | 1.49x faster |
+
+            ### Results
+
+            | Benchmark | py36.json | py38.json |
+            |---|---|---|
+            | telco | 10.7 ms | 7.22 ms: **1.49x faster** |
+            """).lstrip(),
+        )
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,680 @@
+import contextlib
+import io
+import os.path
+import tempfile
+import types
+import unittest
+
+import pyperf
+
+from pyperformance import compare
+
+
+def create_bench(name, values, unit="second", tags=None):
+    metadata = {"name": name, "unit": unit, "performance_version": "1.0"}
+    if tags:
+        metadata["tags"] = tags
+    run = pyperf.Run(
+        values,
+        warmups=None,
+        metadata=metadata,
+        collect_metadata=False,
+    )
+    return pyperf.Benchmark([run])
+
+
+def create_suite(filename, benchmarks):
+    pyperf.BenchmarkSuite(benchmarks).dump(filename)
+    return filename
+
+
+class GetLabelsTests(unittest.TestCase):
+    def test_basenames(self):
+        labels = compare.get_labels("a/base.json", "b/x.json", "c/y.json")
+        self.assertEqual(labels, ("base.json", "x.json", "y.json"))
+
+    def test_duplicated_basenames(self):
+        labels = compare.get_labels("a/x.json", "b/x.json", "c/y.json")
+        self.assertEqual(labels, ("a/x.json", "b/x.json", "c/y.json"))
+
+
+class PeakMemoryTests(unittest.TestCase):
+    def create_bench(self, unit, runs):
+        return pyperf.Benchmark(
+            [
+                pyperf.Run(
+                    values,
+                    warmups=None if values else [(1, 1.0)],
+                    metadata=dict(metadata, name="bench", unit=unit),
+                    collect_metadata=False,
+                )
+                for values, metadata in runs
+            ]
+        )
+
+    def test_mean_of_runs(self):
+        bench = self.create_bench(
+            "second",
+            [
+                # The calibration run is ignored
+                ((), {"mem_max_rss": 1000}),
+                ((1.0,), {"mem_max_rss": 2000}),
+                ((1.0,), {"mem_max_rss": 4000}),
+            ],
+        )
+        self.assertEqual(compare.get_peak_memory(bench), 3000)
+
+    def test_command_max_rss(self):
+        bench = self.create_bench(
+            "second",
+            [((1.0,), {"mem_max_rss": 2000, "command_max_rss": 5000})],
+        )
+        self.assertEqual(compare.get_peak_memory(bench), 5000)
+
+    def test_missing(self):
+        bench = self.create_bench("second", [((1.0,), {})])
+        self.assertIsNone(compare.get_peak_memory(bench))
+
+    def test_track_memory(self):
+        bench = self.create_bench("byte", [((1000,), {"mem_max_rss": 2000})])
+        self.assertIsNone(compare.get_peak_memory(bench))
+
+
+class RusageTests(unittest.TestCase):
+    def create_bench(self, name, runs):
+        return pyperf.Benchmark(
+            [
+                pyperf.Run(
+                    values,
+                    warmups=None if values else [(1, 1.0)],
+                    metadata=dict(metadata, name=name, unit="second", loops=10),
+                    collect_metadata=False,
+                )
+                for values, metadata in runs
+            ]
+        )
+
+    def test_per_iteration(self):
+        bench = self.create_bench(
+            "bench",
+            [
+                # The calibration run is ignored
+                ((), {"rusage_utime": 100.0}),
+                ((1.0, 1.0), {"rusage_utime": 2.0, "rusage_minflt": 40}),
+                ((1.0, 1.0), {"rusage_utime": 4.0, "rusage_maxrss": 3000}),
+            ],
+        )
+        usage = compare.get_rusage(bench)
+        self.assertEqual(
+            sorted(usage), ["rusage_maxrss", "rusage_minflt", "rusage_utime"]
+        )
+        # 2 values of 10 loops per run
+        self.assertAlmostEqual(usage["rusage_utime"], 0.15)
+        self.assertEqual(usage["rusage_minflt"], 2.0)
+        self.assertEqual(usage["rusage_maxrss"], 3000)
+        self.assertEqual(compare.format_counter("rusage_utime", 0.15), "150 ms")
+        self.assertEqual(compare.format_counter("rusage_minflt", 2.0), "2")
+
+    def test_missing(self):
+        bench = self.create_bench("bench", [((1.0,), {})])
+        self.assertEqual(compare.get_rusage(bench), {})
+
+    def test_format(self):
+        base = self.create_bench("bench", [((1.0,), {"rusage_majflt": 10})])
+        changed = self.create_bench("bench", [((1.0,), {"rusage_majflt": 20})])
+        result = compare.BenchmarkResult(base, changed)
+        self.assertEqual(
+            result.format(sections={"rusage"}).splitlines()[-1],
+            "Major page faults per iteration: 1 -> 2: 2.00x larger",
+        )
+
+
+class PerfStatTests(unittest.TestCase):
+    def test_per_iteration(self):
+        metadata = {"name": "bench", "unit": "second", "loops": 100}
+        bench = pyperf.Benchmark(
+            [
+                pyperf.Run(
+                    [1.0, 1.0],
+                    metadata=dict(metadata, **{"perf_stat_instructions": 2_000_000}),
+                    collect_metadata=False,
+                ),
+                pyperf.Run(
+                    [1.0, 1.0],
+                    metadata=dict(metadata, **{"perf_stat_instructions": 4_000_000}),
+                    collect_metadata=False,
+                ),
+            ]
+        )
+        counts = compare.get_perf_stat(bench)
+        self.assertEqual(counts, {"perf_stat_instructions": 15_000})
+        self.assertEqual(
+            compare.format_counter("perf_stat_instructions", 15_000), "15,000"
+        )
+
+        result = compare.BenchmarkResult(bench, bench)
+        self.assertEqual(
+            result.format(sections={"perf_stat"}).splitlines()[-1],
+            "instructions per iteration: 15,000 -> 15,000: no change",
+        )
+
+
+class PystatsTests(unittest.TestCase):
+    def create_bench(self, hits, misses):
+        bench = create_bench("bench", [1.0, 1.0])
+        bench.update_metadata(
+            {
+                "pystats_specialization_hit": hits,
+                "pystats_specialization_miss": misses,
+            }
+        )
+        return bench
+
+    def test_compare(self):
+        base = self.create_bench(900.0, 100.0)
+        changed = self.create_bench(990.0, 10.0)
+        self.assertEqual(
+            compare.compare_pystats(base, changed),
+            [
+                (
+                    "pystats_specialization_hit",
+                    "Specialized instruction hits",
+                    900.0,
+                    990.0,
+                ),
+                (
+                    "pystats_specialization_miss",
+                    "Specialized instruction misses",
+                    100.0,
+                    10.0,
+                ),
+                ("pystats_hit_ratio", "Specialization hit ratio", 0.9, 0.99),
+            ],
+        )
+
+        result = compare.BenchmarkResult(base, changed)
+        self.assertEqual(
+            result.format(sections={"pystats"}).splitlines()[-1],
+            "Specialization hit ratio: 90.0% -> 99.0%: 1.10x larger",
+        )
+
+    def test_missing(self):
+        bench = create_bench("bench", [1.0, 1.0])
+        self.assertEqual(compare.get_pystats(bench), {})
+        self.assertEqual(compare.compare_pystats(bench, bench), [])
+
+
+class AllocProfileTests(unittest.TestCase):
+    def create_bench(self, peak_blocks, peak_size):
+        bench = create_bench("bench", [1.0, 1.0])
+        bench.update_metadata(
+            {"alloc_peak_blocks": peak_blocks, "alloc_peak_size": peak_size}
+        )
+        return bench
+
+    def test_compare(self):
+        base = self.create_bench(1000, 64 * 1024)
+        changed = self.create_bench(1500, 32 * 1024)
+        self.assertEqual(
+            compare.compare_alloc_profile(base, changed),
+            [
+                ("alloc_peak_size", "Traced memory peak", 64 * 1024, 32 * 1024),
+                ("alloc_peak_blocks", "Allocated blocks at peak", 1000, 1500),
+            ],
+        )
+        result = compare.BenchmarkResult(base, changed)
+        self.assertEqual(
+            result.format(sections={"alloc_profile"}).splitlines()[-2:],
+            [
+                "Traced memory peak: 64.0 KiB -> 32.0 KiB: 2.00x smaller",
+                "Allocated blocks at peak: 1,000 -> 1,500: 1.50x larger",
+            ],
+        )
+
+
+class GCStatsTests(unittest.TestCase):
+    create_bench = RusageTests.create_bench
+
+    def test_compare(self):
+        base = self.create_bench(
+            "bench",
+            [
+                ((1.0, 1.0), {"gc_collections_0": 40, "gc_pause_max": 0.002}),
+                ((1.0, 1.0), {"gc_collections_0": 60, "gc_pause_max": 0.004}),
+            ],
+        )
+        changed = self.create_bench(
+            "bench",
+            [
+                ((1.0, 1.0), {"gc_collections_0": 20, "gc_pause_max": 0.001}),
+                ((1.0, 1.0), {"gc_collections_0": 20, "gc_pause_max": 0.001}),
+            ],
+        )
+        self.assertEqual(
+            compare.get_gc_stats(base),
+            # 2 values of 10 loops per run; the max pause of all runs
+            {"gc_collections_0": 2.5, "gc_pause_max": 0.004},
+        )
+        result = compare.BenchmarkResult(base, changed)
+        self.assertEqual(
+            result.format(sections={"gc_stats"}).splitlines()[-2:],
+            [
+                "Generation 0 collections per iteration: 2.5 -> 1: 2.50x smaller",
+                "Max pause: 4.00 ms -> 1.00 ms: 4.00x smaller",
+            ],
+        )
+
+    def test_missing(self):
+        bench = self.create_bench("bench", [((1.0,), {})])
+        self.assertEqual(compare.get_gc_stats(bench), {})
+
+
+class LatencyTests(unittest.TestCase):
+    create_bench = RusageTests.create_bench
+
+    def test_compare(self):
+        base = self.create_bench(
+            "bench",
+            [
+                ((1.0,), {"latency_p99": 0.002, "latency_throughput": 1000.0}),
+                ((1.0,), {"latency_p99": 0.004, "latency_throughput": 2000.0}),
+            ],
+        )
+        changed = self.create_bench(
+            "bench",
+            [
+                ((1.0,), {"latency_p99": 0.001, "latency_throughput": 3000.0}),
+                ((1.0,), {"latency_p99": 0.001, "latency_throughput": 3000.0}),
+            ],
+        )
+        self.assertEqual(
+            compare.get_latency(base),
+            {"latency_p99": 0.003, "latency_throughput": 1500.0},
+        )
+        result = compare.BenchmarkResult(base, changed)
+        self.assertEqual(
+            result.format(sections={"latency"}).splitlines()[-2:],
+            [
+                "p99 latency: 3.00 ms -> 1.00 ms: 3.00x smaller",
+                "Throughput: 1,500 req/s -> 3,000 req/s: 2.00x larger",
+            ],
+        )
+
+    def test_missing(self):
+        bench = self.create_bench("bench", [((1.0,), {})])
+        self.assertEqual(compare.get_latency(bench), {})
+
+
+class CounterSectionsTests(unittest.TestCase):
+    def test_sections(self):
+        options = types.SimpleNamespace(rusage=True, latency=True, memory=True)
+        sections = compare.get_counter_sections(options)
+        self.assertEqual(sections, {"rusage", "latency"})
+        self.assertEqual(
+            [header for header, _ in compare.get_counter_tables(sections)],
+            ["Throughput", "Resource usage per iteration", "Latency percentiles"],
+        )
+
+
+class ThroughputTests(unittest.TestCase):
+    def create_bench(self, value, payload_size=None):
+        bench = create_bench("serialize_large_marshal", [value])
+        if payload_size is not None:
+            bench.update_metadata({"payload_size": payload_size})
+        return bench
+
+    def test_throughput(self):
+        bench = self.create_bench(0.5, 100_000_000)
+        self.assertEqual(compare.get_throughput(bench), 200_000_000)
+        self.assertEqual(compare.format_throughput(2e9), "2,000.0 MB/s")
+
+    def test_compare(self):
+        base = self.create_bench(0.5, 100_000_000)
+        changed = self.create_bench(0.25, 100_000_000)
+        result = compare.BenchmarkResult(base, changed)
+        self.assertEqual(
+            result.format().splitlines()[-1],
+            "Throughput: 200.0 MB/s -> 400.0 MB/s: 2.00x larger",
+        )
+
+    def test_rows(self):
+        base = self.create_bench(0.5)
+        base.update_metadata({"payload_rows": 100_000})
+        changed = self.create_bench(0.4)
+        changed.update_metadata({"payload_rows": 100_000})
+        self.assertIsNone(compare.get_throughput(base))
+        self.assertEqual(
+            compare.get_throughput(base, compare.PAYLOAD_ROWS_METADATA), 200_000
+        )
+        result = compare.BenchmarkResult(base, changed)
+        self.assertEqual(
+            result.format().splitlines()[-1],
+            "Throughput: 200,000 rows/s -> 250,000 rows/s: 1.25x larger",
+        )
+
+    def test_missing(self):
+        bench = self.create_bench(0.5)
+        self.assertIsNone(compare.get_throughput(bench))
+        self.assertEqual(compare.compare_throughput(bench, bench), [])
+
+
+class ThreadScalingTests(unittest.TestCase):
+    def create_suite(self, times):
+        benchmarks = []
+        for name, threads, value in times:
+            bench = create_bench("threading_dict_%s" % name, [value])
+            bench.update_metadata(
+                {"threads": threads, "scaling_group": "threading_dict"}
+            )
+            benchmarks.append(bench)
+        return pyperf.BenchmarkSuite(benchmarks)
+
+    def test_efficiency(self):
+        suite = self.create_suite(
+            [("shared", 4, 0.5e-6), ("single", 1, 1e-6), ("scaled", 2, 0.5e-6)]
+        )
+        groups = compare.get_thread_scaling(suite.get_benchmarks())
+        self.assertEqual(list(groups), ["threading_dict"])
+        scaling = compare.get_scaling_efficiency(groups["threading_dict"])
+        self.assertEqual(
+            [
+                (threads, speedup, efficiency)
+                for threads, _, speedup, efficiency in scaling
+            ],
+            [(1, 1.0, 1.0), (2, 2.0, 1.0), (4, 2.0, 0.5)],
+        )
+        table = compare.format_scaling_table(groups["threading_dict"])
+        self.assertIn(
+            "| threading_dict_shared | 4       | 500 ns             | 2,000,000 ops/s",
+            table,
+        )
+
+    def test_comparison(self):
+        base = self.create_suite([("single", 1, 1e-6), ("scaled", 2, 1e-6)])
+        # Same benchmarks on a machine with more CPUs
+        changed = self.create_suite([("single", 1, 1.2e-6), ("scaled", 4, 0.3e-6)])
+        table = compare.format_scaling_comparison("base", "changed", base, changed)
+        self.assertEqual(
+            table.splitlines()[-2],
+            "| threading_dict_scaled | 2       | 50%             | 100%"
+            "               | 3.33x faster      |",
+        )
+
+    def test_no_scaling_group(self):
+        suite = pyperf.BenchmarkSuite([create_bench("bench", [1.0])])
+        self.assertEqual(compare.get_thread_scaling(suite.get_benchmarks()), {})
+
+
+class SweepTests(unittest.TestCase):
+    def create_suite(self, times):
+        benchmarks = []
+        for size, value in times:
+            bench = create_bench("json_loads[size=%s]" % size, [value])
+            bench.update_metadata(
+                {
+                    "sweep_series": "json_loads",
+                    "sweep_param": "size",
+                    "sweep_value": size,
+                }
+            )
+            benchmarks.append(bench)
+        return pyperf.BenchmarkSuite(benchmarks)
+
+    def test_fit(self):
+        # 1 us + 2 us per element
+        suite = self.create_suite([(100, 201e-6), (10, 21e-6), (1000, 2001e-6)])
+        series = compare.get_sweep_series(suite.get_benchmarks())
+        self.assertEqual(list(series), [("json_loads", "size")])
+        rows = series["json_loads", "size"]
+        self.assertEqual([size for size, _ in rows], [10, 100, 1000])
+        cost, exponent = compare.fit_sweep(rows)
+        self.assertAlmostEqual(cost, 2e-6)
+        self.assertAlmostEqual(exponent, 1.0, places=1)
+        table = compare.format_sweep_table(series)
+        self.assertIn("| json_loads | size=10,100,1000 | 2.00 us", table)
+
+    def test_quadratic(self):
+        suite = self.create_suite([(10, 1e-6), (100, 100e-6)])
+        series = compare.get_sweep_series(suite.get_benchmarks())
+        _, exponent = compare.fit_sweep(series["json_loads", "size"])
+        self.assertAlmostEqual(exponent, 2.0)
+
+    def test_single_value(self):
+        suite = self.create_suite([(10, 1e-6)])
+        series = compare.get_sweep_series(suite.get_benchmarks())
+        self.assertIsNone(compare.fit_sweep(series["json_loads", "size"]))
+        self.assertIsNone(compare.format_sweep_table(series))
+
+    def test_comparison(self):
+        base = self.create_suite([(10, 20e-6), (100, 200e-6)])
+        changed = self.create_suite([(10, 10e-6), (100, 100e-6)])
+        table = compare.format_sweep_comparison("base", "changed", base, changed)
+        self.assertEqual(
+            table.splitlines()[-2],
+            "| json_loads | 2.00 us   | 1.00 us      | 2.00x faster | 1.00"
+            "          | 1.00             |",
+        )
+
+
+class MultiBenchmarkResultTests(unittest.TestCase):
+    def test_ratios(self):
+        result = compare.MultiBenchmarkResult(
+            create_bench("bench", [2.0, 2.0]),
+            [
+                create_bench("bench", [1.0, 1.0]),
+                None,
+                create_bench("bench", [4.0, 4.0]),
+            ],
+        )
+        self.assertEqual(result.ratios(), [0.5, None, 2.0])
+        self.assertEqual(result.best_worst(), (0, 2))
+
+    def test_best_worst_needs_two_results(self):
+        result = compare.MultiBenchmarkResult(
+            create_bench("bench", [2.0, 2.0]),
+            [create_bench("bench", [1.0, 1.0]), None],
+        )
+        self.assertEqual(result.best_worst(), (None, None))
+
+    def test_best_worst_all_equal(self):
+        result = compare.MultiBenchmarkResult(
+            create_bench("bench", [2.0, 2.0]),
+            [create_bench("bench", [1.0, 1.0]), create_bench("bench", [1.0, 1.0])],
+        )
+        self.assertEqual(result.best_worst(), (None, None))
+
+    def test_different_benchmarks(self):
+        with self.assertRaises(ValueError):
+            compare.MultiBenchmarkResult(
+                create_bench("bench", [2.0, 2.0]),
+                [create_bench("other", [1.0, 1.0])],
+            )
+
+
+class AggregateTests(unittest.TestCase):
+    def create_pairs(self):
+        return [
+            (
+                create_bench("a", [1.0, 1.1, 0.9], tags=["math"]),
+                create_bench("a", [0.5, 0.55, 0.45], tags=["math"]),
+            ),
+            (
+                create_bench("b", [1.0, 1.1, 0.9], tags=["math", "regex"]),
+                create_bench("b", [2.0, 2.2, 1.8], tags=["math", "regex"]),
+            ),
+            (
+                create_bench("c", [1.0, 1.1, 0.9]),
+                create_bench("c", [0.25, 0.275, 0.225]),
+            ),
+        ]
+
+    def test_groups(self):
+        aggregates = compare.compute_aggregates(self.create_pairs(), bootstrap=0)
+        self.assertEqual(
+            [(a.group, a.count) for a in aggregates],
+            [("all", 3), ("math", 2), ("regex", 1)],
+        )
+        self.assertAlmostEqual(aggregates[0].ratio, 0.25 ** (1 / 3))
+        self.assertAlmostEqual(aggregates[1].ratio, 1.0)
+        self.assertAlmostEqual(aggregates[2].ratio, 2.0)
+        self.assertIsNone(aggregates[0].low)
+        self.assertIsNone(aggregates[0].high)
+
+    def test_weights(self):
+        weights = {"math": 0.0, "b": 2.0}
+        aggregates = compare.compute_aggregates(
+            self.create_pairs(), weights, bootstrap=0
+        )
+        self.assertEqual(
+            [(a.group, a.count) for a in aggregates],
+            [("all", 2), ("math", 1), ("regex", 1)],
+        )
+        # (2.0 ** 2 * 0.25) ** (1 / 3)
+        self.assertAlmostEqual(aggregates[0].ratio, 1.0)
+
+    def test_bootstrap(self):
+        aggregates = compare.compute_aggregates(self.create_pairs(), bootstrap=200)
+        for aggregate in aggregates:
+            self.assertLessEqual(aggregate.low, aggregate.ratio)
+            self.assertLessEqual(aggregate.ratio, aggregate.high)
+
+        # The bootstrap is reproducible
+        self.assertEqual(
+            compare.compute_aggregates(self.create_pairs(), bootstrap=200),
+            aggregates,
+        )
+
+    def test_format_aggregate_table(self):
+        aggregates = [compare.Aggregate("all", 2, 0.5, 0.4, 0.6)]
+        table = compare.format_aggregate_table(["changed.json"], [aggregates])
+        self.assertEqual(
+            table.splitlines()[3],
+            "| all   | 2          | 2.00x faster | 2.50x faster - 1.67x faster |",
+        )
+
+
+class CompareMultipleResultsTests(unittest.TestCase):
+    def test_compare_multiple_results(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            base = create_suite(
+                os.path.join(tmpdir, "base.json"),
+                [create_bench("a", [1.0, 1.0]), create_bench("b", [1.0, 1.0])],
+            )
+            changed1 = create_suite(
+                os.path.join(tmpdir, "changed1.json"),
+                [create_bench("a", [0.5, 0.5]), create_bench("b", [2.0, 2.0])],
+            )
+            changed2 = create_suite(
+                os.path.join(tmpdir, "changed2.json"),
+                [create_bench("a", [2.0, 2.0])],
+            )
+            options = types.SimpleNamespace(
+                baseline_filename=base,
+                changed_filenames=[changed1, changed2],
+            )
+            with contextlib.redirect_stdout(io.StringIO()) as stdout:
+                results = compare.compare_multiple_results(options)
+
+            table = [
+                line for line in stdout.getvalue().splitlines() if line.startswith("|")
+            ]
+            csv_filename = os.path.join(tmpdir, "out.csv")
+            compare.write_multi_csv(
+                results, csv_filename, ["changed1.json", "changed2.json"]
+            )
+            with open(csv_filename, encoding="ascii") as infile:
+                csv = infile.read()
+
+        self.assertEqual([result.name for result in results], ["a", "b"])
+        self.assertEqual(
+            table[1],
+            "| a              | 1.00 sec  | 500 ms: 2.00x faster   | 2.00 sec: 2.00x slower | changed1.json | changed2.json |",
+        )
+        self.assertEqual(
+            table[-1],
+            "| Geometric mean | (ref)     | no change              | 2.00x slower           |               |               |",
+        )
+        self.assertEqual(
+            csv.splitlines(),
+            [
+                "Benchmark,Base,changed1.json,changed2.json",
+                "a,1.00,0.50000,2.00",
+                "b,1.00,2.00,",
+            ],
+        )
+
+    def create_bench(self, value, metadata):
+        run = pyperf.Run(
+            [value],
+            warmups=None,
+            metadata=dict(
+                metadata,
+                name="a",
+                unit="second",
+                loops=10,
+                performance_version="1.0",
+            ),
+            collect_metadata=False,
+        )
+        return pyperf.Benchmark([run])
+
+    def test_memory_and_counters(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            base = create_suite(
+                os.path.join(tmpdir, "base.json"),
+                [self.create_bench(1.0, {"mem_max_rss": 2**20, "rusage_majflt": 10})],
+            )
+            changed1 = create_suite(
+                os.path.join(tmpdir, "changed1.json"),
+                [self.create_bench(1.0, {"mem_max_rss": 2**21, "rusage_majflt": 20})],
+            )
+            changed2 = create_suite(
+                os.path.join(tmpdir, "changed2.json"),
+                [self.create_bench(1.0, {"rusage_majflt": 5})],
+            )
+            options = types.SimpleNamespace(
+                baseline_filename=base,
+                changed_filenames=[changed1, changed2],
+                memory=True,
+                rusage=True,
+            )
+            with contextlib.redirect_stdout(io.StringIO()) as stdout:
+                results = compare.compare_multiple_results(options)
+
+            csv_filename = os.path.join(tmpdir, "out.csv")
+            compare.write_multi_csv(
+                results,
+                csv_filename,
+                ["changed1.json", "changed2.json"],
+                memory=True,
+            )
+            with open(csv_filename, encoding="ascii") as infile:
+                csv = infile.read()
+
+        lines = stdout.getvalue().splitlines()
+        self.assertIn(
+            "| a         | 1024.0 KiB | 2048.0 KiB: 2.00x larger | -             |",
+            lines,
+        )
+        self.assertIn(
+            "| a         | Major page faults            | 1         | 2             | 2.00x larger |",
+            lines,
+        )
+        self.assertIn(
+            "| a         | Major page faults            | 1         | 0.5           | 2.00x smaller |",
+            lines,
+        )
+        self.assertEqual(
+            csv.splitlines(),
+            [
+                (
+                    "Benchmark,Base,changed1.json,changed2.json,"
+                    "Base memory,changed1.json memory,changed2.json memory"
+                ),
+                "a,1.00,1.00,1.00,1048576,2097152,",
+            ],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
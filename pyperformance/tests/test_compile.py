@@ -39,7 +39,7 @@ class ParseConfigTests(unittest.TestCase):
 
 
 class CompileCommandTests(unittest.TestCase):
-    def test_compile_adds_tail_call_interp_flag(self):
+    def compile(self, **kwargs):
         conf = types.SimpleNamespace(
             build_dir="/tmp/build",
             repo_dir="/tmp/cpython",
@@ -48,10 +48,13 @@ class CompileCommandTests(unittest.TestCase):
             lto=False,
             pgo=True,
             jit="",
-            tail_call_interp=True,
+            tail_call_interp=False,
+            pystats=False,
             pkg_only=[],
             jobs=0,
         )
+        for key, value in kwargs.items():
+            setattr(conf, key, value)
         app = types.SimpleNamespace(
             branch="main",
             logger=None,
@@ -60,6 +63,10 @@ class CompileCommandTests(unittest.TestCase):
         )
 
         compile_mod.Python(app, conf).compile()
+        return conf, app
+
+    def test_compile_adds_tail_call_interp_flag(self):
+        conf, app = self.compile(tail_call_interp=True)
 
         configure_call = app.run.call_args_list[0]
         self.assertEqual(
@@ -68,6 +75,15 @@ class CompileCommandTests(unittest.TestCase):
         )
         self.assertEqual(configure_call.kwargs, {"cwd": "/tmp/build"})
 
+    def test_compile_adds_pystats_flag(self):
+        conf, app = self.compile(pystats=True)
+
+        configure_call = app.run.call_args_list[0]
+        self.assertEqual(
+            configure_call.args,
+            (os.path.join(conf.repo_dir, "configure"), "--enable-pystats"),
+        )
+
 
 if __name__ == "__main__":
     unittest.main()
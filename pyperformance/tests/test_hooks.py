@@ -0,0 +1,241 @@
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import types
+import unittest
+from unittest import mock
+
+from pyperformance import _hooks, tests
+from pyperformance._pyproject_toml import tomllib
+
+
+class HookNamesTests(unittest.TestCase):
+    def test_entry_points(self):
+        # VenvForBenchmarks.ensure_hooks() checks the installed entry points
+        filename = os.path.join(tests.REPO_ROOT, "pyproject.toml")
+        with open(filename, "rb") as fp:
+            project = tomllib.load(fp)["project"]
+        entry_points = project["entry-points"]["pyperf.hook"]
+        self.assertEqual(sorted(entry_points), _hooks.get_hook_names())
+
+
+@unittest.skipIf(_hooks.resource is None, "requires the resource module")
+class RusageHookTests(unittest.TestCase):
+    def test_teardown(self):
+        hook = _hooks.rusage()
+        for _ in range(2):
+            with hook:
+                data = [bytearray(1024) for _ in range(1000)]
+                del data
+
+        metadata = {}
+        hook.teardown(metadata)
+        self.assertEqual(
+            sorted(metadata),
+            [
+                "rusage_majflt",
+                "rusage_maxrss",
+                "rusage_minflt",
+                "rusage_nivcsw",
+                "rusage_nvcsw",
+                "rusage_stime",
+                "rusage_utime",
+            ],
+        )
+        self.assertGreater(metadata["rusage_maxrss"], 0)
+        self.assertGreaterEqual(metadata["rusage_utime"], 0)
+
+
+class GCStatsTests(unittest.TestCase):
+    def test_teardown(self):
+        hook = _hooks.gc_stats()
+        # Collections outside the timed code are ignored
+        gc.collect()
+        with hook:
+            gc.collect(0)
+            gc.collect()
+        gc.collect()
+
+        metadata = {}
+        hook.teardown(metadata)
+        self.assertEqual(metadata["gc_collections_0"], 1)
+        self.assertEqual(metadata["gc_collections_2"], 1)
+        self.assertEqual(len(hook.pauses), 2)
+        self.assertGreater(metadata["gc_pause_max"], 0)
+        self.assertLessEqual(metadata["gc_pause_p50"], metadata["gc_pause_max"])
+        self.assertAlmostEqual(metadata["gc_pause_total"], sum(hook.pauses))
+        self.assertNotIn(hook._callback, gc.callbacks)
+
+    def test_no_collection(self):
+        hook = _hooks.gc_stats()
+        metadata = {"gc_pause_max": 1.0}
+        hook.teardown(metadata)
+        self.assertEqual(metadata["gc_collections_1"], 0)
+        self.assertEqual(metadata["gc_pause_max"], 0.0)
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(_hooks.percentile(values, 50), 50)
+        self.assertEqual(_hooks.percentile(values, 99), 99)
+        self.assertEqual(_hooks.percentile([5], 99), 5)
+
+
+class LatencyTests(unittest.TestCase):
+    def test_teardown(self):
+        main = types.ModuleType("__main__")
+        main.LATENCIES = []
+        with mock.patch.dict(sys.modules, {"__main__": main}):
+            hook = _hooks.latency()
+        for value in range(2):
+            # Latencies recorded before the timed code are ignored
+            main.LATENCIES.append(10.0)
+            with hook:
+                main.LATENCIES.extend(
+                    (value * 500 + index) / 1000 for index in range(1, 501)
+                )
+                time.sleep(0.001)
+
+        metadata = {}
+        hook.teardown(metadata)
+        self.assertEqual(main.LATENCIES, [])
+        self.assertEqual(metadata["latency_requests"], 1000)
+        self.assertEqual(metadata["latency_p50"], 0.5)
+        self.assertEqual(metadata["latency_p90"], 0.9)
+        self.assertEqual(metadata["latency_p99"], 0.99)
+        self.assertEqual(metadata["latency_p999"], 0.999)
+        self.assertGreater(metadata["latency_throughput"], 0)
+        self.assertNotIn("loop_latency_p50", metadata)
+
+    def test_loop_latencies(self):
+        main = types.ModuleType("__main__")
+        main.LATENCIES = []
+        main.LOOP_LATENCIES = []
+        with mock.patch.dict(sys.modules, {"__main__": main}):
+            hook = _hooks.latency()
+        # Iterations recorded before the timed code are ignored
+        main.LOOP_LATENCIES.append(10.0)
+        with hook:
+            main.LATENCIES.append(0.5)
+            main.LOOP_LATENCIES.extend(index / 1000 for index in range(1, 1001))
+
+        metadata = {}
+        hook.teardown(metadata)
+        self.assertEqual(main.LOOP_LATENCIES, [])
+        self.assertEqual(metadata["latency_requests"], 1)
+        self.assertEqual(metadata["loop_iterations"], 1000)
+        self.assertEqual(metadata["loop_latency_p50"], 0.5)
+        self.assertEqual(metadata["loop_latency_p99"], 0.99)
+        self.assertEqual(metadata["loop_latency_p999"], 0.999)
+
+    def test_no_latencies(self):
+        # Benchmarks which don't record latencies are run unchanged
+        main = types.ModuleType("__main__")
+        with mock.patch.dict(sys.modules, {"__main__": main}):
+            hook = _hooks.latency()
+            with hook:
+                pass
+        metadata = {}
+        hook.teardown(metadata)
+        self.assertEqual(metadata, {})
+
+
+class PerfStatTests(unittest.TestCase):
+    def test_parse(self):
+        output = "\n".join(
+            [
+                "# started on Mon Oct 19 10:00:00 2026",
+                "",
+                "1234567,,instructions:u,1000,100.00,,",
+                "2345678.0,,cycles:u,1000,100.00,0.5,insn per cycle",
+                "<not supported>,,cache-misses,0,100.00,,",
+                "<not counted>,,branch-misses,0,0.00,,",
+            ]
+        )
+        self.assertEqual(
+            _hooks.parse_perf_stat(output),
+            {"instructions:u": 1234567, "cycles:u": 2345678},
+        )
+
+    def test_check_without_perf(self):
+        with mock.patch("shutil.which", return_value=None):
+            events, error = _hooks.check_perf_stat(["instructions"])
+        self.assertEqual(events, [])
+        self.assertEqual(error, "perf command not found")
+
+    def test_check_unsupported_event(self):
+        proc = mock.Mock(returncode=0, stderr="1000,,instructions,1,100.00,,\n")
+        with (
+            mock.patch("shutil.which", return_value="/usr/bin/perf"),
+            mock.patch("subprocess.run", return_value=proc),
+        ):
+            events, error = _hooks.check_perf_stat(["instructions", "cycles"])
+        self.assertEqual(events, ["instructions"])
+        self.assertIsNone(error)
+
+
+class SamplerTests(unittest.TestCase):
+    def busy_loop(self):
+        deadline = time.perf_counter() + 0.1
+        while time.perf_counter() < deadline:
+            pass
+
+    def test_teardown(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with mock.patch.dict(os.environ, {_hooks.PROFILE_DIR_ENV: tmpdir}):
+                hook = _hooks.sampler()
+            with hook:
+                self.busy_loop()
+            hook.teardown({})
+
+            (filename,) = os.listdir(tmpdir)
+            with open(os.path.join(tmpdir, filename), encoding="utf-8") as fp:
+                lines = fp.read().splitlines()
+
+        self.assertTrue(lines)
+        self.assertTrue(any("busy_loop (test_hooks.py:" in line for line in lines))
+        stack, count = lines[0].rsplit(" ", 1)
+        self.assertGreater(int(count), 0)
+
+    def test_missing_directory(self):
+        with mock.patch.dict(os.environ):
+            os.environ.pop(_hooks.PROFILE_DIR_ENV, None)
+            with self.assertRaises(_hooks.HookError):
+                _hooks.sampler()
+
+
+class AllocProfileTests(unittest.TestCase):
+    def test_teardown(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            env = {_hooks.ALLOC_PROFILE_DIR_ENV: tmpdir}
+            with mock.patch.dict(os.environ, env):
+                hook = _hooks.alloc_profile()
+            retained = []
+            with hook:
+                data = [bytearray(1000) for _ in range(100)]
+                retained.append(bytearray(5000))
+                del data
+            hook.teardown({"name": "bench"})
+
+            with open(os.path.join(tmpdir, "bench.json"), encoding="utf-8") as fp:
+                profile = json.load(fp)
+
+        self.assertGreaterEqual(profile["peak_size"], 100 * 1000)
+        self.assertGreaterEqual(profile["retained_size"], 5000)
+        self.assertGreaterEqual(profile["retained_blocks"], 1)
+        site, size, count = profile["top_size"][0]
+        self.assertIn("test_hooks.py:", site)
+        self.assertGreaterEqual(size, 5000)
+        self.assertTrue(profile["top_count"])
+
+    def test_missing_directory(self):
+        with mock.patch.dict(os.environ):
+            os.environ.pop(_hooks.ALLOC_PROFILE_DIR_ENV, None)
+            with self.assertRaises(_hooks.HookError):
+                _hooks.alloc_profile()
+
+
+if __name__ == "__main__":
+    unittest.main()
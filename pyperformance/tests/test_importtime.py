@@ -0,0 +1,81 @@
+import sys
+import types
+import unittest
+
+from pyperformance import importtime
+
+OUTPUT = """\
+import time: self [us] | cumulative | imported package
+import time:       168 |        168 |       _json
+import time:       398 |        565 |     json.scanner
+import time:       373 |        938 |   json.decoder
+import time:       398 |        398 |   json.encoder
+import time:       211 |       1545 | json
+"""
+
+
+class ParseTests(unittest.TestCase):
+    def test_parse(self):
+        modules = importtime.parse_importtime(OUTPUT + "Traceback\n")
+        self.assertEqual(len(modules), 5)
+        self.assertEqual(modules["json"], (211, 1545))
+        self.assertEqual(modules["_json"], (168, 168))
+
+    def test_aggregate(self):
+        samples = [
+            {"json": (200, 1500), "_json": (100, 100)},
+            {"json": (210, 1600), "_json": (150, 150)},
+            {"json": (900, 9000), "_json": (120, 120), "re": (50, 50)},
+        ]
+        medians, total = importtime.aggregate_importtime(samples)
+        self.assertEqual(medians["json"], (210, 1600))
+        self.assertEqual(medians["_json"], (120, 120))
+        # only imported by one launch
+        self.assertEqual(medians["re"], (50, 50))
+        self.assertEqual(total, 360)
+
+    def test_compare(self):
+        base = ({"json": (200, 1500), "re": (100, 100)}, 300)
+        changed = ({"json": (400, 1700), "enum": (50, 50)}, 450)
+        lines = importtime.compare_importtime_table(base, changed, 10).splitlines()
+        rows = [line for line in lines if line.startswith("| ")]
+        # sorted by the change of self time
+        self.assertEqual(
+            [row.split("|")[1].strip() for row in rows],
+            ["Module", "json", "re", "enum", "Total"],
+        )
+        self.assertIn("2.00x slower", rows[1])
+        self.assertIn("not imported", rows[2])
+        self.assertIn("new module", rows[3])
+        self.assertIn("1.50x slower", rows[4])
+
+
+class ImportCommandTests(unittest.TestCase):
+    def test_importtime_args(self):
+        bench = types.SimpleNamespace(
+            importtime_args=["-S", "-c", "pass"], runscript="run_benchmark.py"
+        )
+        self.assertEqual(
+            importtime.get_import_command(bench, "python3"),
+            ["python3", "-X", "importtime", "-S", "-c", "pass"],
+        )
+
+    def test_runscript(self):
+        bench = types.SimpleNamespace(importtime_args=(), runscript="run_benchmark.py")
+        self.assertEqual(
+            importtime.get_import_command(bench, "python3"),
+            ["python3", "-X", "importtime", "run_benchmark.py", "--help"],
+        )
+
+    def test_collect(self):
+        cmd = importtime.get_import_command(
+            types.SimpleNamespace(importtime_args=["-c", "import json"]),
+            sys.executable,
+        )
+        samples = importtime.collect_importtime(cmd, 2)
+        self.assertEqual(len(samples), 2)
+        self.assertIn("json", samples[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
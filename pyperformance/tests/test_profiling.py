@@ -0,0 +1,98 @@
+import os.path
+import tempfile
+import types
+import unittest
+from unittest import mock
+
+from pyperformance import profiling
+
+PERF_SCRIPT = """\
+python3.12 1234 100.000001:   1001001 cycles:
+\t    7f2e3c1d4a20 _PyEval_EvalFrameDefault+0x42 (/usr/bin/python3.12)
+\t    7f2e3c1d4b30 py::main:/bench.py+0x10 (/tmp/perf-1234.map)
+\t    7f2e3c1d4c40 [unknown] ([unknown])
+
+python3.12 1234 100.000002:   1001001 cycles:
+\t    7f2e3c1d4b30 py::main:/bench.py+0x10 (/tmp/perf-1234.map)
+\t    7f2e3c1d4c40 [unknown] ([unknown])
+"""
+
+
+class CollapseTests(unittest.TestCase):
+    def test_parse_collapsed(self):
+        lines = ["main;f;g 3\n", "main;f 2\n", "\n", "main;f;g 1\n", "invalid\n"]
+        stacks = profiling.parse_collapsed(lines)
+        self.assertEqual(stacks, {"main;f;g": 4, "main;f": 2})
+
+    def test_write_read(self):
+        stacks = {"main;f;g": 4, "main;f h": 2}
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, "bench.collapsed")
+            profiling.write_collapsed(filename, stacks)
+            self.assertEqual(profiling.read_collapsed(filename), stacks)
+
+    def test_perf_script(self):
+        stacks = profiling.collapse_perf_script(PERF_SCRIPT)
+        self.assertEqual(
+            stacks,
+            {
+                "[unknown];py::main:/bench.py;_PyEval_EvalFrameDefault": 1,
+                "[unknown];py::main:/bench.py": 1,
+            },
+        )
+
+
+class FlamegraphTests(unittest.TestCase):
+    def test_flamegraph(self):
+        stacks = {"main;f;g": 3, "main;f": 1, "main;<h>": 4}
+        svg = profiling.format_flamegraph(stacks, "bench")
+        self.assertTrue(svg.startswith("<svg "))
+        self.assertTrue(svg.endswith("</svg>"))
+        self.assertIn("<title>all (8 samples, 100.00%)</title>", svg)
+        self.assertIn("<title>f (4 samples, 50.00%)</title>", svg)
+        self.assertIn("&lt;h&gt;", svg)
+
+    def test_no_samples(self):
+        svg = profiling.format_flamegraph({}, "bench")
+        self.assertIn("(no samples)", svg)
+
+    def test_differential(self):
+        base = {"main;f": 1, "main;g": 3}
+        changed = {"main;f": 3, "main;g": 1}
+        svg = profiling.format_flamegraph(changed, "bench", base)
+        # f got slower (red), g got faster (blue)
+        self.assertIn("<title>f (3 samples, 75.00%), +50.00%</title>", svg)
+        self.assertIn("<title>g (1 samples, 25.00%), -50.00%</title>", svg)
+        self.assertIn('fill="rgb(255,20,20)"', svg)
+        self.assertIn('fill="rgb(20,20,255)"', svg)
+
+
+class ChooseSamplerTests(unittest.TestCase):
+    def create_info(self, version_info):
+        return types.SimpleNamespace(
+            sys=types.SimpleNamespace(version_info=version_info)
+        )
+
+    def test_explicit(self):
+        info = self.create_info((3, 11, 0))
+        self.assertEqual(profiling.choose_sampler("perf", info), "perf")
+        self.assertEqual(profiling.choose_sampler("python", info), "python")
+
+    def test_auto(self):
+        with (
+            mock.patch("sys.platform", "linux"),
+            mock.patch("shutil.which", return_value="/usr/bin/perf"),
+        ):
+            sampler = profiling.choose_sampler("auto", self.create_info((3, 12, 0)))
+            self.assertEqual(sampler, "perf")
+            # perf cannot see Python functions before 3.12
+            sampler = profiling.choose_sampler("auto", self.create_info((3, 11, 0)))
+            self.assertEqual(sampler, "python")
+
+        with mock.patch("shutil.which", return_value=None):
+            sampler = profiling.choose_sampler("auto", self.create_info((3, 12, 0)))
+            self.assertEqual(sampler, "python")
+
+
+if __name__ == "__main__":
+    unittest.main()
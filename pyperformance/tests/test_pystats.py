@@ -0,0 +1,111 @@
+import os.path
+import tempfile
+import unittest
+from unittest import mock
+
+import pyperf
+
+from pyperformance import _pystats, run
+
+STATS = """\
+opcode[LOAD_ATTR].specializable : 1
+    opcode[LOAD_ATTR].specialization.success : 10
+    opcode[LOAD_ATTR].specialization.failure : 2
+    opcode[LOAD_ATTR].specialization.hit : 900
+    opcode[LOAD_ATTR].specialization.miss : 100
+    opcode[LOAD_ATTR].specialization.failure_kinds[3] : 2
+    opcode[LOAD_ATTR].execution_count : 1000
+    opcode[BINARY_OP].specialization.hit : 50
+    opcode[BINARY_OP].execution_count : 500
+Calls to PyEval_EvalDefault: 20
+Calls to Python functions inlined: 30
+Object allocations: 400
+Object frees: 390
+GC[0] collections: 3
+GC[1] collections: 1
+GC[0] objects collected: 12
+Optimization attempts: 5
+"""
+
+
+class ParseStatsTests(unittest.TestCase):
+    def test_parse(self):
+        stats = _pystats.parse_stats(STATS.splitlines() + ["invalid", "x: y"])
+        self.assertEqual(stats["opcode[LOAD_ATTR].specialization.hit"], 900)
+        self.assertEqual(stats["Calls to PyEval_EvalDefault"], 20)
+        self.assertNotIn("x", stats)
+
+    def test_summarize(self):
+        # stats of two worker processes are summed
+        stats = _pystats.parse_stats(STATS.splitlines() * 2)
+        self.assertEqual(
+            _pystats.summarize_stats(stats),
+            {
+                "instructions": 3000,
+                "specialization_success": 20,
+                "specialization_failure": 4,
+                "specialization_hit": 1900,
+                "specialization_miss": 200,
+                "python_calls": 40,
+                "inlined_calls": 60,
+                "object_allocations": 800,
+                "object_frees": 780,
+                "gc_collections": 8,
+                "gc_objects_collected": 24,
+            },
+        )
+
+
+class AddPystatsTests(unittest.TestCase):
+    def test_add_pystats(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            stats_dir = os.path.join(tmpdir, "py_stats")
+            os.mkdir(stats_dir)
+            old_file = os.path.join(stats_dir, "old.txt")
+            with open(old_file, "w") as fp:
+                fp.write("Object allocations: 1000000\n")
+            with mock.patch.object(_pystats, "PYSTATS_DIR", stats_dir):
+                previous = _pystats.get_stats_files()
+                with open(os.path.join(stats_dir, "new.txt"), "w") as fp:
+                    fp.write(STATS)
+
+                run_ = pyperf.Run(
+                    [1.0, 1.0],
+                    warmups=[(10, 1.0)],
+                    metadata={"name": "bench", "loops": 20},
+                    collect_metadata=False,
+                )
+                bench = pyperf.Benchmark([run_])
+                output = os.path.join(tmpdir, "output")
+                run.add_pystats("bench", bench, output, previous)
+
+            # Only the new stats file is moved
+            self.assertEqual(os.listdir(os.path.join(output, "bench")), ["new.txt"])
+            self.assertTrue(os.path.exists(old_file))
+
+        metadata = bench.get_metadata()
+        # 10 warmup iterations + 2 values of 20 loops
+        self.assertEqual(metadata["pystats_instructions"], 1500 / 50)
+        self.assertEqual(metadata["pystats_object_allocations"], 400 / 50)
+
+
+class LockStatsDirTests(unittest.TestCase):
+    def test_lock(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            stats_dir = os.path.join(tmpdir, "py_stats")
+            with mock.patch.object(_pystats, "PYSTATS_DIR", stats_dir):
+                with _pystats.lock_stats_dir():
+                    # a concurrent run is detected
+                    with self.assertRaises(_pystats.PystatsLockedError):
+                        with _pystats.lock_stats_dir():
+                            pass
+                    # the lock file is not a stats file
+                    self.assertEqual(_pystats.get_stats_files(), set())
+
+                # the lock is released, even if the lock file remains
+                with _pystats.lock_stats_dir():
+                    pass
+
+
+if __name__ == "__main__":
+    unittest.main()
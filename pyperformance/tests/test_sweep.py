@@ -0,0 +1,75 @@
+import argparse
+import types
+import unittest
+
+import pyperf
+
+from pyperformance import _benchmark_metadata, cli, run
+
+
+def create_bench(name, params):
+    return types.SimpleNamespace(name=name, params=params)
+
+
+class SweepRunsTests(unittest.TestCase):
+    def test_no_sweep(self):
+        bench = create_bench("json_loads", {"size": [3, 30]})
+        self.assertEqual(run.get_sweep_runs([bench], None), [(bench, None)])
+
+    def test_values(self):
+        bench = create_bench("json_loads", {"size": [3, 30]})
+        other = create_bench("fannkuch", {})
+        runs = run.get_sweep_runs([bench, other], ("size", [10, 100]))
+        self.assertEqual(runs, [(bench, {"size": 10}), (bench, {"size": 100})])
+
+    def test_default_values(self):
+        bench = create_bench("json_loads", {"size": [3, 30]})
+        runs = run.get_sweep_runs([bench], ("size", []))
+        self.assertEqual(runs, [(bench, {"size": 3}), (bench, {"size": 30})])
+
+    def test_add_metadata(self):
+        result = pyperf.Benchmark(
+            [
+                pyperf.Run(
+                    [1.0],
+                    metadata={"name": "json_loads", "unit": "second"},
+                    collect_metadata=False,
+                )
+            ]
+        )
+        run.add_sweep_metadata(result, {"size": 30})
+        self.assertEqual(result.get_name(), "json_loads[size=30]")
+        metadata = result.get_metadata()
+        self.assertEqual(metadata["sweep_series"], "json_loads")
+        self.assertEqual(metadata["sweep_param"], "size")
+        self.assertEqual(metadata["sweep_value"], 30)
+
+
+class SweepOptionTests(unittest.TestCase):
+    def test_parse(self):
+        self.assertEqual(cli.sweep("size=10,100"), ("size", [10, 100]))
+        self.assertEqual(cli.sweep("size"), ("size", []))
+
+    def test_invalid(self):
+        for value in ("=10", "size=big", "size=0"):
+            with self.subTest(value=value):
+                with self.assertRaises(argparse.ArgumentTypeError):
+                    cli.sweep(value)
+
+
+class ParamsMetadataTests(unittest.TestCase):
+    def test_valid(self):
+        params = {"size": [1, 10]}
+        self.assertEqual(
+            _benchmark_metadata._resolve_value("params", params, "."), params
+        )
+
+    def test_invalid(self):
+        for params in ({"size": []}, {"size": [0]}, {"size": "10"}, ["size"]):
+            with self.subTest(params=params):
+                with self.assertRaises(TypeError):
+                    _benchmark_metadata._resolve_value("params", params, ".")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,212 @@
+import http.client
+import logging
+import os.path
+import socket
+import tempfile
+import threading
+import types
+import unittest
+from contextlib import redirect_stderr
+from io import StringIO
+from unittest import mock
+
+from pyperformance import _codespeed, _upload
+from pyperformance.tests.test_codespeed import create_result
+
+
+def create_conf(tmpdir, url, **kwargs):
+    conf = types.SimpleNamespace(
+        url=url,
+        uploaded_json_dir=os.path.join(tmpdir, "uploaded"),
+        upload_spool_dir=os.path.join(tmpdir, "upload_spool"),
+        upload_batch_size=10,
+        upload_retries=3,
+        upload_retry_delay=1.0,
+        upload_compress=False,
+    )
+    for key, value in kwargs.items():
+        setattr(conf, key, value)
+    return conf
+
+
+def get_unused_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class UploadSpoolTests(unittest.TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.tmpdir = tmpdir.name
+        self.addCleanup(tmpdir.cleanup)
+        self.logger = logging.getLogger("test_upload")
+        self.logger.propagate = False
+        self.logger.disabled = True
+        self.addCleanup(setattr, self.logger, "disabled", False)
+
+    def start_server(self):
+        self.db = _codespeed.ResultDatabase(":memory:")
+        self.addCleanup(self.db.close)
+        server = _codespeed.create_server(self.db, port=0)
+        self.addCleanup(server.server_close)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(server.shutdown)
+        stderr = redirect_stderr(StringIO())
+        stderr.__enter__()
+        self.addCleanup(stderr.__exit__, None, None, None)
+        host, port = server.server_address[:2]
+        return "http://%s:%s/" % (host, port)
+
+    def enqueue(self, spool, name, results):
+        filename = os.path.join(self.tmpdir, name)
+        with open(filename, "w") as fp:
+            fp.write("{}")
+        upload_filename = os.path.join(spool.uploaded_dir, name)
+        spool.enqueue(filename, upload_filename, results)
+        return filename, upload_filename
+
+    def test_drain(self):
+        url = self.start_server()
+        conf = create_conf(self.tmpdir, url, upload_batch_size=2, upload_compress=True)
+        spool = _upload.UploadSpool(conf, self.logger)
+        files = [
+            self.enqueue(spool, "bench%s.json" % i, [create_result(commitid="c%s" % i)])
+            for i in range(3)
+        ]
+        self.assertEqual(len(spool.get_pending()), 3)
+
+        uploaded = spool.drain()
+
+        self.assertEqual(uploaded, [filename for filename, _ in files])
+        self.assertEqual(spool.get_pending(), [])
+        for filename, upload_filename in files:
+            self.assertFalse(os.path.exists(filename))
+            self.assertTrue(os.path.exists(upload_filename))
+        self.assertEqual(len(self.db.get_results()), 3)
+
+    def test_unique_entries(self):
+        conf = create_conf(self.tmpdir, "http://localhost/")
+        spool = _upload.UploadSpool(conf, self.logger)
+        # a JSON file enqueued twice must not replace its pending entry
+        self.enqueue(spool, "bench.json", [create_result(commitid="c1")])
+        self.enqueue(spool, "bench.json", [create_result(commitid="c2")])
+
+        pending = spool.get_pending()
+        self.assertEqual(len(pending), 2)
+        for path in pending:
+            self.assertTrue(os.path.basename(path).endswith("-bench.json"))
+
+    def test_idempotency_key(self):
+        conf = create_conf(self.tmpdir, "http://localhost/")
+        spool = _upload.UploadSpool(conf, self.logger)
+        entries = [
+            {"results": [create_result(value=1.5), create_result("float")]},
+            {"results": [create_result(value=2.0)]},
+        ]
+        body, headers = spool.encode_batch(entries)
+        self.assertIn(b"float", body)
+        self.assertNotIn(b"1.5", body)
+        self.assertEqual(len(headers["Idempotency-Key"]), 64)
+
+        # same results, same key
+        body2, headers2 = spool.encode_batch(entries[::-1])
+        self.assertEqual(headers2["Idempotency-Key"], headers["Idempotency-Key"])
+
+    def test_unreachable(self):
+        url = "http://127.0.0.1:%s/" % get_unused_port()
+        conf = create_conf(self.tmpdir, url)
+        spool = _upload.UploadSpool(conf, self.logger)
+        filename, upload_filename = self.enqueue(spool, "bench.json", [create_result()])
+
+        with mock.patch("time.sleep") as sleep:
+            uploaded = spool.drain()
+
+        # exponential backoff
+        delays = [call.args[0] for call in sleep.call_args_list]
+        self.assertEqual(delays, [1.0, 2.0, 4.0])
+        # the results are kept in the spool
+        self.assertEqual(uploaded, [])
+        self.assertEqual(len(spool.get_pending()), 1)
+        self.assertTrue(os.path.exists(filename))
+        self.assertFalse(os.path.exists(upload_filename))
+
+    def test_unreachable_stops_drain(self):
+        url = "http://127.0.0.1:%s/" % get_unused_port()
+        conf = create_conf(self.tmpdir, url, upload_batch_size=1)
+        spool = _upload.UploadSpool(conf, self.logger)
+        for i in range(3):
+            self.enqueue(spool, "bench%s.json" % i, [create_result()])
+
+        with mock.patch("time.sleep") as sleep:
+            uploaded = spool.drain()
+
+        # only the first batch is sent: the next ones stay in the spool
+        self.assertEqual(sleep.call_count, 3)
+        self.assertEqual(uploaded, [])
+        self.assertEqual(len(spool.get_pending()), 3)
+
+    def test_rejected(self):
+        url = self.start_server()
+        conf = create_conf(self.tmpdir, url)
+        spool = _upload.UploadSpool(conf, self.logger)
+        self.enqueue(spool, "bench.json", [{"benchmark": "float"}])
+
+        with mock.patch("time.sleep") as sleep:
+            uploaded = spool.drain()
+
+        # client errors are not retried
+        sleep.assert_not_called()
+        self.assertEqual(uploaded, [])
+        # rejected results don't block the next drains
+        self.assertEqual(spool.get_pending(), [])
+        failed = os.listdir(spool.failed_dir)
+        self.assertEqual(len(failed), 1)
+        self.assertTrue(failed[0].endswith("-bench.json"))
+
+    def test_rejected_entry(self):
+        url = self.start_server()
+        conf = create_conf(self.tmpdir, url)
+        spool = _upload.UploadSpool(conf, self.logger)
+        filename1, upload_filename1 = self.enqueue(
+            spool, "bench1.json", [create_result(commitid="c1")]
+        )
+        self.enqueue(spool, "bench2.json", [{"benchmark": "float"}])
+        filename3, upload_filename3 = self.enqueue(
+            spool, "bench3.json", [create_result(commitid="c3")]
+        )
+
+        uploaded = spool.drain()
+
+        # the batch is rejected: only the invalid entry is moved to failed/
+        self.assertEqual(uploaded, [filename1, filename3])
+        self.assertTrue(os.path.exists(upload_filename1))
+        self.assertTrue(os.path.exists(upload_filename3))
+        self.assertEqual(spool.get_pending(), [])
+        failed = os.listdir(spool.failed_dir)
+        self.assertEqual(len(failed), 1)
+        self.assertTrue(failed[0].endswith("-bench2.json"))
+        self.assertEqual(len(self.db.get_results()), 2)
+
+    def test_incomplete_response(self):
+        conf = create_conf(self.tmpdir, "http://localhost/")
+        spool = _upload.UploadSpool(conf, self.logger)
+        self.enqueue(spool, "bench.json", [create_result()])
+
+        error = http.client.IncompleteRead(b"")
+        with (
+            mock.patch("pyperformance._upload.urlopen", side_effect=error),
+            mock.patch("time.sleep") as sleep,
+        ):
+            uploaded = spool.drain()
+
+        # the response was lost: retry
+        self.assertEqual(sleep.call_count, 3)
+        self.assertEqual(uploaded, [])
+        self.assertEqual(len(spool.get_pending()), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,9 +3,10 @@ import os.path
 import sys
 import types
 import unittest
+from unittest import mock
 
 import pyperformance._venv
-from pyperformance import tests
+from pyperformance import run, tests
 
 
 def new_venv_config(
@@ -85,3 +86,28 @@ class VenvConfigTests(tests.Functional, unittest.TestCase):
         cfg = pyperformance._venv.parse_venv_config(text)
 
         self.assertEqual(vars(cfg), vars(expected))
+
+
+class PrepareVenvsTests(unittest.TestCase):
+    def prepare_venvs(self, hooks):
+        options = types.SimpleNamespace(unique_venvs=False, inherit_environ=None)
+        bench = mock.Mock()
+        bench.name = "spam"
+        with mock.patch.object(run, "get_run_id") as get_run_id:
+            get_run_id.return_value = run.RunID("py", "compat", None, None)
+            with mock.patch.object(run.VenvForBenchmarks, "ensure") as ensure:
+                benchmarks = run.prepare_venvs([bench], None, options, hooks)
+        venv = ensure.return_value
+        self.assertIs(benchmarks[bench][0], venv)
+        return venv
+
+    def test_no_hooks(self):
+        # Don't install pyperformance if its hooks are not used
+        venv = self.prepare_venvs(())
+        venv.ensure_hooks.assert_not_called()
+        venv = self.prepare_venvs(["perf_record"])
+        venv.ensure_hooks.assert_not_called()
+
+    def test_pyperformance_hook(self):
+        venv = self.prepare_venvs(["rusage"])
+        venv.ensure_hooks.assert_called_once_with()
@@ -11,6 +11,15 @@ REQUIREMENTS_FILE = os.path.join(
 )
 PYPERF_OPTIONAL = ["psutil"]
 
+# Print the version of pyperformance and the names of its pyperf hooks
+HOOKS_SCRIPT = """
+import importlib.metadata
+print(importlib.metadata.version("pyperformance"))
+for entry_point in importlib.metadata.entry_points(group="pyperf.hook"):
+    if entry_point.value.startswith("pyperformance."):
+        print(entry_point.name)
+"""
+
 
 class Requirements(object):
     @classmethod
@@ -210,27 +219,74 @@ class VenvForBenchmarks(_venv.VirtualEnvironment):
         # Restrict the env we use.
         return _get_envvars(self.inherit_environ)
 
-    def install_pyperformance(self):
+    def install_pyperformance(self, *, deps=True):
+        """Install pyperformance inside the virtual environment.
+
+        If deps is false, the dependencies of pyperformance are not
+        installed, so that the requirements of a benchmark don't change.
+        """
         print("installing pyperformance in the venv at %s" % self.root)
-        # Install pyperformance inside the virtual environment.
+        pip_opts = [] if deps else ["--no-deps"]
         if pyperformance.is_dev():
-            basereqs = Requirements.from_file(REQUIREMENTS_FILE)
-            self.ensure_reqs(basereqs)
-            if basereqs.get("pyperf"):
-                self._install_pyperf_optional_dependencies()
+            if deps:
+                basereqs = Requirements.from_file(REQUIREMENTS_FILE)
+                self.ensure_reqs(basereqs)
+                if basereqs.get("pyperf"):
+                    self._install_pyperf_optional_dependencies()
 
             root_dir = os.path.dirname(pyperformance.PKG_ROOT)
             ec, _, _ = _pip.install_editable(
                 root_dir,
+                *pip_opts,
                 python=self.info,
                 env=self._env,
             )
             if ec != 0:
                 raise _venv.RequirementsInstallationFailedError(root_dir)
-        else:
+        elif deps:
             version = pyperformance.__version__
             self.ensure_reqs([f"pyperformance=={version}"])
             self._install_pyperf_optional_dependencies()
+        else:
+            req = f"pyperformance=={pyperformance.__version__}"
+            ec, _, _ = _pip.run_pip(
+                "install",
+                "--no-deps",
+                req,
+                python=self.python,
+                env=self._env,
+            )
+            if ec != 0:
+                raise _venv.RequirementsInstallationFailedError(req)
+
+    def ensure_hooks(self):
+        """Make the pyperf hooks of pyperformance loadable in the venv.
+
+        The hooks are "pyperf.hook" entry points of the pyperformance
+        distribution: the benchmark processes only find them if
+        pyperformance is installed in their venv.
+        """
+        from ._hooks import get_hook_names
+
+        # -I: don't look for distributions in the current directory
+        ec, stdout, _ = _utils.run_python(
+            "-I",
+            "-c",
+            HOOKS_SCRIPT,
+            python=self.python,
+            env=self._env,
+            capture=True,
+            verbose=False,
+        )
+        if ec == 0:
+            version, *hooks = stdout.split()
+            if version == pyperformance.__version__ and set(hooks) >= set(
+                get_hook_names()
+            ):
+                return
+
+        # The hooks only need pyperf, which the venv already has
+        self.install_pyperformance(deps=False)
 
     def _install_pyperf_optional_dependencies(self):
         for req in PYPERF_OPTIONAL: